@@ -0,0 +1,108 @@
+# benchmarks/fake_backend.py
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.backends.sqlite_backend import SQLiteClient
+
+
+class _DelayedRequest:
+    """Wraps a query builder so that execute() pays the simulated network latency first."""
+
+    def __init__(self, request, client: "LatencyClient"):
+        self._request = request
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._request, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._request else result
+        return call
+
+    def execute(self):
+        self._client.delay()
+        return self._request.execute()
+
+
+class LatencyClient:
+    """
+    In-process stand-in for the supabase client: the embedded SQLite backend behind the
+    same ``table()``/``rpc()`` API, with ``latency`` seconds (plus up to ``jitter``) added
+    to every request so that round trips cost what they would over the network.
+    """
+
+    def __init__(self, backend: SQLiteClient, latency: float = 0.0, jitter: float = 0.0):
+        self.backend = backend
+        self.latency = latency
+        self.jitter = jitter
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def table(self, name: str):
+        return _DelayedRequest(self.backend.table(name), self)
+
+    from_ = table
+
+    def rpc(self, fn: str, params=None):
+        return _DelayedRequest(self.backend.rpc(fn, params), self)
+
+    def close(self):
+        self.backend.close()
+
+
+def temp_backend(pool_size: int = 4) -> SQLiteClient:
+    """A fresh file-backed SQLite database in a temporary directory (removed on close)."""
+    directory = tempfile.mkdtemp(prefix="retail-bench-")
+    backend = SQLiteClient(os.path.join(directory, "bench.db"), pool_size=pool_size)
+    close = backend.close
+
+    def close_and_remove():
+        close()
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    backend.close = close_and_remove
+    return backend
+
+
+def seed(backend: SQLiteClient, order_items: int, products: int = 1000, customers: int = 1000,
+         lines_per_order: int = 4, days: int = 60, rng: random.Random | None = None):
+    """Bulk-load a sales history of ``order_items`` lines directly, bypassing the DAOs."""
+    rng = rng or random.Random(42)
+    now = datetime.now(timezone.utc)
+    orders = -(-order_items // lines_per_order)
+    prices = [round(rng.uniform(1, 500), 2) for _ in range(products)]
+    with backend._transaction(write=True) as conn:
+        conn.executemany(
+            "INSERT INTO products (name, sku, price, stock, category) VALUES (?, ?, ?, ?, ?)",
+            ((f"Product {i}", f"SKU-{i:07d}", prices[i], 1_000_000, f"cat-{i % 20}") for i in range(products)),
+        )
+        conn.executemany(
+            "INSERT INTO customers (name, email, phone, city) VALUES (?, ?, ?, ?)",
+            ((f"Customer {i}", f"customer{i}@example.com", f"+1555{i:07d}", f"City {i % 50}") for i in range(customers)),
+        )
+        remaining = order_items
+        for start in range(1, orders + 1, 10_000):
+            order_rows, item_rows = [], []
+            for order_id in range(start, min(orders, start + 9_999) + 1):
+                count = remaining if order_id == orders else lines_per_order
+                remaining -= count
+                lines = [(rng.randrange(products), rng.randint(1, 5)) for _ in range(count)]
+                placed = now - timedelta(seconds=rng.randrange(days * 86400))
+                order_rows.append((order_id, rng.randrange(customers) + 1, placed.isoformat(timespec="milliseconds"),
+                                   round(sum(prices[p] * q for p, q in lines), 2),
+                                   rng.choice(("PLACED", "COMPLETED", "COMPLETED", "CANCELLED"))))
+                item_rows.extend((order_id, p + 1, q, prices[p]) for p, q in lines)
+            conn.executemany(
+                "INSERT INTO orders (order_id, cust_id, order_date, total_amount, status) VALUES (?, ?, ?, ?, ?)",
+                order_rows,
+            )
+            conn.executemany("INSERT INTO order_items (order_id, prod_id, quantity, price) VALUES (?, ?, ?, ?)", item_rows)
@@ -0,0 +1,229 @@
+# benchmarks/run.py
+"""
+Service-level benchmarks against the in-process fake backend.
+
+    python -m benchmarks.run --latency-ms 2 --sizes 10000 1000000 --output results.json
+
+Every scenario reports ops/s, p50/p99 latency and backend requests per operation
+(from the DAO round-trip counter); the JSON document is meant to be diffed across releases.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from src.dao.base_dao import round_trips
+from src.dao.product_dao import ProductDAO
+from src.dao.customer_dao import CustomerDAO
+from src.dao.order_dao import OrderDAO
+from src.dao.payment_dao import PaymentDAO
+from src.dao.aggregate_dao import SalesAggregateDAO
+from src.services.product_service import ProductService
+from src.services.customer_service import CustomerService
+from src.services.order_service import OrderService
+from src.services.payment_service import PaymentService
+from src.services.report_service import ReportService
+from src.services.snapshot import Snapshot, export_snapshot
+from src.dao.export_dao import ExportDAO
+from benchmarks.fake_backend import LatencyClient, seed, temp_backend
+
+REPORTS = {
+    "top_products": lambda r: r.top_selling_products(),
+    "revenue": lambda r: r.total_revenue_last_month(),
+    "orders_per_customer": lambda r: r.total_orders_per_customer(),
+    "frequent_customers": lambda r: r.frequent_customers(),
+    "all": lambda r: r.run_reports(),
+}
+REPORT_MODES = ("rpc", "scan", "aggregates", "snapshot")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def measure(name: str, op: Callable[[int], object], iterations: int, warmup: int = 1, **params) -> Dict:
+    """Time ``op(i)`` ``iterations`` times and count the backend requests it issues."""
+    for i in range(warmup):
+        op(-1 - i)
+    round_trips.reset()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        op(i)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    trips = round_trips.snapshot()
+    latencies.sort()
+    result = {
+        "scenario": name,
+        "params": params,
+        "iterations": iterations,
+        "ops_per_s": round(iterations / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "requests_per_op": round(trips["total"] / iterations, 2),
+        "requests_by_table": {t: round(n / iterations, 2) for t, n in sorted(trips["by_table"].items())},
+    }
+    label = " ".join([name] + [f"{k}={v}" for k, v in params.items()])
+    print(f"  {label:<48} {result['ops_per_s']:>10} ops/s  p50 {result['p50_ms']:>9} ms  "
+          f"p99 {result['p99_ms']:>9} ms  {result['requests_per_op']:>6} req/op", file=sys.stderr)
+    return result
+
+
+def services(client) -> Dict:
+    products = ProductService(ProductDAO(client))
+    customers = CustomerService(CustomerDAO(client))
+    orders = OrderService(OrderDAO(client), customers, products)
+    return {
+        "products": products,
+        "customers": customers,
+        "orders": orders,
+        "payments": PaymentService(PaymentDAO(client), orders),
+    }
+
+
+def transactional_scenarios(args) -> List[Dict]:
+    backend = temp_backend()
+    seed(backend, order_items=0, products=200, customers=200)
+    client = LatencyClient(backend, args.latency_ms / 1000, args.jitter_ms / 1000)
+    svc = services(client)
+    ids = itertools.count()
+    results = [
+        measure("product_add", lambda i: svc["products"].add_product(f"Bench {i}", f"BENCH-{next(ids)}", 9.99, 100),
+                args.iterations),
+        measure("customer_add", lambda i: svc["customers"].add_customer(f"Bench {i}", f"bench{next(ids)}@example.com", "+15550000000"),
+                args.iterations),
+    ]
+    for lines in args.order_lines:
+        basket = [{"prod_id": 1 + (n % 200), "quantity": 1} for n in range(lines)]
+        results.append(measure(f"order_create_{lines}_lines",
+                               lambda i: svc["orders"].create_order(1 + i % 200, basket),
+                               args.iterations, lines=lines))
+
+    pending = [svc["orders"].create_order(1 + n % 200, [{"prod_id": 1 + n % 200, "quantity": 1}])["order"]["order_id"]
+               for n in range(args.iterations + 1)]
+    results.append(measure("payment_process", lambda i: svc["payments"].process_payment(pending[i], "Card"),
+                           args.iterations))
+    orders = [svc["orders"].create_order(1 + n % 200, [{"prod_id": 1 + n % 200, "quantity": 1}])["order"]["order_id"]
+              for n in range(args.iterations + 1)]
+    results.append(measure("order_cancel", lambda i: svc["orders"].cancel_order(orders[i]), args.iterations))
+    results.append(measure("order_details", lambda i: svc["orders"].get_order_details(orders[i]), args.iterations))
+    results.append(measure("order_details_batch", lambda i: svc["orders"].get_orders_details(orders),
+                           max(1, args.iterations // 10), orders=len(orders)))
+    # A sales-event burst: many tills looking up a few hot products at once.
+    with ThreadPoolExecutor(args.burst) as pool:
+        lookup = svc["products"].dao.get_product_by_id
+        results.append(measure("product_lookup_burst",
+                               lambda i: list(pool.map(lookup, [1 + n % 8 for n in range(args.burst)])),
+                               max(1, args.iterations // 10), burst=args.burst))
+    client.close()
+    return results
+
+
+def report_scenarios(args) -> List[Dict]:
+    results = []
+    for size in args.sizes:
+        backend = temp_backend()
+        print(f"seeding {size} order items...", file=sys.stderr)
+        seed(backend, order_items=size)
+        client = LatencyClient(backend, args.latency_ms / 1000, args.jitter_ms / 1000)
+        aggregates = SalesAggregateDAO(client)
+        aggregates.rebuild()
+        snapshot_dir = tempfile.mkdtemp(prefix="retail-bench-snapshot-")
+        snapshot = None
+        if "snapshot" in args.report_modes:
+            export_snapshot(ExportDAO(client), os.path.join(snapshot_dir, "snapshot"), formats=["columnar"])
+            snapshot = Snapshot(os.path.join(snapshot_dir, "snapshot"))
+        for mode in args.report_modes:
+            if mode == "snapshot":
+                service = ReportService(snapshot=snapshot)
+            else:
+                service = ReportService(client, aggregates=aggregates if mode == "aggregates" else None)
+                service.use_rpc = mode == "rpc"
+            for report, call in REPORTS.items():
+                results.append(measure(f"report_{report}", lambda i: call(service), args.report_iterations,
+                                       rows=size, mode=mode))
+        if snapshot:
+            snapshot.close()
+        shutil.rmtree(snapshot_dir)
+        client.close()
+    return results
+
+
+def _key(result: Dict) -> tuple:
+    return (result["scenario"],) + tuple(sorted(result["params"].items()))
+
+
+def compare(baseline: Dict, results: List[Dict]):
+    """Print p50 and requests-per-op changes against an earlier run, flagging extra round trips."""
+    before = {_key(r): r for r in baseline["results"]}
+    print("\ncompared with baseline from", baseline.get("created_at"), file=sys.stderr)
+    for result in results:
+        old = before.get(_key(result))
+        if not old:
+            continue
+        label = " ".join([result["scenario"]] + [f"{k}={v}" for k, v in result["params"].items()])
+        change = (result["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0.0
+        flag = "  MORE REQUESTS" if result["requests_per_op"] > old["requests_per_op"] else ""
+        print(f"  {label:<48} p50 {change:+7.1f}%  req/op {old['requests_per_op']} -> {result['requests_per_op']}{flag}",
+              file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per backend request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random latency per request")
+    parser.add_argument("--iterations", type=int, default=200, help="operations per transactional scenario")
+    parser.add_argument("--order-lines", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--burst", type=int, default=32, help="concurrent lookups in product_lookup_burst")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="order items to seed for reports")
+    parser.add_argument("--report-iterations", type=int, default=5)
+    parser.add_argument("--report-modes", nargs="+", choices=REPORT_MODES, default=list(REPORT_MODES))
+    parser.add_argument("--skip", nargs="+", choices=["transactional", "reports"], default=[])
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = []
+    if "transactional" not in args.skip:
+        results += transactional_scenarios(args)
+    if "reports" not in args.skip:
+        results += report_scenarios(args)
+    document = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            compare(json.load(fh), results)
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
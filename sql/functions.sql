@@ -0,0 +1,512 @@
+-- sql/functions.sql
+-- Database functions called through supabase .rpc(). Apply in the Supabase SQL editor.
+-- The embedded SQLite backend (src/backends/sqlite_backend.py) implements the same names.
+
+-- Atomically decrement stock for every line of an order, or for none of them.
+-- p_items: [{"prod_id": 1, "quantity": 2}, ...]; repeated prod_ids are summed.
+create or replace function reserve_stock(p_items jsonb)
+returns setof products
+language plpgsql
+as $$
+declare
+    item record;
+    updated products;
+begin
+    for item in
+        select (e->>'prod_id')::bigint as prod_id, sum((e->>'quantity')::int) as quantity
+        from jsonb_array_elements(p_items) e
+        group by 1
+        order by 1  -- fixed lock order avoids deadlocks between concurrent checkouts
+    loop
+        update products set stock = stock - item.quantity
+        where prod_id = item.prod_id and stock >= item.quantity
+        returning * into updated;
+        if not found then
+            raise exception 'insufficient stock for product %', item.prod_id
+                using errcode = 'P0001', detail = item.prod_id::text;
+        end if;
+        return next updated;
+    end loop;
+end;
+$$;
+
+-- Return stock for cancelled orders and restocks (server-side increment).
+create or replace function release_stock(p_items jsonb)
+returns setof products
+language plpgsql
+as $$
+declare
+    item record;
+    updated products;
+begin
+    for item in
+        select (e->>'prod_id')::bigint as prod_id, sum((e->>'quantity')::int) as quantity
+        from jsonb_array_elements(p_items) e
+        group by 1
+        order by 1
+    loop
+        update products set stock = stock + item.quantity
+        where prod_id = item.prod_id
+        returning * into updated;
+        if found then
+            return next updated;
+        end if;
+    end loop;
+end;
+$$;
+
+-- Report aggregates: grouped in the database so only result rows cross the wire.
+create index if not exists idx_order_items_prod_id on order_items(prod_id);
+create index if not exists idx_orders_order_date on orders(order_date);
+create index if not exists idx_orders_cust_id on orders(cust_id);
+
+create or replace function top_selling_products(p_limit int default 5)
+returns table (prod_id bigint, total_quantity bigint)
+language sql
+stable
+as $$
+    select oi.prod_id, sum(oi.quantity)::bigint as total_quantity
+    from order_items oi
+    group by oi.prod_id
+    order by total_quantity desc, oi.prod_id
+    limit p_limit;
+$$;
+
+create or replace function revenue_since(p_since timestamptz)
+returns table (revenue numeric)
+language sql
+stable
+as $$
+    select coalesce(sum(o.total_amount), 0)::numeric as revenue
+    from orders o
+    where o.order_date >= p_since;
+$$;
+
+create or replace function orders_per_customer(p_min_orders int default 1)
+returns table (cust_id bigint, total_orders bigint)
+language sql
+stable
+as $$
+    select o.cust_id, count(*)::bigint as total_orders
+    from orders o
+    group by o.cust_id
+    having count(*) >= p_min_orders
+    order by o.cust_id;
+$$;
+
+-- Several reports in one call: orders and order_items are each scanned once, and
+-- only the requested reports are returned, one row per report.
+create or replace function sales_report(p_reports text[],
+                                        p_top int default 5,
+                                        p_min_orders int default 3,
+                                        p_since timestamptz default null,
+                                        p_until timestamptz default null,
+                                        p_revenue_since timestamptz default null)
+returns table (report text, result jsonb)
+language sql
+stable
+as $$
+    with per_customer as (
+        select o.cust_id, count(*)::bigint as total_orders,
+               coalesce(sum(o.total_amount) filter (where p_revenue_since is null or o.order_date >= p_revenue_since), 0)
+                   as revenue
+        from orders o
+        where p_reports && array['revenue', 'orders', 'frequent_customers']
+          and (p_since is null or o.order_date >= p_since)
+          and (p_until is null or o.order_date < p_until)
+        group by o.cust_id
+    ), per_product as (
+        select oi.prod_id, sum(oi.quantity)::bigint as total_quantity
+        from order_items oi
+        where 'top_products' = any(p_reports)
+          and ((p_since is null and p_until is null)
+               or exists (select 1 from orders o
+                          where o.order_id = oi.order_id
+                            and (p_since is null or o.order_date >= p_since)
+                            and (p_until is null or o.order_date < p_until)))
+        group by oi.prod_id
+    )
+    select r.report, r.result
+    from (
+        select 'top_products' as report,
+               (select coalesce(jsonb_agg(jsonb_build_object('prod_id', t.prod_id, 'total_quantity', t.total_quantity)
+                                          order by t.total_quantity desc, t.prod_id), '[]'::jsonb)
+                from (select * from per_product order by total_quantity desc, prod_id limit p_top) t) as result
+        union all
+        select 'revenue', to_jsonb((select coalesce(sum(c.revenue), 0) from per_customer c))
+        union all
+        select 'orders',
+               (select coalesce(jsonb_agg(jsonb_build_object('cust_id', c.cust_id, 'total_orders', c.total_orders)
+                                          order by c.cust_id), '[]'::jsonb)
+                from per_customer c)
+        union all
+        select 'frequent_customers',
+               (select coalesce(jsonb_agg(jsonb_build_object('cust_id', c.cust_id, 'total_orders', c.total_orders)
+                                          order by c.cust_id), '[]'::jsonb)
+                from per_customer c where c.total_orders >= p_min_orders)
+    ) r
+    where r.report = any(p_reports)
+    order by array_position(p_reports, r.report);
+$$;
+
+-- Running sales aggregates, maintained from order events by apply_sales_event().
+-- Reports read these instead of rescanning history; rebuild_sales_aggregates() recomputes them.
+create table if not exists sales_product_totals (
+    prod_id bigint primary key,
+    quantity_sold bigint not null default 0,
+    revenue numeric not null default 0
+);
+create table if not exists sales_customer_totals (
+    cust_id bigint primary key,
+    order_count bigint not null default 0,
+    total_spent numeric not null default 0
+);
+create table if not exists sales_daily_totals (
+    day date primary key,
+    order_count bigint not null default 0,
+    revenue numeric not null default 0,
+    completed_count bigint not null default 0,
+    completed_revenue numeric not null default 0,
+    cancelled_count bigint not null default 0,
+    cancelled_revenue numeric not null default 0
+);
+create index if not exists idx_sales_product_totals_qty on sales_product_totals(quantity_sold desc);
+create index if not exists idx_sales_customer_totals_count on sales_customer_totals(order_count);
+
+-- p_event: order_created | order_completed | order_cancelled. Daily buckets use the order's UTC date.
+create or replace function apply_sales_event(p_event text, p_order jsonb, p_items jsonb default '[]'::jsonb)
+returns void
+language plpgsql
+as $$
+declare
+    v_day date := ((p_order->>'order_date')::timestamptz at time zone 'utc')::date;
+    v_amount numeric := coalesce((p_order->>'total_amount')::numeric, 0);
+begin
+    if p_event = 'order_created' then
+        insert into sales_product_totals as t (prod_id, quantity_sold, revenue)
+        select (e->>'prod_id')::bigint, sum((e->>'quantity')::bigint), sum((e->>'quantity')::numeric * (e->>'price')::numeric)
+        from jsonb_array_elements(p_items) e
+        group by 1
+        on conflict (prod_id) do update
+            set quantity_sold = t.quantity_sold + excluded.quantity_sold, revenue = t.revenue + excluded.revenue;
+        insert into sales_customer_totals as t (cust_id, order_count, total_spent)
+        values ((p_order->>'cust_id')::bigint, 1, v_amount)
+        on conflict (cust_id) do update
+            set order_count = t.order_count + 1, total_spent = t.total_spent + excluded.total_spent;
+        insert into sales_daily_totals as t (day, order_count, revenue) values (v_day, 1, v_amount)
+        on conflict (day) do update set order_count = t.order_count + 1, revenue = t.revenue + excluded.revenue;
+    elsif p_event = 'order_completed' then
+        insert into sales_daily_totals as t (day, completed_count, completed_revenue) values (v_day, 1, v_amount)
+        on conflict (day) do update
+            set completed_count = t.completed_count + 1, completed_revenue = t.completed_revenue + excluded.completed_revenue;
+    elsif p_event = 'order_cancelled' then
+        insert into sales_daily_totals as t (day, cancelled_count, cancelled_revenue) values (v_day, 1, v_amount)
+        on conflict (day) do update
+            set cancelled_count = t.cancelled_count + 1, cancelled_revenue = t.cancelled_revenue + excluded.cancelled_revenue;
+    else
+        raise exception 'unknown sales event %', p_event using errcode = 'P0001';
+    end if;
+end;
+$$;
+
+-- One status event (order_completed | order_cancelled) for many orders, e.g. a settled chunk.
+create or replace function apply_sales_events(p_event text, p_orders jsonb)
+returns void
+language plpgsql
+as $$
+begin
+    if p_event not in ('order_completed', 'order_cancelled') then
+        raise exception 'apply_sales_events takes status events only, not %', p_event using errcode = 'P0001';
+    end if;
+    insert into sales_daily_totals as t (day, completed_count, completed_revenue, cancelled_count, cancelled_revenue)
+    select ((o->>'order_date')::timestamptz at time zone 'utc')::date,
+           count(*) filter (where p_event = 'order_completed'),
+           coalesce(sum(coalesce((o->>'total_amount')::numeric, 0)) filter (where p_event = 'order_completed'), 0),
+           count(*) filter (where p_event = 'order_cancelled'),
+           coalesce(sum(coalesce((o->>'total_amount')::numeric, 0)) filter (where p_event = 'order_cancelled'), 0)
+    from jsonb_array_elements(p_orders) o
+    group by 1
+    on conflict (day) do update
+        set completed_count = t.completed_count + excluded.completed_count,
+            completed_revenue = t.completed_revenue + excluded.completed_revenue,
+            cancelled_count = t.cancelled_count + excluded.cancelled_count,
+            cancelled_revenue = t.cancelled_revenue + excluded.cancelled_revenue;
+end;
+$$;
+
+create or replace function rebuild_sales_aggregates()
+returns void
+language plpgsql
+as $$
+begin
+    truncate sales_product_totals, sales_customer_totals, sales_daily_totals;
+    insert into sales_product_totals (prod_id, quantity_sold, revenue)
+    select prod_id, sum(quantity), sum(quantity * price) from order_items group by prod_id;
+    insert into sales_customer_totals (cust_id, order_count, total_spent)
+    select cust_id, count(*), sum(total_amount) from orders group by cust_id;
+    insert into sales_daily_totals
+    select (order_date at time zone 'utc')::date,
+           count(*), sum(total_amount),
+           count(*) filter (where status = 'COMPLETED'), coalesce(sum(total_amount) filter (where status = 'COMPLETED'), 0),
+           count(*) filter (where status = 'CANCELLED'), coalesce(sum(total_amount) filter (where status = 'CANCELLED'), 0)
+    from orders
+    group by 1;
+end;
+$$;
+
+-- Per-product reorder thresholds: a product is low on stock once stock <= reorder_threshold.
+-- The expression index keeps low_stock_products() proportional to the rows it returns.
+alter table products add column if not exists reorder_threshold integer not null default 5;
+create index if not exists idx_products_headroom on products ((stock - reorder_threshold), prod_id);
+
+-- Low-stock products, most urgent (lowest stock - reorder_threshold) first.
+-- Keyset-paged: pass the last row's (headroom, prod_id) as (p_after_headroom, p_after_id).
+create or replace function low_stock_products(p_limit int default 1000, p_after_headroom int default null,
+                                              p_after_id bigint default null)
+returns table (prod_id bigint, name text, sku text, stock int, reorder_threshold int, headroom int)
+language sql
+stable
+as $$
+    select p.prod_id, p.name::text, p.sku::text, p.stock::int, p.reorder_threshold,
+           (p.stock - p.reorder_threshold)::int as headroom
+    from products p
+    where p.stock - p.reorder_threshold <= 0
+      and (p_after_headroom is null
+           or (p.stock - p.reorder_threshold, p.prod_id) > (p_after_headroom, p_after_id))
+    order by p.stock - p.reorder_threshold, p.prod_id
+    limit p_limit;
+$$;
+
+-- Customer search: trigram indexes serve both prefix/substring LIKE and fuzzy matching.
+-- Values are indexed normalised (lower case, phone digits only), as search_customers() compares them.
+create extension if not exists pg_trgm;
+create index if not exists idx_customers_name_trgm on customers using gin (lower(name) gin_trgm_ops);
+create index if not exists idx_customers_email_trgm on customers using gin (lower(email) gin_trgm_ops);
+create index if not exists idx_customers_city_trgm on customers using gin (lower(city) gin_trgm_ops);
+create index if not exists idx_customers_phone_trgm
+    on customers using gin (regexp_replace(coalesce(phone, ''), '\D', '', 'g') gin_trgm_ops);
+
+-- 1.0 exact, 0.9 prefix of the value, 0.85 prefix of a word, up to 0.8 for a fuzzy match, else 0.
+-- Mirrors src/textsearch.py so every backend ranks alike.
+create or replace function customer_match_score(p_value text, p_query text, p_fuzzy boolean)
+returns real
+language sql
+immutable
+as $$
+    select (case
+        when coalesce(p_value, '') = '' or p_query = '' then 0
+        when p_value = p_query then 1.0
+        when left(p_value, length(p_query)) = p_query then 0.9
+        when position(' ' || p_query in ' ' || regexp_replace(p_value, '[\s@._+-]+', ' ', 'g')) > 0 then 0.85
+        when p_fuzzy and length(p_query) >= 3 and word_similarity(p_query, p_value) >= 0.3
+            then round((0.8 * word_similarity(p_query, p_value))::numeric, 4)
+        else 0
+    end)::real;
+$$;
+
+-- Customers matching p_query on any of p_fields, best match first (ties by cust_id), paged by offset.
+create or replace function search_customers(p_query text,
+                                            p_fields text[] default array['name', 'email', 'phone', 'city'],
+                                            p_fuzzy boolean default true, p_limit int default 20, p_offset int default 0)
+returns table (cust_id bigint, name text, email text, phone text, city text, created_at timestamptz,
+               score real, matched text)
+language sql
+stable
+set pg_trgm.word_similarity_threshold = 0.3
+as $$
+    with q as (
+        select lower(btrim(regexp_replace(p_query, '\s+', ' ', 'g'))) as t,
+               regexp_replace(p_query, '\D', '', 'g') as d
+    ), p as (
+        select t, d, replace(replace(replace(t, '\', '\\'), '%', '\%'), '_', '\_') as t_like from q
+    ), hits as (
+        select c.cust_id, 'name' as field, customer_match_score(lower(c.name), p.t, p_fuzzy) as score
+        from customers c, p
+        where 'name' = any(p_fields) and p.t <> ''
+          and (lower(c.name) like '%' || p.t_like || '%' or (p_fuzzy and p.t <% lower(c.name)))
+        union all
+        select c.cust_id, 'email', customer_match_score(lower(c.email), p.t, p_fuzzy)
+        from customers c, p
+        where 'email' = any(p_fields) and p.t <> ''
+          and (lower(c.email) like '%' || p.t_like || '%' or (p_fuzzy and p.t <% lower(c.email)))
+        union all
+        select c.cust_id, 'city', customer_match_score(lower(c.city), p.t, p_fuzzy)
+        from customers c, p
+        where 'city' = any(p_fields) and p.t <> ''
+          and (lower(c.city) like '%' || p.t_like || '%' or (p_fuzzy and p.t <% lower(c.city)))
+        union all
+        -- Phones also match on any run of digits (numbers are often keyed without the country code).
+        select c.cust_id, 'phone', greatest(
+                   customer_match_score(regexp_replace(coalesce(c.phone, ''), '\D', '', 'g'), p.d, p_fuzzy),
+                   case when position(p.d in regexp_replace(coalesce(c.phone, ''), '\D', '', 'g')) > 0 then 0.85 else 0 end)
+        from customers c, p
+        where 'phone' = any(p_fields) and p.d <> ''
+          and (regexp_replace(coalesce(c.phone, ''), '\D', '', 'g') like '%' || p.d || '%'
+               or (p_fuzzy and p.d <% regexp_replace(coalesce(c.phone, ''), '\D', '', 'g')))
+    ), best as (
+        select distinct on (h.cust_id) h.cust_id, h.score, h.field
+        from hits h
+        where h.score > 0
+        order by h.cust_id, h.score desc
+    )
+    select c.cust_id, c.name::text, c.email::text, c.phone::text, c.city::text, c.created_at, b.score, b.field
+    from best b
+    join customers c on c.cust_id = b.cust_id
+    order by b.score desc, b.cust_id
+    limit p_limit offset p_offset;
+$$;
+
+-- Write-behind journal: mutations recorded locally by the till (src/services/write_behind.py)
+-- are replayed here in batches. Every entry carries an idempotency key; its outcome is kept
+-- so a batch re-sent after a crash or a lost response is answered without applying it twice.
+create table if not exists journal_applied (
+    key text primary key,
+    kind text not null,
+    status text not null,  -- applied | rejected
+    result jsonb,
+    error text,
+    applied_at timestamptz not null default now()
+);
+
+create or replace function journal_order_id(p_payload jsonb)
+returns bigint
+language plpgsql
+stable
+as $$
+declare
+    v_order_id bigint;
+begin
+    if p_payload->>'order_id' is not null then
+        return (p_payload->>'order_id')::bigint;
+    end if;
+    select (j.result->'order'->>'order_id')::bigint into v_order_id
+    from journal_applied j
+    where j.key = p_payload->>'order_key' and j.status = 'applied';
+    if v_order_id is null then
+        raise exception 'Order % was not placed', p_payload->>'order_key' using errcode = 'P0001';
+    end if;
+    return v_order_id;
+end;
+$$;
+
+-- One journal entry in the caller's transaction: order (stock, order and items together),
+-- payment (pay and complete), cancel (cancel and return stock) or restock.
+create or replace function apply_journal_entry(p_kind text, p_payload jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_lines jsonb;
+    v_items jsonb;
+    v_products jsonb;
+    v_order orders;
+    v_payment payments;
+    v_order_id bigint;
+begin
+    if p_kind = 'order' then
+        if not exists (select 1 from customers c where c.cust_id = (p_payload->>'customer')::bigint) then
+            raise exception 'Customer % does not exist', p_payload->>'customer' using errcode = 'P0001';
+        end if;
+        -- Lines without a quoted price are charged the current price.
+        select jsonb_agg(jsonb_build_object('prod_id', p.prod_id, 'quantity', (e->>'quantity')::int,
+                                            'price', coalesce((e->>'price')::numeric, p.price)) order by t.ord)
+        into v_lines
+        from jsonb_array_elements(p_payload->'items') with ordinality as t(e, ord)
+        join products p on p.prod_id = (t.e->>'prod_id')::bigint;
+        if coalesce(jsonb_array_length(v_lines), 0) <> jsonb_array_length(p_payload->'items') then
+            raise exception 'Product does not exist' using errcode = 'P0001';
+        end if;
+        select jsonb_agg(to_jsonb(r)) into v_products from reserve_stock(v_lines) r;
+        insert into orders (cust_id, total_amount, status)
+        select (p_payload->>'customer')::bigint, sum((l->>'quantity')::int * (l->>'price')::numeric), 'PLACED'
+        from jsonb_array_elements(v_lines) l
+        returning * into v_order;
+        with inserted as (
+            insert into order_items (order_id, prod_id, quantity, price)
+            select v_order.order_id, (l->>'prod_id')::bigint, (l->>'quantity')::int, (l->>'price')::numeric
+            from jsonb_array_elements(v_lines) l
+            returning *
+        )
+        select jsonb_agg(to_jsonb(inserted)) into v_items from inserted;
+        return jsonb_build_object('order', to_jsonb(v_order), 'items', v_items, 'products', v_products);
+    elsif p_kind = 'payment' then
+        v_order_id := journal_order_id(p_payload);
+        update orders o set status = 'COMPLETED' where o.order_id = v_order_id and o.status = 'PLACED'
+        returning * into v_order;
+        if not found then
+            raise exception 'Order % cannot be paid; status is not PLACED', v_order_id using errcode = 'P0001';
+        end if;
+        update payments p set status = 'PAID', method = p_payload->>'method'
+        where p.payment_id = (select min(x.payment_id) from payments x where x.order_id = v_order_id)
+        returning * into v_payment;
+        if not found then
+            insert into payments (order_id, amount, method, status)
+            values (v_order_id, v_order.total_amount, p_payload->>'method', 'PAID')
+            returning * into v_payment;
+        end if;
+        return jsonb_build_object('order', to_jsonb(v_order), 'payment', to_jsonb(v_payment));
+    elsif p_kind = 'cancel' then
+        v_order_id := journal_order_id(p_payload);
+        update orders o set status = 'CANCELLED' where o.order_id = v_order_id and o.status = 'PLACED'
+        returning * into v_order;
+        if not found then
+            raise exception 'Only orders with status ''PLACED'' can be cancelled' using errcode = 'P0001';
+        end if;
+        select jsonb_agg(to_jsonb(oi)) into v_items from order_items oi where oi.order_id = v_order_id;
+        select jsonb_agg(to_jsonb(r)) into v_products from release_stock(coalesce(v_items, '[]'::jsonb)) r;
+        return jsonb_build_object('order', to_jsonb(v_order), 'items', v_items, 'products', v_products);
+    elsif p_kind = 'restock' then
+        select jsonb_agg(to_jsonb(r)) into v_products from release_stock(p_payload->'items') r;
+        return jsonb_build_object('products', coalesce(v_products, '[]'::jsonb));
+    end if;
+    raise exception 'unknown journal entry kind %', p_kind using errcode = 'P0001';
+end;
+$$;
+
+-- Cancel a PLACED order and return its stock in one transaction, so a failed release
+-- cannot leave the order CANCELLED with its stock still taken.
+create or replace function cancel_order(p_order_id bigint)
+returns jsonb
+language sql
+as $$
+    select apply_journal_entry('cancel', jsonb_build_object('order_id', p_order_id));
+$$;
+
+-- Apply a batch of journal entries in order, each exactly once. An entry that fails a
+-- business rule is rolled back on its own and recorded as rejected; serialization
+-- failures and deadlocks abort the batch so the client retries it whole.
+create or replace function apply_journal(p_entries jsonb)
+returns table (key text, status text, result jsonb, error text)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    e jsonb;
+    done journal_applied;
+    v_result jsonb;
+begin
+    for e in select * from jsonb_array_elements(p_entries) loop
+        select * into done from journal_applied j where j.key = e->>'key';
+        if not found then
+            begin
+                v_result := apply_journal_entry(e->>'kind', e->'payload');
+                insert into journal_applied (key, kind, status, result)
+                values (e->>'key', e->>'kind', 'applied', v_result)
+                returning * into done;
+            exception
+                when serialization_failure or deadlock_detected then
+                    raise;
+                when others then
+                    insert into journal_applied (key, kind, status, error)
+                    values (e->>'key', e->>'kind', 'rejected', sqlerrm)
+                    returning * into done;
+            end;
+        end if;
+        key := done.key;
+        status := done.status;
+        result := done.result;
+        error := done.error;
+        return next;
+    end loop;
+end;
+$$;
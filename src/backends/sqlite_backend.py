@@ -0,0 +1,949 @@
+# src/backends/sqlite_backend.py
+import json
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from src.textsearch import CUSTOMER_SEARCH_FIELDS, MIN_FUZZY_LENGTH, normalize, rank, tokens
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    prod_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    sku TEXT NOT NULL UNIQUE,
+    price REAL NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0,
+    category TEXT,
+    reorder_threshold INTEGER NOT NULL DEFAULT 5
+);
+CREATE TABLE IF NOT EXISTS customers (
+    cust_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    phone TEXT,
+    city TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cust_id INTEGER NOT NULL REFERENCES customers(cust_id),
+    order_date TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    total_amount REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'PLACED'
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+    prod_id INTEGER NOT NULL REFERENCES products(prod_id),
+    quantity INTEGER NOT NULL,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+    amount REAL NOT NULL,
+    method TEXT,
+    status TEXT NOT NULL DEFAULT 'PENDING',
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+CREATE INDEX IF NOT EXISTS idx_orders_cust_id ON orders(cust_id);
+CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders(order_date);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_prod_id ON order_items(prod_id);
+CREATE INDEX IF NOT EXISTS idx_payments_order_id ON payments(order_id);
+CREATE TABLE IF NOT EXISTS sales_product_totals (
+    prod_id INTEGER PRIMARY KEY,
+    quantity_sold INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sales_customer_totals (
+    cust_id INTEGER PRIMARY KEY,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    total_spent REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sales_daily_totals (
+    day TEXT PRIMARY KEY,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    completed_revenue REAL NOT NULL DEFAULT 0,
+    cancelled_count INTEGER NOT NULL DEFAULT 0,
+    cancelled_revenue REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS journal_applied (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    applied_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_sales_product_totals_qty ON sales_product_totals(quantity_sold DESC);
+CREATE INDEX IF NOT EXISTS idx_sales_customer_totals_count ON sales_customer_totals(order_count);
+"""
+
+# Columns added after the first release: (table, column, definition), applied to older files.
+MIGRATIONS = [
+    ("products", "reorder_threshold", "INTEGER NOT NULL DEFAULT 5"),
+]
+
+POST_MIGRATION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_products_headroom ON products(stock - reorder_threshold, prod_id);
+"""
+
+# Trigram full-text index behind search_customers(), kept in step with customers by triggers.
+# Values are stored normalised (lower case, phone digits only) so matching is case-blind.
+# Needs FTS5 with the trigram tokenizer (SQLite >= 3.34); without it searches scan the table.
+_SEARCH_COLUMNS = {
+    "name": "lower({row}name)",
+    "email": "lower({row}email)",
+    "phone": "replace(replace(replace(replace(replace(replace(coalesce({row}phone, ''),"
+             " ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', '')",
+    "city": "lower(coalesce({row}city, ''))",
+}
+
+
+def _search_values(row: str = "") -> str:
+    return ", ".join(expr.format(row=row) for expr in _SEARCH_COLUMNS.values())
+
+
+_SEARCH_VALUES = _search_values("new.")
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS customer_search USING fts5(name, email, phone, city, tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS customers_search_insert AFTER INSERT ON customers BEGIN
+    INSERT INTO customer_search(rowid, name, email, phone, city) VALUES (new.cust_id, {_SEARCH_VALUES});
+END;
+CREATE TRIGGER IF NOT EXISTS customers_search_update AFTER UPDATE ON customers BEGIN
+    DELETE FROM customer_search WHERE rowid = old.cust_id;
+    INSERT INTO customer_search(rowid, name, email, phone, city) VALUES (new.cust_id, {_SEARCH_VALUES});
+END;
+CREATE TRIGGER IF NOT EXISTS customers_search_delete AFTER DELETE ON customers BEGIN
+    DELETE FROM customer_search WHERE rowid = old.cust_id;
+END;
+"""
+
+
+PRIMARY_KEYS = {
+    "products": "prod_id",
+    "customers": "cust_id",
+    "orders": "order_id",
+    "order_items": "item_id",
+    "payments": "payment_id",
+    "sales_product_totals": "prod_id",
+    "sales_customer_totals": "cust_id",
+    "sales_daily_totals": "day",
+}
+
+
+class BackendError(Exception):
+    """Raised for failed statements; mirrors the shape of postgrest's APIError."""
+
+    def __init__(self, message: str, code: str | None = None, details: str | None = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details
+
+
+class APIResponse:
+    def __init__(self, data: List[Dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _to_sql(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.astimezone()
+        value = value.astimezone(timezone.utc)
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}+00:00"
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _like_to_glob(pattern: str) -> str:
+    """A LIKE pattern (``%``, ``_``, backslash escapes) as a GLOB pattern, which has no escape character."""
+    out, chars = [], iter(pattern)
+    for ch in chars:
+        if ch == "\\":
+            ch = next(chars, "\\")
+            out.append(f"[{ch}]" if ch in "*?[" else ch)
+        elif ch in "*?[":
+            out.append(f"[{ch}]")
+        else:
+            out.append({"%": "*", "_": "?"}.get(ch, ch))
+    return "".join(out)
+
+
+_EMBED = re.compile(r"^(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)$", re.S)
+# Keys per IN query when filling embedded resources, under SQLite's bound-parameter limit.
+EMBED_CHUNK = 500
+
+
+def _split_select(columns: str) -> tuple:
+    """A postgrest select list as (plain columns, [(alias, table, inner select)]) for ``[alias:]table(...)``."""
+    plain, embeds, depth, start = [], [], 0, 0
+    for i, ch in enumerate(columns + ","):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            part, start = columns[start:i].strip(), i + 1
+            match = _EMBED.match(part)
+            if match:
+                embeds.append((match.group(1) or match.group(2), match.group(2), match.group(3)))
+            elif part:
+                plain.append(part)
+    return plain, embeds
+
+
+class SQLiteQuery:
+    """Subset of the postgrest query builder used by the DAOs, compiled to SQL."""
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        self.client = client
+        self.table_name = table
+        self.method = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[tuple] = []
+        self.orders: List[tuple] = []
+        self.limit_n: Optional[int] = None
+        self.offset_n: Optional[int] = None
+        self.count_mode: Optional[str] = None
+        self.on_conflict: Optional[str] = None
+        self.ignore_duplicates = False
+
+    def select(self, *columns: str, count: str | None = None):
+        self.columns = ",".join(columns) if columns else "*"
+        self.count_mode = count
+        return self
+
+    def insert(self, json: Dict | List[Dict], **kwargs):
+        self.method = "insert"
+        self.payload = json
+        return self
+
+    def upsert(self, json: Dict | List[Dict], on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        self.method = "insert"
+        self.payload = json
+        self.on_conflict = on_conflict or PRIMARY_KEYS.get(self.table_name, "id")
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json: Dict, **kwargs):
+        self.method = "update"
+        self.payload = json
+        return self
+
+    def delete(self, **kwargs):
+        self.method = "delete"
+        return self
+
+    def _filter(self, column: str, op: str, value: Any):
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "<=", value)
+
+    def like(self, column: str, pattern: str):
+        return self._filter(column, "LIKE", pattern.replace("*", "%"))
+
+    def ilike(self, column: str, pattern: str):
+        return self._filter(column, "ILIKE", pattern.replace("*", "%"))
+
+    def in_(self, column: str, values):
+        return self._filter(column, "IN", list(values))
+
+    def is_(self, column: str, value: Any):
+        return self._filter(column, "IS", value)
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs):
+        self.limit_n = size
+        return self
+
+    def offset(self, size: int):
+        self.offset_n = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self.offset_n = start
+        self.limit_n = end - start + 1
+        return self
+
+    def _where(self) -> tuple:
+        clauses, params = [], []
+        for column, op, value in self.filters:
+            col = _quote(column)
+            if op == "IN":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{col} IN ({','.join('?' * len(value))})")
+                params.extend(_to_sql(v) for v in value)
+            elif op == "IS":
+                clauses.append(f"{col} IS {'NULL' if value in (None, 'null') else '?'}")
+                if value not in (None, "null"):
+                    params.append(_to_sql(value))
+            elif op == "ILIKE":
+                clauses.append(f"{col} LIKE ? ESCAPE '\\'")
+                params.append(value)
+            elif op == "LIKE":
+                clauses.append(f"{col} GLOB ?")  # case-sensitive, like postgres LIKE
+                params.append(_like_to_glob(value))
+            else:
+                clauses.append(f"{col} {op} ?")
+                params.append(_to_sql(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _returning(self, extra: List[str] = ()) -> str:
+        plain = _split_select(self.columns)[0]
+        if "*" in plain or not plain and not extra:
+            return "*"
+        return ", ".join(_quote(c) for c in dict.fromkeys(plain + list(extra)))
+
+    def _relation(self, table: str) -> tuple:
+        """(local column, remote column, to-many) joining this table to ``table``, from the foreign keys."""
+        for fk in self.client.foreign_keys(self.table_name):
+            if fk["table"] == table:
+                return fk["from"], fk["to"], False
+        for fk in self.client.foreign_keys(table):
+            if fk["table"] == self.table_name:
+                return fk["to"], fk["from"], True
+        raise BackendError(f"Could not find a relationship between '{self.table_name}' and '{table}' in the schema cache",
+                           code="PGRST200")
+
+    def _embeds(self) -> List[tuple]:
+        """Embedded resources as (alias, query, local column, remote column, to-many, nested embeds)."""
+        plan = []
+        for alias, table, inner in _split_select(self.columns)[1]:
+            local, remote, many = self._relation(table)
+            child = SQLiteQuery(self.client, table).select(inner)
+            if many:
+                child.order(PRIMARY_KEYS.get(table, remote))
+            plan.append((alias, child, local, remote, many, child._embeds()))
+        return plan
+
+    def _read(self, conn: sqlite3.Connection, embeds: List[tuple], key: str | None = None) -> List[Dict]:
+        """
+        Run this select on ``conn`` and fill each embedded resource with one IN query per
+        level, as PostgREST answers ``select("*, customers(*), order_items(*, products(name))")``
+        in one request. ``key`` is a column the caller needs to group the rows by.
+        """
+        plain = _split_select(self.columns)[0]
+        joins = [local for _, _, local, _, _, _ in embeds]
+        rows = []
+        for sql, params in self._compile(joins + ([key] if key else [])):
+            rows.extend(dict(r) for r in conn.execute(sql, params).fetchall())
+        for alias, child, local, remote, many, nested in embeds:
+            keys = list(dict.fromkeys(r[local] for r in rows if r[local] is not None))
+            found: Dict[Any, List[Dict]] = {}
+            for start in range(0, len(keys), EMBED_CHUNK):
+                child.filters = [(remote, "IN", keys[start:start + EMBED_CHUNK])]
+                for row in child._read(conn, nested, remote):
+                    found.setdefault(row[remote], []).append(row)
+            child_plain = _split_select(child.columns)[0]
+            if "*" not in child_plain and remote not in child_plain:
+                for group in found.values():
+                    for row in group:
+                        del row[remote]
+            for row in rows:
+                group = found.get(row[local], [])
+                row[alias] = group if many else (group[0] if group else None)
+        if "*" not in plain:
+            for column in set(joins) - set(plain) - {key}:
+                for row in rows:
+                    del row[column]
+        return rows
+
+    def _compile(self, extra: List[str] = ()) -> List[tuple]:
+        table = _quote(self.table_name)
+        where, params = self._where()
+        if self.method == "select":
+            sql = f"SELECT {self._returning(extra)} FROM {table}{where}"
+            if self.orders:
+                sql += " ORDER BY " + ", ".join(f"{_quote(c)} {'DESC' if d else 'ASC'}" for c, d in self.orders)
+            if self.limit_n is not None or self.offset_n is not None:
+                sql += " LIMIT ? OFFSET ?"
+                params += [self.limit_n if self.limit_n is not None else -1, self.offset_n or 0]
+            return [(sql, params)]
+        if self.method == "insert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            statements = []
+            for row in rows:
+                cols = ", ".join(_quote(c) for c in row)
+                marks = ", ".join("?" * len(row))
+                sql = f"INSERT INTO {table} ({cols}) VALUES ({marks})"
+                if self.on_conflict:
+                    target = ", ".join(_quote(c.strip()) for c in self.on_conflict.split(","))
+                    updates = ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in row)
+                    if self.ignore_duplicates or not updates:
+                        sql += f" ON CONFLICT ({target}) DO NOTHING"
+                    else:
+                        sql += f" ON CONFLICT ({target}) DO UPDATE SET {updates}"
+                sql += " RETURNING *"
+                statements.append((sql, [_to_sql(v) for v in row.values()]))
+            return statements
+        if self.method == "update":
+            sets = ", ".join(f"{_quote(c)} = ?" for c in self.payload)
+            sql = f"UPDATE {table} SET {sets}{where} RETURNING *"
+            return [(sql, [_to_sql(v) for v in self.payload.values()] + params)]
+        if self.method == "delete":
+            return [(f"DELETE FROM {table}{where} RETURNING *", params)]
+        raise BackendError(f"Unsupported method: {self.method}")
+
+    def execute(self) -> APIResponse:
+        if self.method == "select":
+            embeds = self._embeds()
+            with self.client._transaction() as conn:
+                data = self._read(conn, embeds)
+        else:
+            data = self.client._run(self._compile(), write=True)
+            self.client.restore_real(self.table_name, data)
+        count = None
+        if self.count_mode:
+            where, params = self._where()
+            count = self.client._run([(f"SELECT COUNT(*) AS n FROM {_quote(self.table_name)}{where}", params)])[0]["n"]
+        return APIResponse(data, count)
+
+
+RPC_FUNCTIONS: Dict[str, tuple] = {}
+
+
+def rpc_function(name: str, returns: str | None = None):
+    """Register a Python implementation of a database function for SQLiteClient.rpc().
+
+    ``returns`` names the table whose rows the function yields, if any.
+    """
+    def register(fn: Callable):
+        RPC_FUNCTIONS[name] = (fn, returns)
+        return fn
+    return register
+
+
+def _summed_items(items: List[Dict]) -> List[tuple]:
+    totals: Dict[int, int] = {}
+    for item in items:
+        totals[int(item["prod_id"])] = totals.get(int(item["prod_id"]), 0) + int(item["quantity"])
+    return sorted(totals.items())
+
+
+@rpc_function("reserve_stock", returns="products")
+def _reserve_stock(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    rows = []
+    for prod_id, quantity in _summed_items(params["p_items"]):
+        row = conn.execute(
+            "UPDATE products SET stock = stock - ? WHERE prod_id = ? AND stock >= ? RETURNING *",
+            (quantity, prod_id, quantity),
+        ).fetchone()
+        if row is None:
+            raise BackendError(f"insufficient stock for product {prod_id}", code="P0001", details=str(prod_id))
+        rows.append(dict(row))
+    return rows
+
+
+@rpc_function("release_stock", returns="products")
+def _release_stock(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    rows = []
+    for prod_id, quantity in _summed_items(params["p_items"]):
+        row = conn.execute(
+            "UPDATE products SET stock = stock + ? WHERE prod_id = ? RETURNING *", (quantity, prod_id)
+        ).fetchone()
+        if row is not None:
+            rows.append(dict(row))
+    return rows
+
+
+@rpc_function("top_selling_products")
+def _top_selling_products(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    rows = conn.execute(
+        "SELECT prod_id, SUM(quantity) AS total_quantity FROM order_items"
+        " GROUP BY prod_id ORDER BY total_quantity DESC, prod_id LIMIT ?",
+        (params.get("p_limit", 5),),
+    )
+    return [dict(r) for r in rows]
+
+
+@rpc_function("revenue_since")
+def _revenue_since(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    since = _to_sql(datetime.fromisoformat(params["p_since"]))
+    row = conn.execute("SELECT COALESCE(SUM(total_amount), 0) AS revenue FROM orders WHERE order_date >= ?", (since,)).fetchone()
+    return [{"revenue": float(row["revenue"])}]
+
+
+@rpc_function("orders_per_customer")
+def _orders_per_customer(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    rows = conn.execute(
+        "SELECT cust_id, COUNT(*) AS total_orders FROM orders GROUP BY cust_id HAVING COUNT(*) >= ? ORDER BY cust_id",
+        (params.get("p_min_orders", 1),),
+    )
+    return [dict(r) for r in rows]
+
+
+@rpc_function("sales_report")
+def _sales_report(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    reports = params["p_reports"]
+    where, args = [], []
+    for column_op, key in (("order_date >= ?", "p_since"), ("order_date < ?", "p_until")):
+        if params.get(key):
+            where.append(column_op)
+            args.append(_to_sql(datetime.fromisoformat(params[key])))
+    scope = " WHERE " + " AND ".join(where) if where else ""
+    results = {}
+    if {"revenue", "orders", "frequent_customers"} & set(reports):
+        revenue_since = params.get("p_revenue_since")
+        revenue_since = _to_sql(datetime.fromisoformat(revenue_since)) if revenue_since else ""
+        rows = conn.execute(
+            "SELECT cust_id, COUNT(*) AS total_orders,"
+            f" SUM(CASE WHEN order_date >= ? THEN total_amount ELSE 0 END) AS revenue FROM orders{scope}"
+            " GROUP BY cust_id ORDER BY cust_id", [revenue_since, *args]).fetchall()
+        results["revenue"] = float(sum(r["revenue"] or 0 for r in rows))
+        results["orders"] = [{"cust_id": r["cust_id"], "total_orders": r["total_orders"]} for r in rows]
+        results["frequent_customers"] = [r for r in results["orders"]
+                                         if r["total_orders"] >= params.get("p_min_orders", 3)]
+    if "top_products" in reports:
+        dated = f" WHERE order_id IN (SELECT order_id FROM orders{scope})" if where else ""
+        rows = conn.execute(
+            f"SELECT prod_id, SUM(quantity) AS total_quantity FROM order_items{dated}"
+            " GROUP BY prod_id ORDER BY total_quantity DESC, prod_id LIMIT ?", [*args, params.get("p_top", 5)])
+        results["top_products"] = [dict(r) for r in rows]
+    return [{"report": name, "result": results[name]} for name in reports]
+
+
+DAILY_COLUMNS = {
+    "order_created": ("order_count", "revenue"),
+    "order_completed": ("completed_count", "completed_revenue"),
+    "order_cancelled": ("cancelled_count", "cancelled_revenue"),
+}
+
+
+@rpc_function("apply_sales_event")
+def _apply_sales_event(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    event, order = params["p_event"], params["p_order"]
+    if event not in DAILY_COLUMNS:
+        raise BackendError(f"unknown sales event {event}", code="P0001")
+    amount = float(order["total_amount"] or 0)
+    if event == "order_created":
+        for item in params.get("p_items") or []:
+            conn.execute(
+                "INSERT INTO sales_product_totals (prod_id, quantity_sold, revenue) VALUES (?, ?, ?)"
+                " ON CONFLICT (prod_id) DO UPDATE SET quantity_sold = quantity_sold + excluded.quantity_sold,"
+                " revenue = revenue + excluded.revenue",
+                (item["prod_id"], item["quantity"], item["quantity"] * item["price"]),
+            )
+        conn.execute(
+            "INSERT INTO sales_customer_totals (cust_id, order_count, total_spent) VALUES (?, 1, ?)"
+            " ON CONFLICT (cust_id) DO UPDATE SET order_count = order_count + 1, total_spent = total_spent + excluded.total_spent",
+            (order["cust_id"], amount),
+        )
+    count_col, revenue_col = DAILY_COLUMNS[event]
+    conn.execute(
+        f"INSERT INTO sales_daily_totals (day, {count_col}, {revenue_col}) VALUES (?, 1, ?)"
+        f" ON CONFLICT (day) DO UPDATE SET {count_col} = {count_col} + 1, {revenue_col} = {revenue_col} + excluded.{revenue_col}",
+        (_to_sql(datetime.fromisoformat(order["order_date"]))[:10], amount),
+    )
+    return []
+
+
+@rpc_function("apply_sales_events")
+def _apply_sales_events(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    if params["p_event"] == "order_created":
+        raise BackendError("apply_sales_events takes status events only", code="P0001")
+    for order in params["p_orders"]:
+        _apply_sales_event(conn, {"p_event": params["p_event"], "p_order": order})
+    return []
+
+
+@rpc_function("rebuild_sales_aggregates")
+def _rebuild_sales_aggregates(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    conn.execute("DELETE FROM sales_product_totals")
+    conn.execute("DELETE FROM sales_customer_totals")
+    conn.execute("DELETE FROM sales_daily_totals")
+    conn.execute(
+        "INSERT INTO sales_product_totals (prod_id, quantity_sold, revenue)"
+        " SELECT prod_id, SUM(quantity), SUM(quantity * price) FROM order_items GROUP BY prod_id"
+    )
+    conn.execute(
+        "INSERT INTO sales_customer_totals (cust_id, order_count, total_spent)"
+        " SELECT cust_id, COUNT(*), SUM(total_amount) FROM orders GROUP BY cust_id"
+    )
+    conn.execute(
+        "INSERT INTO sales_daily_totals SELECT substr(order_date, 1, 10), COUNT(*), SUM(total_amount),"
+        " SUM(status = 'COMPLETED'), SUM(CASE WHEN status = 'COMPLETED' THEN total_amount ELSE 0 END),"
+        " SUM(status = 'CANCELLED'), SUM(CASE WHEN status = 'CANCELLED' THEN total_amount ELSE 0 END)"
+        " FROM orders GROUP BY substr(order_date, 1, 10)"
+    )
+    return []
+
+
+@rpc_function("low_stock_products")
+def _low_stock_products(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    after_headroom, after_id = params.get("p_after_headroom"), params.get("p_after_id")
+    keyset = "AND (stock - reorder_threshold, prod_id) > (?, ?)" if after_headroom is not None else ""
+    args = [after_headroom, after_id] if after_headroom is not None else []
+    rows = conn.execute(
+        "SELECT prod_id, name, sku, stock, reorder_threshold, stock - reorder_threshold AS headroom FROM products"
+        f" WHERE stock - reorder_threshold <= 0 {keyset}"
+        " ORDER BY stock - reorder_threshold, prod_id LIMIT ?",
+        (*args, params.get("p_limit", 1000)),
+    )
+    return [dict(r) for r in rows]
+
+
+def _row(row, *real: str) -> Dict:
+    row = dict(row)
+    for col in real:
+        if row.get(col) is not None:
+            row[col] = float(row[col])
+    return row
+
+
+def _journal_order_id(conn: sqlite3.Connection, payload: Dict) -> int:
+    if payload.get("order_id") is not None:
+        return int(payload["order_id"])
+    done = conn.execute("SELECT result FROM journal_applied WHERE key = ? AND status = 'applied'",
+                        (payload.get("order_key"),)).fetchone()
+    if done is None:
+        raise BackendError(f"Order {payload.get('order_key')} was not placed", code="P0001")
+    return json.loads(done["result"])["order"]["order_id"]
+
+
+def _apply_journal_entry(conn: sqlite3.Connection, kind: str, payload: Dict) -> Dict:
+    if kind == "order":
+        customer = int(payload["customer"])
+        if conn.execute("SELECT 1 FROM customers WHERE cust_id = ?", (customer,)).fetchone() is None:
+            raise BackendError(f"Customer {customer} does not exist", code="P0001")
+        prices = {r["prod_id"]: r["price"] for r in conn.execute(
+            f"SELECT prod_id, price FROM products WHERE prod_id IN ({', '.join('?' * len(payload['items']))})",
+            [i["prod_id"] for i in payload["items"]])}
+        missing = [i["prod_id"] for i in payload["items"] if i["prod_id"] not in prices]
+        if missing:
+            raise BackendError(f"Product {missing[0]} does not exist", code="P0001")
+        lines = [(i["prod_id"], i["quantity"], prices[i["prod_id"]] if i.get("price") is None else i["price"])
+                 for i in payload["items"]]
+        products = [_row(r, "price") for r in _reserve_stock(conn, {"p_items": payload["items"]})]
+        order = conn.execute("INSERT INTO orders (cust_id, total_amount) VALUES (?, ?) RETURNING *",
+                             (customer, sum(q * p for _, q, p in lines))).fetchone()
+        items = [_row(conn.execute("INSERT INTO order_items (order_id, prod_id, quantity, price) VALUES (?, ?, ?, ?)"
+                                   " RETURNING *", (order["order_id"], *line)).fetchone(), "price") for line in lines]
+        return {"order": _row(order, "total_amount"), "items": items, "products": products}
+    if kind == "payment":
+        order_id = _journal_order_id(conn, payload)
+        order = conn.execute("UPDATE orders SET status = 'COMPLETED' WHERE order_id = ? AND status = 'PLACED'"
+                             " RETURNING *", (order_id,)).fetchone()
+        if order is None:
+            raise BackendError(f"Order {order_id} cannot be paid; status is not PLACED", code="P0001")
+        payment = conn.execute(
+            "UPDATE payments SET status = 'PAID', method = ? WHERE payment_id ="
+            " (SELECT min(payment_id) FROM payments WHERE order_id = ?) RETURNING *",
+            (payload.get("method"), order_id)).fetchone()
+        if payment is None:
+            payment = conn.execute("INSERT INTO payments (order_id, amount, method, status) VALUES (?, ?, ?, 'PAID')"
+                                   " RETURNING *", (order_id, order["total_amount"], payload.get("method"))).fetchone()
+        return {"order": _row(order, "total_amount"), "payment": _row(payment, "amount")}
+    if kind == "cancel":
+        order_id = _journal_order_id(conn, payload)
+        order = conn.execute("UPDATE orders SET status = 'CANCELLED' WHERE order_id = ? AND status = 'PLACED'"
+                             " RETURNING *", (order_id,)).fetchone()
+        if order is None:
+            raise BackendError("Only orders with status 'PLACED' can be cancelled", code="P0001")
+        items = [_row(r, "price") for r in conn.execute("SELECT * FROM order_items WHERE order_id = ?", (order_id,))]
+        products = [_row(r, "price") for r in _release_stock(conn, {"p_items": items})]
+        return {"order": _row(order, "total_amount"), "items": items, "products": products}
+    if kind == "restock":
+        return {"products": [_row(r, "price") for r in _release_stock(conn, {"p_items": payload["items"]})]}
+    raise BackendError(f"unknown journal entry kind {kind}", code="P0001")
+
+
+@rpc_function("cancel_order")
+def _cancel_order(conn: sqlite3.Connection, params: Dict) -> Dict:
+    return _apply_journal_entry(conn, "cancel", {"order_id": params["p_order_id"]})
+
+
+@rpc_function("apply_journal")
+def _apply_journal(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    outcomes = []
+    for entry in params["p_entries"]:
+        key, kind = entry["key"], entry["kind"]
+        done = conn.execute("SELECT key, status, result, error FROM journal_applied WHERE key = ?", (key,)).fetchone()
+        if done is None:
+            conn.execute("SAVEPOINT journal_entry")
+            try:
+                result, error = _apply_journal_entry(conn, kind, entry["payload"]), None
+                conn.execute("RELEASE journal_entry")
+            except Exception as e:
+                # Like the SQL function's "when others": a bad entry is rejected, the batch goes on.
+                # Lock errors still abort the batch so it is retried.
+                if isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+                    raise
+                conn.execute("ROLLBACK TO journal_entry")
+                conn.execute("RELEASE journal_entry")
+                result, error = None, str(e) if isinstance(e, (BackendError, sqlite3.Error)) else f"{type(e).__name__}: {e}"
+            conn.execute("INSERT INTO journal_applied (key, kind, status, result, error) VALUES (?, ?, ?, ?, ?)",
+                         (key, kind, "rejected" if error else "applied",
+                          None if result is None else json.dumps(result), error))
+            done = {"key": key, "status": "rejected" if error else "applied", "result": result, "error": error}
+        else:
+            done = {**dict(done), "result": done["result"] and json.loads(done["result"])}
+        outcomes.append(done)
+    return outcomes
+
+
+def _fts_term(field: str, term: str, fuzzy: bool) -> str:
+    # Trigram FTS: a quoted string matches as a substring; fuzzy also accepts any shared trigram.
+    grams = {term}
+    if fuzzy:
+        grams.update(w[i:i + 3] for w in tokens(field, term) for i in range(len(w) - 2))
+    return f"{field} : (" + " OR ".join('"' + g.replace('"', '""') + '"' for g in sorted(grams)) + ")"
+
+
+def _prefix_score_sql(field: str, column: str) -> str:
+    """The prefix tiers of textsearch.score (1.0 / 0.9 / 0.85, else 0) over a normalised column."""
+    if field == "phone":
+        word = f"instr({column}, :{field}) > 0"
+    else:
+        spaced = column
+        for separator in "@._+-":
+            spaced = f"replace({spaced}, '{separator}', ' ')"
+        word = f"instr(' ' || {spaced}, ' ' || :{field}) > 0"
+    return (f"CASE WHEN instr({column}, :{field}) = 0 THEN 0 WHEN {column} = :{field} THEN 1.0"
+            f" WHEN substr({column}, 1, length(:{field})) = :{field} THEN 0.9 WHEN {word} THEN 0.85 ELSE 0 END")
+
+
+@rpc_function("search_customers")
+def _search_customers(conn: sqlite3.Connection, params: Dict) -> List[Dict]:
+    query = params.get("p_query") or ""
+    fuzzy = params.get("p_fuzzy", True)
+    limit, offset = params.get("p_limit", 20), params.get("p_offset", 0)
+    fields = [f for f in params.get("p_fields") or CUSTOMER_SEARCH_FIELDS if f in CUSTOMER_SEARCH_FIELDS]
+    terms = {f: t for f, t in ((f, normalize(f, query)) for f in fields) if t}
+    if not terms:
+        return []
+    wanted = offset + limit
+    indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'customer_search'").fetchone()
+    trigram_ready = indexed and min(map(len, terms.values())) >= MIN_FUZZY_LENGTH
+    # customer_search holds normalised values; without it they are computed from customers.
+    source = "customer_search" if indexed else "customers"
+    columns = {f: f if indexed else _SEARCH_COLUMNS[f].format(row="") for f in terms}
+
+    # Prefix matches outrank any fuzzy match, so SQLite ranks and cuts them on its own.
+    scores = {f: _prefix_score_sql(f, col) for f, col in columns.items()}
+    if trigram_ready:
+        where = "customer_search MATCH :match"
+        match = " OR ".join(_fts_term(f, t, False) for f, t in terms.items())
+    else:
+        where = " OR ".join(f"instr({col}, :{f}) > 0" for f, col in columns.items())
+        match = None
+    best = scores[next(iter(scores))] if len(scores) == 1 else f"max({', '.join(scores.values())})"
+    ranked = conn.execute(
+        f"SELECT * FROM (SELECT rowid AS cust_id, {best} AS score,"
+        f" {', '.join(f'{sql} AS {f}' for f, sql in scores.items())} FROM {source} WHERE {where})"
+        " WHERE score > 0 ORDER BY score DESC, cust_id LIMIT :wanted",
+        {**terms, "match": match, "wanted": wanted},
+    ).fetchall()
+    top = [(r["cust_id"], r["score"], next(f for f in terms if r[f] == r["score"])) for r in ranked]
+    rows = _customers_by_ids(conn, [c for c, _, _ in top])
+    results = [{**rows[c], "score": score, "matched": field} for c, score, field in top]
+
+    if fuzzy and len(results) < wanted and max(map(len, terms.values())) >= MIN_FUZZY_LENGTH:
+        if trigram_ready:
+            ids = [r[0] for r in conn.execute(
+                "SELECT rowid FROM customer_search WHERE customer_search MATCH ? ORDER BY rank LIMIT ?",
+                (" OR ".join(_fts_term(f, t, True) for f, t in terms.items()), max(100, 5 * wanted)))]
+            candidates = _customers_by_ids(conn, ids).values()
+        else:
+            candidates = (dict(r) for r in conn.execute(f"{_CUSTOMER_COLUMNS} FROM customers"))
+        seen = {c for c, _, _ in top}
+        fuzzy_rows = rank((r for r in candidates if r["cust_id"] not in seen), query, list(terms), fuzzy)
+        results += fuzzy_rows[: wanted - len(results)]
+    return results[offset: offset + limit]
+
+
+_CUSTOMER_COLUMNS = "SELECT cust_id, name, email, phone, city, created_at"
+
+
+def _customers_by_ids(conn: sqlite3.Connection, ids: List[int]) -> Dict[int, Dict]:
+    rows = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        sql = f"{_CUSTOMER_COLUMNS} FROM customers WHERE cust_id IN ({', '.join('?' * len(chunk))})"
+        rows.update((r["cust_id"], dict(r)) for r in conn.execute(sql, chunk))
+    return rows
+
+
+class SQLiteRPC:
+    def __init__(self, client: "SQLiteClient", fn: str, params: Dict):
+        self.client = client
+        self.table_name = fn
+        self.method = "rpc"
+        self.params = params
+
+    def execute(self) -> APIResponse:
+        if self.table_name not in RPC_FUNCTIONS:
+            raise BackendError(f"Could not find the function {self.table_name}", code="PGRST202")
+        fn, returns = RPC_FUNCTIONS[self.table_name]
+        with self.client._transaction(write=True) as conn:
+            data = fn(conn, self.params)
+        if returns:
+            self.client.restore_real(returns, data)
+        return APIResponse(data)
+
+
+class SQLiteClient:
+    """Embedded stand-in for the supabase client exposing the same ``table()`` API.
+
+    File-backed databases keep a pool of ``pool_size`` reusable connections in WAL
+    mode; ``:memory:`` databases share a single connection.
+    """
+
+    def __init__(self, path: str = ":memory:", pool_size: int = 1, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self.pool_size = 1 if path == ":memory:" else max(1, pool_size)
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._created = 0
+        self._lock = threading.Lock()
+        self._real_columns: Dict[str, set] = {}
+        self._foreign_keys: Dict[str, List[Dict]] = {}
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        for table, column, definition in MIGRATIONS:
+            if column not in {c["name"] for c in conn.execute(f"PRAGMA table_info({_quote(table)})")}:
+                conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} {definition}")
+        conn.executescript(POST_MIGRATION_SCHEMA)
+        self._create_search_index(conn)
+        self._pool.put(conn)
+
+    @staticmethod
+    def _create_search_index(conn: sqlite3.Connection):
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'customer_search'").fetchone():
+            return
+        backfill = ("INSERT INTO customer_search(rowid, name, email, phone, city)"
+                    f" SELECT cust_id, {_search_values()} FROM customers;")
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE;{SEARCH_SCHEMA}{backfill}COMMIT;")
+        except sqlite3.Error:  # no FTS5 trigram tokenizer in this build, or another process created it first
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        self._created += 1
+        self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                conn = self._connect() if self._created < self.pool_size else None
+            if conn is None:
+                conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def table(self, name: str) -> SQLiteQuery:
+        return SQLiteQuery(self, name)
+
+    def restore_real(self, table: str, rows: List[Dict]):
+        """RETURNING hands back integral REAL values as ints; restore the column type."""
+        real = self.real_columns(table)
+        for row in rows:
+            for col in real.intersection(row):
+                if isinstance(row[col], int):
+                    row[col] = float(row[col])
+
+    def real_columns(self, table: str) -> set:
+        cols = self._real_columns.get(table)
+        if cols is None:
+            info = self._run([(f"PRAGMA table_info({_quote(table)})", [])])
+            cols = self._real_columns[table] = {c["name"] for c in info if c["type"].upper() == "REAL"}
+        return cols
+
+    def foreign_keys(self, table: str) -> List[Dict]:
+        keys = self._foreign_keys.get(table)
+        if keys is None:
+            keys = self._foreign_keys[table] = self._run([(f"PRAGMA foreign_key_list({_quote(table)})", [])])
+        return keys
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Dict | None = None) -> "SQLiteRPC":
+        return SQLiteRPC(self, fn, params or {})
+
+    @contextmanager
+    def _transaction(self, write: bool = False):
+        with self._connection() as conn:
+            try:
+                conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+                yield conn
+                conn.execute("COMMIT")
+            except BackendError:
+                conn.execute("ROLLBACK")
+                raise
+            except sqlite3.IntegrityError as e:
+                conn.execute("ROLLBACK")
+                raise BackendError(str(e), code="23505" if "UNIQUE" in str(e) else "23503")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise BackendError(str(e), code="55P03" if "locked" in str(e) else None)  # lock_not_available
+            except BaseException:
+                # Never hand a connection still inside BEGIN (and holding the write lock) back to the pool.
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _run(self, statements: List[tuple], write: bool = False) -> List[Dict]:
+        rows: List[Dict] = []
+        with self._transaction(write) as conn:
+            for sql, params in statements:
+                rows.extend(dict(r) for r in conn.execute(sql, params).fetchall())
+        return rows
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
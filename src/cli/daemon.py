@@ -0,0 +1,152 @@
+# src/cli/daemon.py
+import io
+import json
+import os
+import shlex
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from typing import List, Optional
+
+# Options naming files or directories; the daemon has its own working directory.
+PATH_OPTIONS = ("--file", "--result", "--out", "--trace", "--snapshot")
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout/sys.stderr stand-in that writes to a per-thread buffer while a request runs."""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.default).write(text)
+
+    def flush(self):
+        (getattr(self.local, "buffer", None) or self.default).flush()
+
+
+def _install_thread_output():
+    if not isinstance(sys.stdout, _ThreadOutput):
+        sys.stdout = _ThreadOutput(sys.stdout)
+    if not isinstance(sys.stderr, _ThreadOutput):
+        sys.stderr = _ThreadOutput(sys.stderr)
+
+
+def run_captured(cli, argv: List[str]) -> dict:
+    """Run one command on ``cli`` in this thread, returning its exit status and output."""
+    out, err = io.StringIO(), io.StringIO()
+    sys.stdout.local.buffer, sys.stderr.local.buffer = out, err
+    try:
+        status = cli.execute(argv)
+    except Exception:
+        traceback.print_exc(file=err)
+        status = 1
+    finally:
+        sys.stdout.local.buffer = sys.stderr.local.buffer = None
+    return {"status": status, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+def make_server(cli, socket_path: str) -> socketserver.UnixStreamServer:
+    """A threaded server answering newline-delimited JSON requests ``{"argv": [...]}`` on a Unix socket."""
+    _install_thread_output()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            try:
+                argv = json.loads(line)["argv"]
+            except (ValueError, KeyError, TypeError):
+                response = {"status": 2, "stdout": "", "stderr": "bad request\n"}
+            else:
+                if argv[:1] in (["serve"], ["shell"]):
+                    response = {"status": 2, "stdout": "", "stderr": f"{argv[0]} is not available through the daemon\n"}
+                else:
+                    response = run_captured(cli, argv)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = Server(socket_path, Handler)
+    os.chmod(socket_path, 0o600)
+    return server
+
+
+def serve(cli, socket_path: str):
+    """Answer requests on a Unix socket until interrupted."""
+    with make_server(cli, socket_path) as server:
+        print(f"retail-cli daemon listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def absolute_paths(argv: List[str], cwd: str) -> List[str]:
+    """``argv`` with the values of PATH_OPTIONS resolved against ``cwd``."""
+    resolved = []
+    for i, arg in enumerate(argv):
+        name, eq, value = arg.partition("=")
+        if eq and name in PATH_OPTIONS:
+            arg = f"{name}={os.path.join(cwd, value)}"
+        elif i and argv[i - 1] in PATH_OPTIONS:
+            arg = os.path.join(cwd, arg)
+        resolved.append(arg)
+    return resolved
+
+
+def forward(socket_path: str, argv: List[str]) -> Optional[int]:
+    """Send a command to a running daemon; None if no daemon is reachable."""
+    if not os.path.exists(socket_path):
+        return None
+    argv = absolute_paths(argv, os.getcwd())
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(socket_path)
+            conn.sendall((json.dumps({"argv": argv}) + "\n").encode())
+            with conn.makefile("rb") as reader:
+                response = json.loads(reader.readline())
+    except (OSError, ValueError):
+        return None
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["status"]
+
+
+def shell(cli):
+    """Interactive loop running commands against one warm RetailCLI instance."""
+    try:
+        import readline  # noqa: F401  (line editing and history when available)
+    except ImportError:
+        pass
+    print("retail-cli shell. Type a command such as 'product list --limit 5', 'help' or 'exit'.")
+    while True:
+        try:
+            line = input("retail> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if not line:
+            continue
+        if line in ("exit", "quit"):
+            return
+        if line == "help":
+            cli.parser.print_help()
+            continue
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print("Error:", e)
+            continue
+        if argv[0] in ("serve", "shell"):
+            print(f"Error: {argv[0]} is not available inside the shell")
+            continue
+        cli.execute(argv)
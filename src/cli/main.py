@@ -1,38 +1,209 @@
 # src/cli/main.py
 import argparse
 import json
+import sys
+import threading
+from datetime import datetime, timezone
+from functools import cached_property
+from itertools import islice
 
 from src.dao.product_dao import ProductDAO
 from src.dao.customer_dao import CustomerDAO
 from src.dao.order_dao import OrderDAO
 from src.dao.payment_dao import PaymentDAO
 
-from src.services.product_service import ProductService
+from src.services.product_service import ProductService, ProductError
 from src.services.customer_service import CustomerService, CustomerError
-from src.services.order_service import OrderService
+from src.services.order_service import OrderService, OrderError
 from src.services.payment_service import PaymentService, PaymentError
-from src.services.report_service import ReportService
+from src.services.report_service import ReportService, ReportError, REPORTS
+from src.services.import_service import ImportService, BulkImportError
+from src.services.order_batch_service import OrderBatchService
+from src.services.low_stock_service import LowStockWatcher
+from src.services.customer_search_index import CustomerSearchIndex
+from src.services.sales_aggregate_service import SalesAggregateService
+from src.services.snapshot import Snapshot, SnapshotError, export_snapshot, FORMATS as SNAPSHOT_FORMATS
+from src.services.write_behind import WriteJournal, WriteBehindService, JournalError
+from src.dao.journal_dao import JournalDAO
+from src.dao.export_dao import ExportDAO, EXPORT_TABLES
+from src.dao.base_dao import dispatcher
+from src.dao.aggregate_dao import SalesAggregateDAO
+from src.dao.cache import CachedProductDAO, CachedCustomerDAO, LRUTTLCache
+from src.tracing import tracer, format_summary
+from src.config import (get_client, CACHE_ENABLED, CACHE_SIZE, CACHE_TTL, SALES_AGGREGATES, DAEMON_SOCKET,
+                        SEARCH_INDEX, SEARCH_INDEX_MAX_AGE, JOURNAL_PATH, JOURNAL_FLUSH_INTERVAL)
+from src.textsearch import CUSTOMER_SEARCH_FIELDS
+
+
+def print_json_stream(rows):
+    """Print an iterable of rows as a JSON array, one row per line, without buffering it all."""
+    first = True
+    print("[", end="")
+    for row in rows:
+        print(("\n  " if first else ",\n  ") + json.dumps(row, default=str), end="")
+        first = False
+    print("]" if first else "\n]")
+
+
+def order_ref(value: str):
+    """An order id, or the journal key of a queued order."""
+    return int(value) if value.isdigit() else value
+
+
+def timestamp(value: str) -> datetime:
+    """An ISO date or date-time; taken as UTC when no offset is given."""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date: {value}")
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+_TRACE_LOCK = threading.Lock()
+
+
+class _built_once(cached_property):
+    """cached_property built under the owning RetailCLI's lock, so daemon threads share one instance."""
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with instance._build_lock:
+            return super().__get__(instance, owner)
 
 
 class RetailCLI:
-    def __init__(self):
-        self.product_service = ProductService(ProductDAO())
-        self.customer_service = CustomerService(CustomerDAO())
-        self.order_service = OrderService(OrderDAO(), CustomerDAO(), self.product_service)
-        self.payment_service = PaymentService(PaymentDAO(), self.order_service)
-        self.report_service = ReportService()
+    """Command handlers. Clients, DAOs and services are built on first use only."""
+
+    def __init__(self, client=None, cache: bool = CACHE_ENABLED, aggregates: bool = SALES_AGGREGATES,
+                 search_index: bool = SEARCH_INDEX):
+        self._client = client
+        self.cache = cache
+        self.aggregates = aggregates
+        self.search_index = search_index
+        self._build_lock = threading.RLock()
+
+    @_built_once
+    def client(self):
+        return self._client or get_client()
+
+    @_built_once
+    def product_service(self) -> ProductService:
+        if self.cache:
+            return ProductService(CachedProductDAO(self.client, LRUTTLCache(CACHE_SIZE, CACHE_TTL)))
+        return ProductService(ProductDAO(self.client))
+
+    @_built_once
+    def customer_service(self) -> CustomerService:
+        if self.cache:
+            dao = CachedCustomerDAO(self.client, LRUTTLCache(CACHE_SIZE, CACHE_TTL))
+        else:
+            dao = CustomerDAO(self.client)
+        return CustomerService(dao, CustomerSearchIndex(dao, SEARCH_INDEX_MAX_AGE) if self.search_index else None)
+
+    @_built_once
+    def order_service(self) -> OrderService:
+        service = OrderService(OrderDAO(self.client), self.customer_service, self.product_service)
+        if self.aggregates:
+            service.subscribe(self.aggregate_service.handle)
+        return service
+
+    @_built_once
+    def payment_service(self) -> PaymentService:
+        return PaymentService(PaymentDAO(self.client), self.order_service)
+
+    @_built_once
+    def import_service(self) -> ImportService:
+        return ImportService(self.product_service.dao, self.customer_service.dao)
+
+    @_built_once
+    def order_batch_service(self) -> OrderBatchService:
+        return OrderBatchService(self.order_service)
+
+    @_built_once
+    def low_stock_watcher(self) -> LowStockWatcher:
+        return LowStockWatcher(self.product_service)
+
+    @_built_once
+    def aggregate_service(self) -> SalesAggregateService:
+        return SalesAggregateService(SalesAggregateDAO(self.client), OrderDAO(self.client))
+
+    @_built_once
+    def write_behind(self) -> WriteBehindService:
+        journal = WriteJournal(JOURNAL_PATH)
+        self.order_service.journal = journal
+        return WriteBehindService(journal, JournalDAO(self.client), self.order_service, self.payment_service,
+                                  interval=JOURNAL_FLUSH_INTERVAL)
+
+    @_built_once
+    def report_service(self) -> ReportService:
+        return ReportService(self.client, aggregates=self.aggregate_service.dao if self.aggregates else None)
 
     def cmd_product_add(self, args):
         try:
-            p = self.product_service.add_product(args.name, args.sku, args.price, args.stock, args.category)
+            p = self.product_service.add_product(args.name, args.sku, args.price, args.stock, args.category,
+                                                 args.reorder_threshold)
             print("Created product:")
             print(json.dumps(p, indent=2, default=str))
         except Exception as e:
             print("Error:", e)
 
+    def cmd_product_restock(self, args):
+        try:
+            if args.queue:
+                p = self.write_behind.restock(args.id, args.delta)
+                print("Restock queued:")
+            else:
+                p = self.product_service.restock_product(args.id, args.delta)
+                print("Restocked product:")
+            print(json.dumps(p, indent=2, default=str))
+        except (ProductError, JournalError) as e:
+            print("Error:", e)
+
+    def cmd_product_set_threshold(self, args):
+        try:
+            p = self.product_service.set_reorder_threshold(args.id, args.threshold)
+            print("Updated product:")
+            print(json.dumps(p, indent=2, default=str))
+        except ProductError as e:
+            print("Error:", e)
+
+    def cmd_product_low_stock(self, args):
+        print_json_stream(islice(self.product_service.iter_low_stock(args.threshold), args.limit))
+
+    def cmd_product_watch_low_stock(self, args):
+        watcher = self.low_stock_watcher
+        watcher.on_alert = lambda alert: print(json.dumps(alert, default=str), flush=True)
+        count = watcher.load()
+        print(f"Watching {count} products; most urgent now:", file=sys.stderr)
+        for row in watcher.lowest(args.top):
+            print(json.dumps({"event": "low_stock", **row}, default=str), flush=True)
+        try:
+            watcher.watch(args.interval, rounds=args.rounds)
+        except KeyboardInterrupt:
+            pass
+
     def cmd_product_list(self, args):
-        ps = self.product_service.dao.list_products(limit=100)
-        print(json.dumps(ps, indent=2, default=str))
+        ps = self.product_service.iter_products(page_size=args.page_size, category=args.category)
+        print_json_stream(islice(ps, args.limit))
+
+    def _run_import(self, importer, args):
+        def progress(stats):
+            print(f"... {stats['rows_read']} rows read, {stats['inserted'] + stats['updated']} written "
+                  f"({stats['rows_per_s']} rows/s)", file=sys.stderr)
+        try:
+            report = importer(args.file, fmt=args.format, chunk_size=args.chunk_size, workers=args.workers,
+                              on_conflict=args.on_conflict, progress=progress)
+            print("Import finished:")
+            print(json.dumps(report, indent=2, default=str))
+        except (BulkImportError, OSError) as e:
+            print("Error:", e)
+
+    def cmd_product_import(self, args):
+        self._run_import(self.import_service.import_products, args)
+
+    def cmd_customer_import(self, args):
+        self._run_import(self.import_service.import_customers, args)
 
     def cmd_customer_add(self, args):
         try:
@@ -59,11 +230,22 @@ class RetailCLI:
             print("Error:", e)
 
     def cmd_customer_list(self, args):
-        cs = self.customer_service.list_customers(limit=100)
-        print(json.dumps(cs, indent=2, default=str))
+        cs = self.customer_service.iter_customers(page_size=args.page_size)
+        print_json_stream(islice(cs, args.limit))
 
     def cmd_customer_search(self, args):
-        cs = self.customer_service.search_customers(email=args.email, city=args.city)
+        offset = (args.page - 1) * args.limit
+        try:
+            if args.query:
+                cs = self.customer_service.find_customers(args.query, args.field, not args.exact, args.limit, offset)
+            elif args.email or args.city:
+                cs = self.customer_service.search_customers(email=args.email, city=args.city,
+                                                            limit=args.limit, offset=offset)
+            else:
+                raise CustomerError("Give --query, or --email/--city for exact matches")
+        except CustomerError as e:
+            print("Error:", e)
+            return
         print(json.dumps(cs, indent=2, default=str))
 
     def cmd_order_create(self, args):
@@ -76,34 +258,103 @@ class RetailCLI:
                 print("Invalid item format:", item)
                 return
         try:
-            ord = self.order_service.create_order(args.customer, items)
-            print("Order created:")
+            if args.queue:
+                ord = self.write_behind.create_order(args.customer, items)
+                print("Order queued:")
+            else:
+                ord = self.order_service.create_order(args.customer, items)
+                print("Order created:")
             print(json.dumps(ord, indent=2, default=str))
         except Exception as e:
             print("Error:", e)
 
+    def cmd_order_create_batch(self, args):
+        result_path = args.result or args.file.rsplit(".", 1)[0] + ".results.jsonl"
+
+        def progress(stats):
+            print(f"... {stats['baskets']} baskets, {stats['created']} orders created "
+                  f"({stats['orders_per_min']} orders/min)", file=sys.stderr)
+        try:
+            report = self.order_batch_service.create_from_file(
+                args.file, result_path, fmt=args.format, chunk_size=args.chunk_size, workers=args.workers,
+                progress=progress)
+            print("Batch finished:")
+            print(json.dumps({**report, "results": result_path}, indent=2, default=str))
+        except (BulkImportError, OSError) as e:
+            print("Error:", e)
+
     def cmd_order_show(self, args):
         try:
-            o = self.order_service.get_order_details(args.order)
+            if len(args.order) == 1:
+                o = self.order_service.get_order_details(args.order[0])
+            else:
+                o = self.order_service.get_orders_details(args.order)
+                missing = set(args.order) - {d["order"]["order_id"] for d in o}
+                if missing:
+                    print("Orders not found:", ", ".join(map(str, sorted(missing))), file=sys.stderr)
             print(json.dumps(o, indent=2, default=str))
         except Exception as e:
             print("Error:", e)
 
+    def cmd_order_list(self, args):
+        os_ = self.order_service.iter_orders(customer_id=args.customer, page_size=args.page_size,
+                                             with_items=args.with_items)
+        print_json_stream(islice(os_, args.limit))
+
     def cmd_order_cancel(self, args):
         try:
-            o = self.order_service.cancel_order(args.order)
-            print("Order cancelled:")
+            if args.queue:
+                o = self.write_behind.cancel_order(args.order)
+                print("Cancellation queued:")
+            elif isinstance(args.order, str):
+                raise OrderError("Journal keys need --queue")
+            else:
+                o = self.order_service.cancel_order(args.order)
+                print("Order cancelled:")
             print(json.dumps(o, indent=2, default=str))
         except Exception as e:
             print("Error:", e)
 
     def cmd_payment_process(self, args):
         try:
-            payment = self.payment_service.process_payment(args.order, args.method)
-            print("Payment processed:")
+            if args.queue:
+                payment = self.write_behind.process_payment(args.order, args.method)
+                print("Payment queued:")
+            elif isinstance(args.order, str):
+                raise PaymentError("Journal keys need --queue")
+            else:
+                payment = self.payment_service.process_payment(args.order, args.method)
+                print("Payment processed:")
             print(json.dumps(payment, indent=2, default=str))
-        except PaymentError as e:
+        except (PaymentError, JournalError) as e:
+            print("Error:", e)
+
+    def cmd_journal_status(self, args):
+        try:
+            print(json.dumps(self.write_behind.status(), indent=2, default=str))
+        except JournalError as e:
+            print("Error:", e)
+
+    def cmd_journal_show(self, args):
+        try:
+            outcome = self.write_behind.outcome(args.key)
+        except JournalError as e:
+            print("Error:", e)
+            return
+        if outcome is None:
+            print("Error: unknown journal key", args.key)
+            return
+        print(json.dumps(outcome, indent=2, default=str))
+
+    def cmd_journal_flush(self, args):
+        try:
+            report = self.write_behind.flush()
+            print("Journal flushed:")
+            print(json.dumps(report, indent=2, default=str))
+        except JournalError as e:
             print("Error:", e)
+        except Exception as e:
+            print(f"Error: backend unavailable, entries stay queued ({e})")
 
     def cmd_payment_refund(self, args):
         try:
@@ -113,24 +364,127 @@ class RetailCLI:
         except PaymentError as e:
             print("Error:", e)
 
+    def cmd_payment_settle(self, args):
+        try:
+            if args.order:
+                report = self.payment_service.settle_orders(args.order, args.method, chunk_size=args.chunk_size)
+            else:
+                report = self.payment_service.settle_by_status(args.method, args.status, chunk_size=args.chunk_size)
+            print("Settlement finished:")
+            print(json.dumps(report, indent=2, default=str))
+        except (PaymentError, OrderError) as e:
+            print("Error:", e)
+
     def cmd_report_top_products(self, args):
-        top = self.report_service.top_selling_products()
-        print(json.dumps(top, indent=2, default=str))
+        top = self._report(args, lambda r: r.top_selling_products(args.top))
+        if top is not None:
+            print(json.dumps(top, indent=2, default=str))
 
     def cmd_report_revenue(self, args):
-        revenue = self.report_service.total_revenue_last_month()
-        print(f"Total revenue in last month: {revenue}")
+        revenue = self._report(args, lambda r: r.total_revenue_last_month(args.days))
+        if revenue is not None:
+            print(f"Total revenue in last {args.days} days: {revenue}")
 
     def cmd_report_orders(self, args):
-        orders = self.report_service.total_orders_per_customer()
-        print(json.dumps(orders, indent=2, default=str))
+        orders = self._report(args, lambda r: r.total_orders_per_customer())
+        if orders is not None:
+            print(json.dumps(orders, indent=2, default=str))
 
     def cmd_report_frequent_customers(self, args):
-        customers = self.report_service.frequent_customers()
-        print(json.dumps(customers, indent=2, default=str))
+        customers = self._report(args, lambda r: r.frequent_customers(args.min_orders))
+        if customers is not None:
+            print(json.dumps(customers, indent=2, default=str))
+
+    def cmd_report_all(self, args):
+        results = self._report(args, lambda r: r.run_reports(args.report or REPORTS, top=args.top, since=args.since,
+                                                             until=args.until, days=args.days,
+                                                             min_orders=args.min_orders))
+        if results is None:
+            return
+        parameters = {"top": args.top, "since": args.since, "until": args.until, "days": args.days,
+                      "min_orders": args.min_orders, "snapshot": args.snapshot}
+        print(json.dumps({"parameters": parameters, **results}, indent=2, default=str))
+
+    def _report(self, args, run):
+        """Run a report on the live database or, with --snapshot, on an exported snapshot; None after an error."""
+        try:
+            if not args.snapshot:
+                return run(self.report_service)
+            with Snapshot(args.snapshot) as snapshot:
+                return run(ReportService(snapshot=snapshot))
+        except (ReportError, SnapshotError) as e:
+            print("Error:", e)
+            return None
+
+    def cmd_export(self, args):
+        def progress(stats):
+            print(f"... {stats['table']}: {stats['rows']} rows ({stats['rows_per_s']} rows/s)", file=sys.stderr)
+        try:
+            manifest = export_snapshot(ExportDAO(self.client), args.out, formats=args.format or SNAPSHOT_FORMATS,
+                                       tables=args.table, page_size=args.page_size, force=args.force,
+                                       progress=progress)
+        except (SnapshotError, OSError) as e:
+            print("Error:", e)
+            return
+        print("Snapshot written:")
+        print(json.dumps({"path": args.out, "formats": manifest["formats"],
+                          "rows": {t: info["rows"] for t, info in manifest["tables"].items()}}, indent=2))
+
+    def cmd_report_rebuild_aggregates(self, args):
+        self.aggregate_service.rebuild()
+        print("Sales aggregates rebuilt")
+
+    def cmd_report_check_aggregates(self, args):
+        result = self.aggregate_service.check()
+        print(json.dumps(result, indent=2, default=str))
+
+    @staticmethod
+    def _add_import_arguments(parser):
+        parser.add_argument("--file", required=True)
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from file extension")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--on-conflict", choices=["update", "skip"], default="update")
+
+    def cmd_serve(self, args):
+        from src.cli.daemon import serve
+        self.cache = self.cache or not args.no_cache
+        self._load_search_index(args.search_index)
+        if args.watch_low_stock:
+            self._start_low_stock_watch(args.watch_interval)
+        if args.write_behind:
+            self.write_behind.interval = args.flush_interval
+            self.write_behind.start()
+        try:
+            serve(self, args.socket)
+        finally:
+            if args.write_behind:
+                self.write_behind.stop()
+
+    def _start_low_stock_watch(self, interval: float):
+        # Alerts go to the daemon's own stderr, not to whichever client request caused them.
+        watcher = self.low_stock_watcher
+        watcher.on_alert = lambda alert: print(json.dumps(alert, default=str), file=sys.__stderr__, flush=True)
+        watcher.load()
+        threading.Thread(target=watcher.watch, args=(interval,), name="low-stock-watch", daemon=True).start()
+
+    def cmd_shell(self, args):
+        from src.cli.daemon import shell
+        self.cache = self.cache or not args.no_cache
+        self._load_search_index(args.search_index)
+        shell(self)
+
+    def _load_search_index(self, enabled: bool):
+        self.search_index = self.search_index or enabled
+        if self.search_index:
+            self.customer_service.index.load()
 
     def build_parser(self):
         parser = argparse.ArgumentParser(prog="retail-cli")
+        parser.add_argument("--profile", action="store_true",
+                            help="print backend requests, per-method timings and a latency histogram to stderr")
+        parser.add_argument("--trace", metavar="FILE", default=None,
+                            help="write a request trace: .jsonl for JSON lines, anything else for Chrome trace format")
         sub = parser.add_subparsers(dest="cmd")
 
         p_prod = sub.add_parser("product", help="product commands")
@@ -141,10 +495,36 @@ class RetailCLI:
         addp.add_argument("--price", type=float, required=True)
         addp.add_argument("--stock", type=int, default=0)
         addp.add_argument("--category", default=None)
+        addp.add_argument("--reorder-threshold", type=int, default=None, help="alert when stock falls to this (default 5)")
         addp.set_defaults(func=self.cmd_product_add)
+        restockp = pprod_sub.add_parser("restock")
+        restockp.add_argument("--id", type=int, required=True)
+        restockp.add_argument("--delta", type=int, required=True)
+        restockp.add_argument("--queue", action="store_true", help="journal the restock and return at once")
+        restockp.set_defaults(func=self.cmd_product_restock)
+        thresholdp = pprod_sub.add_parser("set-threshold", help="set a product's reorder threshold")
+        thresholdp.add_argument("--id", type=int, required=True)
+        thresholdp.add_argument("--threshold", type=int, required=True)
+        thresholdp.set_defaults(func=self.cmd_product_set_threshold)
+        lowp = pprod_sub.add_parser("low-stock", help="products at or below their reorder threshold, most urgent first")
+        lowp.add_argument("--threshold", type=int, default=None, help="use one stock limit for every product instead")
+        lowp.add_argument("--limit", type=int, default=None)
+        lowp.set_defaults(func=self.cmd_product_low_stock)
+        watchp = pprod_sub.add_parser("watch-low-stock", help="print low-stock / recovered alerts as JSON lines")
+        watchp.add_argument("--interval", type=float, default=10.0, help="seconds between database reconciliations")
+        watchp.add_argument("--top", type=int, default=20, help="how many current low-stock products to print first")
+        watchp.add_argument("--rounds", type=int, default=None, help="stop after N reconciliations (default: run until Ctrl-C)")
+        watchp.set_defaults(func=self.cmd_product_watch_low_stock)
         listp = pprod_sub.add_parser("list")
+        listp.add_argument("--category", default=None)
+        listp.add_argument("--limit", type=int, default=None, help="stop after N rows (default: all)")
+        listp.add_argument("--page-size", type=int, default=None)
         listp.set_defaults(func=self.cmd_product_list)
 
+        importp = pprod_sub.add_parser("import", help="bulk upsert products from CSV/JSONL")
+        self._add_import_arguments(importp)
+        importp.set_defaults(func=self.cmd_product_import)
+
         p_cust = sub.add_parser("customer", help="customer commands")
         cust_sub = p_cust.add_subparsers(dest="action")
         addc = cust_sub.add_parser("add")
@@ -162,53 +542,184 @@ class RetailCLI:
         deletec.add_argument("--id", type=int, required=True)
         deletec.set_defaults(func=self.cmd_customer_delete)
         listc = cust_sub.add_parser("list")
+        listc.add_argument("--limit", type=int, default=None, help="stop after N rows (default: all)")
+        listc.add_argument("--page-size", type=int, default=None)
         listc.set_defaults(func=self.cmd_customer_list)
-        searchc = cust_sub.add_parser("search")
-        searchc.add_argument("--email", default=None)
-        searchc.add_argument("--city", default=None)
+        searchc = cust_sub.add_parser("search", help="find customers by name, email, phone or city")
+        searchc.add_argument("--query", "-q", default=None, help="prefix of a value or of any word in it; typos tolerated")
+        searchc.add_argument("--field", action="append", choices=CUSTOMER_SEARCH_FIELDS, default=None,
+                             help="restrict --query to a field (repeatable; default: all)")
+        searchc.add_argument("--exact", action="store_true", help="prefix matches only, no typo tolerance")
+        searchc.add_argument("--email", default=None, help="exact email")
+        searchc.add_argument("--city", default=None, help="exact city")
+        searchc.add_argument("--limit", type=int, default=20)
+        searchc.add_argument("--page", type=int, default=1)
         searchc.set_defaults(func=self.cmd_customer_search)
+        importc = cust_sub.add_parser("import", help="bulk upsert customers from CSV/JSONL")
+        self._add_import_arguments(importc)
+        importc.set_defaults(func=self.cmd_customer_import)
 
         p_order = sub.add_parser("order", help="order commands")
         order_sub = p_order.add_subparsers(dest="action")
         createo = order_sub.add_parser("create")
         createo.add_argument("--customer", type=int, required=True)
         createo.add_argument("--item", required=True, nargs="+", help="prod_id:qty (repeatable)")
+        createo.add_argument("--queue", action="store_true",
+                             help="journal the order and return its key at once; the flusher places it later")
         createo.set_defaults(func=self.cmd_order_create)
+        batcho = order_sub.add_parser("create-batch", help="place orders for every basket in a JSONL/CSV file")
+        batcho.add_argument("--file", required=True,
+                            help='one basket per line: {"customer": 1, "items": [{"prod_id": 2, "quantity": 1}], "ref": "..."}')
+        batcho.add_argument("--result", default=None, help="per-basket results (default: <file>.results.jsonl)")
+        batcho.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from file extension")
+        batcho.add_argument("--chunk-size", type=int, default=500)
+        batcho.add_argument("--workers", type=int, default=8)
+        batcho.set_defaults(func=self.cmd_order_create_batch)
         showo = order_sub.add_parser("show")
-        showo.add_argument("--order", type=int, required=True)
+        showo.add_argument("--order", type=int, nargs="+", required=True, help="one or more order ids")
         showo.set_defaults(func=self.cmd_order_show)
+        listo = order_sub.add_parser("list")
+        listo.add_argument("--customer", type=int, default=None)
+        listo.add_argument("--limit", type=int, default=None, help="stop after N rows (default: all)")
+        listo.add_argument("--page-size", type=int, default=None)
+        listo.add_argument("--with-items", action="store_true", help="include each order's items and product names")
+        listo.set_defaults(func=self.cmd_order_list)
         cano = order_sub.add_parser("cancel")
-        cano.add_argument("--order", type=int, required=True)
+        cano.add_argument("--order", type=order_ref, required=True, help="order id, or journal key with --queue")
+        cano.add_argument("--queue", action="store_true", help="journal the cancellation and return at once")
         cano.set_defaults(func=self.cmd_order_cancel)
 
         p_pay = sub.add_parser("payment", help="payment commands")
         pay_sub = p_pay.add_subparsers(dest="action")
         process = pay_sub.add_parser("process")
-        process.add_argument("--order", type=int, required=True)
+        process.add_argument("--order", type=order_ref, required=True, help="order id, or journal key with --queue")
         process.add_argument("--method", required=True, help="Cash/Card/UPI")
+        process.add_argument("--queue", action="store_true", help="journal the payment and return at once")
         process.set_defaults(func=self.cmd_payment_process)
+        settle = pay_sub.add_parser("settle", help="pay and complete many orders with set-based writes")
+        settle.add_argument("--method", required=True, help="Cash/Card/UPI")
+        settle.add_argument("--status", default="PLACED", help="settle every order in this status (default: PLACED)")
+        settle.add_argument("--order", type=int, nargs="+", default=None, help="settle only these order ids")
+        settle.add_argument("--chunk-size", type=int, default=500)
+        settle.set_defaults(func=self.cmd_payment_settle)
         refund = pay_sub.add_parser("refund")
         refund.add_argument("--order", type=int, required=True)
         refund.set_defaults(func=self.cmd_payment_refund)
 
         p_report = sub.add_parser("report", help="reporting commands")
         report_sub = p_report.add_subparsers(dest="action")
-        report_sub.add_parser("top_products").set_defaults(func=self.cmd_report_top_products)
-        report_sub.add_parser("revenue").set_defaults(func=self.cmd_report_revenue)
-        report_sub.add_parser("orders").set_defaults(func=self.cmd_report_orders)
-        report_sub.add_parser("frequent_customers").set_defaults(func=self.cmd_report_frequent_customers)
+        topr = report_sub.add_parser("top_products")
+        topr.add_argument("--top", type=int, default=5)
+        topr.set_defaults(func=self.cmd_report_top_products)
+        revr = report_sub.add_parser("revenue")
+        revr.add_argument("--days", type=int, default=30)
+        revr.set_defaults(func=self.cmd_report_revenue)
+        ordersr = report_sub.add_parser("orders")
+        ordersr.set_defaults(func=self.cmd_report_orders)
+        freqr = report_sub.add_parser("frequent_customers")
+        freqr.add_argument("--min-orders", type=int, default=3)
+        freqr.set_defaults(func=self.cmd_report_frequent_customers)
+        allr = report_sub.add_parser("all", help="several reports from a single pass over the order tables")
+        for reportp in (topr, revr, ordersr, freqr, allr):
+            reportp.add_argument("--snapshot", default=None, metavar="DIR",
+                                 help="report on a snapshot written by 'export' instead of the database")
+        allr.add_argument("--report", action="append", choices=REPORTS, default=None,
+                          help="report to include (repeatable; default: all)")
+        allr.add_argument("--top", type=int, default=5, help="products in top_products")
+        allr.add_argument("--since", type=timestamp, default=None, help="only orders at or after this ISO date")
+        allr.add_argument("--until", type=timestamp, default=None, help="only orders before this ISO date")
+        allr.add_argument("--days", type=int, default=30, help="revenue window when --since is not given")
+        allr.add_argument("--min-orders", type=int, default=3, help="orders needed to count as a frequent customer")
+        allr.set_defaults(func=self.cmd_report_all)
+        report_sub.add_parser("rebuild-aggregates").set_defaults(func=self.cmd_report_rebuild_aggregates)
+        report_sub.add_parser("check-aggregates").set_defaults(func=self.cmd_report_check_aggregates)
+
+        p_export = sub.add_parser("export", help="stream every table into a local NDJSON/columnar snapshot")
+        p_export.add_argument("--out", required=True, metavar="DIR", help="snapshot directory to create")
+        p_export.add_argument("--format", action="append", choices=SNAPSHOT_FORMATS, default=None,
+                              help="repeatable; default: ndjson and columnar")
+        p_export.add_argument("--table", action="append", choices=list(EXPORT_TABLES), default=None,
+                              help="repeatable; default: all tables")
+        p_export.add_argument("--page-size", type=int, default=None)
+        p_export.add_argument("--force", action="store_true", help="replace an existing snapshot")
+        p_export.set_defaults(func=self.cmd_export)
+
+        p_journal = sub.add_parser("journal", help="write-behind journal of queued changes")
+        journal_sub = p_journal.add_subparsers(dest="action")
+        journal_sub.add_parser("status", help="pending entries and rejected ones").set_defaults(
+            func=self.cmd_journal_status)
+        showj = journal_sub.add_parser("show", help="outcome of one queued change")
+        showj.add_argument("--key", required=True)
+        showj.set_defaults(func=self.cmd_journal_show)
+        journal_sub.add_parser("flush", help="send pending entries to the database now").set_defaults(
+            func=self.cmd_journal_flush)
+
+        p_serve = sub.add_parser("serve", help="keep clients and caches warm and answer commands on a Unix socket")
+        p_serve.add_argument("--socket", default=DAEMON_SOCKET or "/tmp/retail-cli.sock")
+        p_serve.add_argument("--no-cache", action="store_true", help="do not enable the product/customer cache")
+        p_serve.add_argument("--watch-low-stock", action="store_true", help="log low-stock alerts to the daemon's stderr")
+        p_serve.add_argument("--watch-interval", type=float, default=10.0)
+        p_serve.add_argument("--search-index", action="store_true", help="answer customer searches from memory")
+        p_serve.add_argument("--write-behind", action="store_true",
+                             help="flush the write-behind journal in the background")
+        p_serve.add_argument("--flush-interval", type=float, default=JOURNAL_FLUSH_INTERVAL)
+        p_serve.set_defaults(func=self.cmd_serve)
+        p_shell = sub.add_parser("shell", help="interactive shell reusing one set of clients and caches")
+        p_shell.add_argument("--no-cache", action="store_true", help="do not enable the product/customer cache")
+        p_shell.add_argument("--search-index", action="store_true", help="answer customer searches from memory")
+        p_shell.set_defaults(func=self.cmd_shell)
 
         return parser
 
-    def run(self):
-        parser = self.build_parser()
-        args = parser.parse_args()
+    @_built_once
+    def parser(self):
+        return self.build_parser()
+
+    def execute(self, argv=None) -> int:
+        """Run one command line; returns an exit status instead of exiting."""
+        try:
+            args = self.parser.parse_args(argv)
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
         if not hasattr(args, "func"):
-            parser.print_help()
-            return
-        args.func(args)
+            self.parser.print_help()
+            return 0
+        if not (args.profile or args.trace):
+            return args.func(args) or 0
+        # The tracer is process-wide and start() clears it, so daemon requests trace one at a time.
+        with _TRACE_LOCK:
+            return self._execute_traced(args)
+
+    def _execute_traced(self, args) -> int:
+        command = " ".join(a for a in (args.cmd, getattr(args, "action", None)) if a)
+        before = dispatcher.stats()
+        tracer.start()
+        try:
+            with tracer.span(f"cli {command}"):
+                return args.func(args) or 0
+        finally:
+            events = tracer.stop()
+            if args.profile:
+                print(format_summary(tracer.summary(events), title=command), file=sys.stderr)
+                after = dispatcher.stats()
+                print("-- dispatch " + " ".join(f"{k}={round(after[k] - before[k], 3)}" for k in after if k != "rate"),
+                      file=sys.stderr)
+            if args.trace:
+                tracer.export(args.trace, events)
+
+    def run(self, argv=None):
+        sys.exit(self.execute(argv))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] not in (["serve"], ["shell"]) and DAEMON_SOCKET:
+        from src.cli.daemon import forward
+        status = forward(DAEMON_SOCKET, argv)
+        if status is not None:
+            sys.exit(status)
+    RetailCLI().run(argv)
 
 
 if __name__ == "__main__":
-    cli = RetailCLI()
-    cli.run()
+    main()
@@ -1,19 +1,90 @@
 # src/config.py
 import os
+import threading
 from dotenv import load_dotenv
-from supabase import create_client, Client
  
 load_dotenv()  # loads .env from project root
  
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+RETAIL_BACKEND = os.getenv("RETAIL_BACKEND", "supabase").lower()
+SQLITE_PATH = os.getenv("RETAIL_SQLITE_PATH", "retail.db")
+POOL_SIZE = int(os.getenv("RETAIL_POOL_SIZE", "10"))
+HTTP_TIMEOUT = float(os.getenv("RETAIL_HTTP_TIMEOUT", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("RETAIL_KEEPALIVE_EXPIRY", "30"))
+PAGE_SIZE = int(os.getenv("RETAIL_PAGE_SIZE", "1000"))
+REPORT_MEMORY_MB = float(os.getenv("RETAIL_REPORT_MEMORY_MB", "64"))
+SALES_AGGREGATES = os.getenv("RETAIL_SALES_AGGREGATES", "0").lower() in ("1", "true", "yes")
+DAEMON_SOCKET = os.getenv("RETAIL_SOCKET")
+CACHE_ENABLED = os.getenv("RETAIL_CACHE", "0").lower() in ("1", "true", "yes")
+CACHE_SIZE = int(os.getenv("RETAIL_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("RETAIL_CACHE_TTL", "60"))
+SEARCH_INDEX = os.getenv("RETAIL_SEARCH_INDEX", "0").lower() in ("1", "true", "yes")
+SEARCH_INDEX_MAX_AGE = float(os.getenv("RETAIL_SEARCH_INDEX_MAX_AGE", "300"))
+JOURNAL_PATH = os.getenv("RETAIL_JOURNAL", "retail-journal.jsonl")
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("RETAIL_JOURNAL_FLUSH_INTERVAL", "1"))
+RATE_LIMIT = float(os.getenv("RETAIL_RATE_LIMIT", "0"))  # requests/s to the backend; 0 = unlimited
+RATE_BURST = int(os.getenv("RETAIL_RATE_BURST", "0")) or None
+RETRIES = int(os.getenv("RETAIL_RETRIES", "3"))
+SINGLE_FLIGHT = os.getenv("RETAIL_SINGLE_FLIGHT", "1").lower() in ("1", "true", "yes")
+BATCH_LOOKUPS = os.getenv("RETAIL_BATCH_LOOKUPS", "1").lower() in ("1", "true", "yes")
+BATCH_WINDOW_MS = float(os.getenv("RETAIL_BATCH_WINDOW_MS", "0"))
  
-def get_supabase() -> Client:
+_clients = {}
+_clients_lock = threading.Lock()
+ 
+def get_supabase():
     """
-    Return a supabase client. Raises RuntimeError if config missing.
+    Return a new supabase client whose HTTP connections are pooled and kept alive.
+    Raises RuntimeError if config missing. Prefer get_client(), which shares one.
     """
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    import httpx
+    from supabase import create_client, ClientOptions
+    http = httpx.Client(
+        limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE, keepalive_expiry=KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(HTTP_TIMEOUT),
+    )
+    options = ClientOptions(httpx_client=http, postgrest_client_timeout=HTTP_TIMEOUT)
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+ 
+def get_sqlite(path: str | None = None):
+    """
+    Return a new embedded SQLite client exposing the same table() API as supabase.
+    """
+    from src.backends.sqlite_backend import SQLiteClient
+    return SQLiteClient(path or SQLITE_PATH, pool_size=POOL_SIZE, timeout=HTTP_TIMEOUT)
+ 
+def get_client(backend: str | None = None):
+    """
+    Return the process-wide client for a backend (default RETAIL_BACKEND: supabase | sqlite).
+    The client is created on first use and shared by every DAO afterwards.
+    """
+    backend = (backend or RETAIL_BACKEND).lower()
+    client = _clients.get(backend)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if backend not in _clients:
+            if backend == "sqlite":
+                _clients[backend] = get_sqlite()
+            elif backend == "supabase":
+                _clients[backend] = get_supabase()
+            else:
+                raise RuntimeError(f"Unknown RETAIL_BACKEND: {backend}")
+        return _clients[backend]
+ 
+def close_clients():
+    """
+    Close and forget every shared client (connection pools included).
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            if hasattr(client, "close"):
+                client.close()
+            elif getattr(client, "options", None) is not None and client.options.httpx_client is not None:
+                client.options.httpx_client.close()
+        _clients.clear()
  
  
\ No newline at end of file
@@ -0,0 +1,40 @@
+# src/dao/aggregate_dao.py
+from datetime import date
+from typing import List, Dict, Iterator
+from src.dao.base_dao import BaseDAO
+
+
+class SalesAggregateDAO(BaseDAO):
+    """Running sales totals per product, per customer and per day (see sql/functions.sql)."""
+
+    def apply_event(self, event: str, order: Dict, items: List[Dict] | None = None):
+        items = [{"prod_id": i["prod_id"], "quantity": i["quantity"], "price": i["price"]} for i in items or []]
+        self._execute(self.sb.rpc("apply_sales_event", {"p_event": event, "p_order": order, "p_items": items}))
+
+    def apply_events(self, event: str, orders: List[Dict]):
+        """One status event (order_completed / order_cancelled) for many orders in one request."""
+        self._execute(self.sb.rpc("apply_sales_events", {"p_event": event, "p_orders": orders}))
+
+    def rebuild(self):
+        self._execute(self.sb.rpc("rebuild_sales_aggregates", {}))
+
+    def top_products(self, limit: int = 5) -> List[Dict]:
+        q = self.sb.table("sales_product_totals").select("prod_id, quantity_sold").order("quantity_sold", desc=True).order("prod_id").limit(limit)
+        return self._rows(self._execute(q))
+
+    def revenue_since(self, day: date) -> float:
+        q = self.sb.table("sales_daily_totals").select("revenue").gte("day", day.isoformat())
+        return float(sum(r["revenue"] or 0 for r in self._rows(self._execute(q))))
+
+    def customer_order_counts(self, min_orders: int = 1) -> List[Dict]:
+        q = self.sb.table("sales_customer_totals").select("cust_id, order_count").gte("order_count", min_orders).order("cust_id")
+        return self._rows(self._execute(q))
+
+    def iter_product_totals(self) -> Iterator[Dict]:
+        return self._iter_keyset("sales_product_totals", "prod_id")
+
+    def iter_customer_totals(self) -> Iterator[Dict]:
+        return self._iter_keyset("sales_customer_totals", "cust_id")
+
+    def iter_daily_totals(self) -> Iterator[Dict]:
+        return self._iter_keyset("sales_daily_totals", "day")
@@ -0,0 +1,29 @@
+# src/dao/async_dao.py
+import asyncio
+import functools
+from typing import Any
+from src.config import POOL_SIZE
+
+
+class AsyncDAO:
+    """
+    Awaitable view of a synchronous DAO (or service): every method call runs in a worker
+    thread via ``asyncio.to_thread``, gated by a semaphore that bounds how many backend
+    requests are in flight. Share one semaphore between views to bound them together.
+    """
+
+    def __init__(self, target: Any, limiter: asyncio.Semaphore | None = None, limit: int = POOL_SIZE):
+        self.target = target
+        self.limiter = limiter or asyncio.Semaphore(limit)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.target, name)
+        if not callable(attr) or name.startswith("iter_"):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            async with self.limiter:
+                return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return call
@@ -0,0 +1,154 @@
+# src/dao/base_dao.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+from src.config import (get_client, PAGE_SIZE, RATE_LIMIT, RATE_BURST, RETRIES, SINGLE_FLIGHT, BATCH_LOOKUPS,
+                        BATCH_WINDOW_MS)
+from src.dao.dispatch import Dispatcher
+from src.tracing import tracer
+
+
+def table_of(query) -> str:
+    """Best-effort table (or RPC) name for a query builder of either backend."""
+    name = getattr(query, "table_name", None)
+    if name:
+        return name
+    request = getattr(query, "request", None)
+    path = str(getattr(request, "path", "") or getattr(query, "path", ""))
+    return path.rstrip("/").rsplit("/", 1)[-1] or "?"
+
+
+MISSING_FUNCTION_CODES = {"PGRST202", "42883"}
+
+
+def is_missing_function(error: Exception) -> bool:
+    """True if a backend error says the called database function is not deployed."""
+    return getattr(error, "code", None) in MISSING_FUNCTION_CODES
+
+
+MISSING_RELATIONSHIP_CODES = {"PGRST200", "PGRST201"}
+
+
+def is_missing_relationship(error: Exception) -> bool:
+    """True if the API could not resolve an embedded resource (no, or an ambiguous, foreign key)."""
+    return getattr(error, "code", None) in MISSING_RELATIONSHIP_CODES
+
+
+TRANSIENT_CODES = {"40001", "40P01", "55P03", "57P01", "08000", "08003", "08006"}
+
+
+def is_transient(error: Exception) -> bool:
+    """True if a request failed for reasons worth retrying later: backend unreachable, timed out or overloaded."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if {c.__name__ for c in type(error).__mro__} & {"TransportError", "TimeoutException"}:  # httpx
+        return True
+    code = str(getattr(error, "code", None) or "")
+    return code in TRANSIENT_CODES or (len(code) == 3 and code[0] == "5" and code.isdigit())
+
+
+class RoundTripCounter:
+    """Thread-safe count of requests issued to the backend, in total and per table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.by_table: Dict[str, int] = {}
+
+    def record(self, table: str):
+        with self._lock:
+            self.total += 1
+            self.by_table[table] = self.by_table.get(table, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.total = 0
+            self.by_table = {}
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"total": self.total, "by_table": dict(self.by_table)}
+
+
+round_trips = RoundTripCounter()
+dispatcher = Dispatcher(RATE_LIMIT, RATE_BURST, RETRIES, single_flight=SINGLE_FLIGHT, batch_lookups=BATCH_LOOKUPS,
+                        batch_window=BATCH_WINDOW_MS / 1000, transient=is_transient)
+
+
+class BaseDAO:
+    """Shared plumbing for DAOs: client injection and a single execute() choke point."""
+
+    def __init__(self, client=None):
+        self.sb = client or get_client()
+
+    def _execute(self, query):
+        return dispatcher.execute(query, self._send)
+
+    @staticmethod
+    def _send(query):
+        table = table_of(query)
+        round_trips.record(table)
+        if tracer.enabled:
+            return tracer.execute(query, table)
+        return query.execute()
+
+    def _get_by_key(self, table: str, column: str, value) -> Optional[Dict]:
+        """One row by a unique column; concurrent lookups on the same table share an ``in`` query."""
+        if not dispatcher.batch_lookups:
+            return self._first(self._execute(self.sb.table(table).select("*").eq(column, value).limit(1)))
+
+        def fetch(values):
+            return self._rows(self._execute(self.sb.table(table).select("*").in_(column, values)))
+        return dispatcher.lookup((id(self.sb), table, column), value, fetch, column)
+
+    def _upsert(self, table: str, rows: List[Dict], on_conflict: str) -> List[Dict]:
+        """
+        Insert or update ``rows`` matched on ``on_conflict``. A bulk upsert writes every column of
+        the request to every row, so rows are sent in one request per distinct set of columns.
+        """
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        written = []
+        for group in groups.values():
+            written.extend(self._rows(self._execute(self.sb.table(table).upsert(group, on_conflict=on_conflict))))
+        return written
+
+    @staticmethod
+    def _first(resp) -> Optional[Dict]:
+        return resp.data[0] if resp.data else None
+
+    @staticmethod
+    def _rows(resp) -> List[Dict]:
+        return resp.data or []
+
+    def _iter_keyset(self, table: str, key: str, page_size: int | None = None, columns: str = "*",
+                     where: Callable | None = None, prefetch: bool = True) -> Iterator[Dict]:
+        """
+        Stream every matching row of ``table`` ordered by ``key`` using keyset pagination
+        (``key > last_seen``), optionally fetching the next page while the caller consumes
+        the current one. ``where`` receives the query builder to add filters.
+        """
+        page_size = page_size or PAGE_SIZE
+
+        def fetch(after):
+            q = self.sb.table(table).select(columns).order(key, desc=False).limit(page_size)
+            if after is not None:
+                q = q.gt(key, after)
+            if where:
+                q = where(q)
+            return self._rows(self._execute(q))
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = fetch(None)
+            while page:
+                full = len(page) == page_size
+                upcoming = executor.submit(fetch, page[-1][key]) if executor and full else None
+                yield from page
+                if not full:
+                    break
+                page = upcoming.result() if upcoming else fetch(page[-1][key])
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
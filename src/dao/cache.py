@@ -0,0 +1,208 @@
+# src/dao/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from src.dao.product_dao import ProductDAO
+from src.dao.customer_dao import CustomerDAO
+
+
+class LRUTTLCache:
+    """Bounded, thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return a live entry without touching recency or hit/miss stats."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[0] if entry is not None and entry[1] >= time.monotonic() else None
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class _RowCache:
+    """Caches rows under their primary key and one unique secondary key."""
+
+    def __init__(self, cache: LRUTTLCache, pk: str, alt: str):
+        self.cache = cache
+        self.pk = pk
+        self.alt = alt
+
+    def get(self, field: str, value: Any) -> Optional[Dict]:
+        row = self.cache.get((field, value))
+        return dict(row) if row is not None else None
+
+    def put(self, row: Optional[Dict]) -> Optional[Dict]:
+        if row:
+            stored = dict(row)
+            self.cache.put((self.pk, row[self.pk]), stored)
+            if row.get(self.alt) is not None:
+                self.cache.put((self.alt, row[self.alt]), stored)
+        return row
+
+    def put_many(self, rows: List[Dict]) -> List[Dict]:
+        for row in rows:
+            self.put(row)
+        return rows
+
+    def invalidate(self, pk_value: Any, row: Optional[Dict] = None):
+        cached = row or self.cache.peek((self.pk, pk_value))
+        self.cache.invalidate((self.pk, pk_value))
+        if cached and cached.get(self.alt) is not None:
+            self.cache.invalidate((self.alt, cached[self.alt]))
+
+
+class CachedProductDAO(ProductDAO):
+    """Read-through cache for product lookups; writes refresh or invalidate entries."""
+
+    def __init__(self, client=None, cache: LRUTTLCache | None = None):
+        super().__init__(client)
+        self.cache = cache or LRUTTLCache()
+        self._row_cache = _RowCache(self.cache, "prod_id", "sku")
+
+    def get_product_by_id(self, prod_id: int) -> Optional[Dict]:
+        return self._row_cache.get("prod_id", prod_id) or self._row_cache.put(super().get_product_by_id(prod_id))
+
+    def get_product_by_sku(self, sku: str) -> Optional[Dict]:
+        return self._row_cache.get("sku", sku) or self._row_cache.put(super().get_product_by_sku(sku))
+
+    def get_products_by_ids(self, prod_ids: List[int]) -> List[Dict]:
+        found, missing = [], []
+        for pid in dict.fromkeys(prod_ids):
+            row = self._row_cache.get("prod_id", pid)
+            if row:
+                found.append(row)
+            else:
+                missing.append(pid)
+        if missing:
+            found.extend(self._row_cache.put_many(super().get_products_by_ids(missing)))
+        return found
+
+    def create_product(self, *args, **kwargs) -> Optional[Dict]:
+        return self._row_cache.put(super().create_product(*args, **kwargs))
+
+    def update_product(self, prod_id: int, fields: Dict) -> Optional[Dict]:
+        self._row_cache.invalidate(prod_id)
+        return self._row_cache.put(super().update_product(prod_id, fields))
+
+    def upsert_products(self, rows: List[Dict]) -> List[Dict]:
+        return self._row_cache.put_many(super().upsert_products(rows))
+
+    def delete_product(self, prod_id: int) -> Optional[Dict]:
+        row = super().delete_product(prod_id)
+        self._row_cache.invalidate(prod_id, row)
+        return row
+
+    def put_many(self, rows: List[Dict]) -> List[Dict]:
+        """Refresh entries from product rows written by another path (e.g. the journal's apply_journal)."""
+        return self._row_cache.put_many(rows)
+
+    def reserve_stock(self, items: List[Dict]) -> List[Dict]:
+        return self._row_cache.put_many(super().reserve_stock(items))
+
+    def release_stock(self, items: List[Dict]) -> List[Dict]:
+        return self._row_cache.put_many(super().release_stock(items))
+
+    def compare_and_set_stock(self, prod_id: int, expected: int, new_stock: int) -> Optional[Dict]:
+        row = super().compare_and_set_stock(prod_id, expected, new_stock)
+        if row is None:
+            self._row_cache.invalidate(prod_id)
+        return self._row_cache.put(row)
+
+
+class CachedCustomerDAO(CustomerDAO):
+    """Read-through cache for customer lookups; writes refresh or invalidate entries."""
+
+    def __init__(self, client=None, cache: LRUTTLCache | None = None):
+        super().__init__(client)
+        self.cache = cache or LRUTTLCache()
+        self._row_cache = _RowCache(self.cache, "cust_id", "email")
+
+    def get_customer_by_id(self, cust_id: int) -> Optional[Dict]:
+        return self._row_cache.get("cust_id", cust_id) or self._row_cache.put(super().get_customer_by_id(cust_id))
+
+    def get_customer_by_email(self, email: str) -> Optional[Dict]:
+        return self._row_cache.get("email", email) or self._row_cache.put(super().get_customer_by_email(email))
+
+    def get_customers_by_ids(self, cust_ids: List[int]) -> List[Dict]:
+        found, missing = [], []
+        for cid in dict.fromkeys(cust_ids):
+            row = self._row_cache.get("cust_id", cid)
+            if row:
+                found.append(row)
+            else:
+                missing.append(cid)
+        if missing:
+            found.extend(self._row_cache.put_many(super().get_customers_by_ids(missing)))
+        return found
+
+    def create_customer(self, *args, **kwargs) -> Optional[Dict]:
+        return self._row_cache.put(super().create_customer(*args, **kwargs))
+
+    def update_customer(self, cust_id: int, fields: Dict) -> Optional[Dict]:
+        self._row_cache.invalidate(cust_id)
+        return self._row_cache.put(super().update_customer(cust_id, fields))
+
+    def upsert_customers(self, rows: List[Dict]) -> List[Dict]:
+        return self._row_cache.put_many(super().upsert_customers(rows))
+
+    def delete_customer(self, cust_id: int) -> Optional[Dict]:
+        row = super().delete_customer(cust_id)
+        self._row_cache.invalidate(cust_id, row)
+        return row
@@ -1,55 +1,87 @@
-from typing import Optional, List, Dict
-from src.config import get_supabase
+from typing import Optional, List, Dict, Iterator
+from src.dao.base_dao import BaseDAO
 
 
-class CustomerDAO:
+class CustomerDAO(BaseDAO):
     """DAO class for customer-related DB operations."""
 
-    def __init__(self):
-        self.sb = get_supabase()
-
     def create_customer(self, name: str, email: str, phone: str, city: str | None = None) -> Optional[Dict]:
         payload = {"name": name, "email": email, "phone": phone}
         if city:
             payload["city"] = city
 
-        self.sb.table("customers").insert(payload).execute()
-
-        resp = self.sb.table("customers").select("*").eq("email", email).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("customers").insert(payload))
+        return self._first(resp)
 
     def get_customer_by_id(self, cust_id: int) -> Optional[Dict]:
-        resp = self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._get_by_key("customers", "cust_id", cust_id)
 
     def get_customer_by_email(self, email: str) -> Optional[Dict]:
-        resp = self.sb.table("customers").select("*").eq("email", email).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._get_by_key("customers", "email", email)
+
+    def get_customers_by_ids(self, cust_ids: List[int]) -> List[Dict]:
+        if not cust_ids:
+            return []
+        resp = self._execute(self.sb.table("customers").select("*").in_("cust_id", list(set(cust_ids))))
+        return self._rows(resp)
+
+    def get_customers_by_emails(self, emails: List[str]) -> List[Dict]:
+        if not emails:
+            return []
+        resp = self._execute(self.sb.table("customers").select("cust_id, email").in_("email", list(set(emails))))
+        return self._rows(resp)
+
+    def upsert_customers(self, rows: List[Dict]) -> List[Dict]:
+        """Insert or update many customers matched on email, one request per set of columns given."""
+        if not rows:
+            return []
+        return self._upsert("customers", rows, "email")
 
     def update_customer(self, cust_id: int, fields: Dict) -> Optional[Dict]:
-        self.sb.table("customers").update(fields).eq("cust_id", cust_id).execute()
-        resp = self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("customers").update(fields).eq("cust_id", cust_id))
+        return self._first(resp)
 
     def delete_customer(self, cust_id: int) -> Optional[Dict]:
-        resp_before = self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-        row = resp_before.data[0] if resp_before.data else None
-        self.sb.table("customers").delete().eq("cust_id", cust_id).execute()
-        return row
+        resp = self._execute(self.sb.table("customers").delete().eq("cust_id", cust_id))
+        return self._first(resp)
 
     def list_customers(self, limit: int = 100) -> List[Dict]:
-        resp = self.sb.table("customers").select("*").order("cust_id", desc=False).limit(limit).execute()
-        return resp.data or []
+        resp = self._execute(self.sb.table("customers").select("*").order("cust_id", desc=False).limit(limit))
+        return self._rows(resp)
+
+    def iter_customers(self, page_size: int | None = None, prefetch: bool = True) -> Iterator[Dict]:
+        return self._iter_keyset("customers", "cust_id", page_size, prefetch=prefetch)
 
-    def search_customers(self, email: str | None = None, city: str | None = None) -> List[Dict]:
+    def search_customers(self, email: str | None = None, city: str | None = None,
+                         limit: int | None = None, offset: int = 0) -> List[Dict]:
         q = self.sb.table("customers").select("*")
         if email:
             q = q.eq("email", email)
         if city:
             q = q.eq("city", city)
-        resp = q.execute()
-        return resp.data or []
+        q = q.order("cust_id", desc=False)
+        if limit is not None:
+            q = q.range(offset, offset + limit - 1)
+        resp = self._execute(q)
+        return self._rows(resp)
+
+    def search_customers_text(self, query: str, fields: List[str] | None = None, fuzzy: bool = True,
+                              limit: int = 20, offset: int = 0) -> List[Dict]:
+        """One page of customers matching ``query`` by prefix or trigram similarity, best first,
+        each with its ``score`` and ``matched`` field (database function search_customers)."""
+        params = {"p_query": query, "p_fuzzy": fuzzy, "p_limit": limit, "p_offset": offset}
+        if fields:
+            params["p_fields"] = list(fields)
+        resp = self._execute(self.sb.rpc("search_customers", params))
+        return self._rows(resp)
+
+    def search_customers_prefix(self, field: str, prefix: str, limit: int) -> List[Dict]:
+        """Customers whose ``field`` starts with ``prefix``, case-insensitively."""
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        q = self.sb.table("customers").select("*").ilike(field, pattern).order("cust_id", desc=False).limit(limit)
+        resp = self._execute(q)
+        return self._rows(resp)
 
     def customer_has_orders(self, cust_id: int) -> bool:
-        resp = self.sb.table("orders").select("*").eq("cust_id", cust_id).limit(1).execute()
+        resp = self._execute(self.sb.table("orders").select("order_id").eq("cust_id", cust_id).limit(1))
         return bool(resp.data)
@@ -0,0 +1,221 @@
+# src/dao/dispatch.py
+import copy
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Errors after which the backend rolled the statement back, so even a write may be resent.
+ROLLED_BACK_CODES = {"40001", "40P01", "55P03"}
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for HTTP 429 responses (PostgREST, the API gateway or a raw httpx error)."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    code = str(getattr(error, "code", None) or "")
+    return status == 429 or code == "429" or "rate limit" in str(error).lower()
+
+
+def is_read(query) -> bool:
+    method = getattr(query, "method", None) or getattr(query, "http_method", None)
+    return str(method).lower() in ("select", "get", "head")
+
+
+def request_key(query) -> Optional[Hashable]:
+    """Identity of a read request, for coalescing identical ones; None for writes and RPCs."""
+    if not is_read(query):
+        return None
+    if hasattr(query, "filters"):  # SQLiteQuery
+        return json.dumps([query.table_name, query.columns, query.filters, query.orders, query.limit_n,
+                           query.offset_n, query.count_mode], default=str)
+    path, params = getattr(query, "path", None), getattr(query, "params", None)
+    if path is None:
+        return None
+    headers = getattr(query, "headers", None) or {}
+    return json.dumps([str(path), str(params), headers.get("Range"), headers.get("Prefer")], default=str)
+
+
+def _copy_response(resp):
+    """Each coalesced caller gets its own row dicts, so one caller's edits do not leak to another."""
+    clone = copy.copy(resp)
+    if isinstance(getattr(resp, "data", None), list):
+        clone.data = [dict(r) if isinstance(r, dict) else r for r in resp.data]
+    return clone
+
+
+class TokenBucket:
+    """``rate`` requests per second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until one is available; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class _LookupGroup:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending: Dict[str, tuple] = {}  # str(key) -> (key, Future)
+        self.sending = 0
+
+
+class Dispatcher:
+    """
+    Every backend request from the DAOs passes through here (BaseDAO._execute).
+
+    - Identical reads already in flight are sent once and the response shared (single-flight),
+      unless a write finished since that read went out, so callers still read their writes.
+    - Point lookups by a key column (BaseDAO._get_by_key) go out at once while fewer than
+      ``lookup_concurrency`` lookups on that table are in flight; beyond that they queue
+      and the next free slot sends the whole queue as one ``in`` query. ``batch_window``
+      adds a fixed wait to gather more.
+    - With ``rate`` set, a token bucket spaces requests out. Rate-limited (429) requests,
+      and reads that failed transiently, are retried with exponential backoff and jitter.
+      Writes are only resent when the backend says it did not apply them.
+    """
+
+    def __init__(self, rate: float = 0, burst: int | None = None, retries: int = 3, backoff: float = 0.1,
+                 max_backoff: float = 5.0, single_flight: bool = True, batch_lookups: bool = True,
+                 batch_window: float = 0.0, max_batch: int = 200, lookup_concurrency: int = 4,
+                 transient: Callable[[Exception], bool] | None = None):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.single_flight = single_flight
+        self.batch_lookups = batch_lookups
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.lookup_concurrency = lookup_concurrency
+        self.transient = transient or (lambda e: False)
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, tuple] = {}  # key -> (Future, writes finished when sent)
+        self._writes = 0
+        self._groups: Dict[tuple, _LookupGroup] = {}
+        self._stats = {"sent": 0, "coalesced": 0, "lookups": 0, "lookup_batches": 0, "retries": 0,
+                       "throttled_s": 0.0}
+
+    def execute(self, query, send: Callable[[Any], Any]):
+        key = request_key(query) if self.single_flight else None
+        if key is None:
+            return self._send(query, send)
+        with self._lock:
+            shared = self._inflight.get(key)
+            if shared is not None and shared[1] == self._writes:
+                self._stats["coalesced"] += 1
+            else:
+                shared = None
+                entry = self._inflight[key] = (Future(), self._writes)
+        if shared is not None:
+            return _copy_response(shared[0].result())
+        try:
+            resp = self._send(query, send)
+            entry[0].set_result(resp)
+            return resp
+        except BaseException as e:
+            entry[0].set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+
+    def _send(self, query, send: Callable[[Any], Any]):
+        read = is_read(query)
+        try:
+            return self._attempt(query, send, read)
+        finally:
+            if not read:
+                with self._lock:
+                    self._writes += 1
+
+    def _attempt(self, query, send: Callable[[Any], Any], read: bool):
+        attempt = 0
+        while True:
+            if self.bucket:
+                waited = self.bucket.acquire()
+                if waited:
+                    with self._lock:
+                        self._stats["throttled_s"] += waited
+            with self._lock:
+                self._stats["sent"] += 1
+            try:
+                return send(query)
+            except Exception as e:
+                retry = is_rate_limited(e) or str(getattr(e, "code", None)) in ROLLED_BACK_CODES \
+                    or (read and self.transient(e))
+                if not retry or attempt >= self.retries:
+                    raise
+            attempt += 1
+            with self._lock:
+                self._stats["retries"] += 1
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def lookup(self, group: tuple, key, fetch: Callable[[List], List[Dict]], column: str) -> Optional[Dict]:
+        """
+        The row whose ``column`` equals ``key``, fetched together with concurrent lookups of
+        the same ``group`` by ``fetch(keys)`` (one ``in`` query returning the matching rows).
+        """
+        with self._lock:
+            state = self._groups.setdefault(group, _LookupGroup())
+            self._stats["lookups"] += 1
+        wanted = str(key)
+        with state.cond:
+            entry = state.pending.get(wanted)
+            if entry is None:
+                entry = state.pending[wanted] = (key, Future())
+        while True:
+            with state.cond:
+                while state.pending.get(wanted) is entry and state.sending >= self.lookup_concurrency:
+                    state.cond.wait()
+                if state.pending.get(wanted) is not entry:
+                    break  # sent, or being sent, by another caller
+                state.sending += 1
+            if self.batch_window:
+                time.sleep(self.batch_window)
+            with state.cond:
+                batch = list(state.pending.items())[: self.max_batch]
+                for k, _ in batch:
+                    del state.pending[k]
+            try:
+                if batch:
+                    with self._lock:
+                        self._stats["lookup_batches"] += 1
+                    rows = {str(r[column]): r for r in fetch([key for _, (key, _) in batch])}
+                    for k, (_, waiting) in batch:
+                        waiting.set_result(rows.get(k))
+            except BaseException as e:
+                for _, (_, waiting) in batch:
+                    if not waiting.done():
+                        waiting.set_exception(e)
+            finally:
+                with state.cond:
+                    state.sending -= 1
+                    state.cond.notify_all()
+        row = entry[1].result()
+        return dict(row) if row is not None else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "throttled_s": round(self._stats["throttled_s"], 3),
+                    "rate": self.bucket.rate if self.bucket else None}
+
+    def reset(self):
+        with self._lock:
+            self._stats = {k: 0.0 if k == "throttled_s" else 0 for k in self._stats}
@@ -0,0 +1,24 @@
+# src/dao/export_dao.py
+from typing import Dict, Iterator
+from src.dao.base_dao import BaseDAO
+
+# Every exported table with its key, in export order, and its columns with snapshot types.
+EXPORT_TABLES = {
+    "customers": ("cust_id", {"cust_id": "int64", "name": "string", "email": "string", "phone": "string",
+                              "city": "string", "created_at": "timestamp"}),
+    "products": ("prod_id", {"prod_id": "int64", "name": "string", "sku": "string", "price": "float64",
+                             "stock": "int64", "category": "string", "reorder_threshold": "int64"}),
+    "orders": ("order_id", {"order_id": "int64", "cust_id": "int64", "order_date": "timestamp",
+                            "total_amount": "float64", "status": "string"}),
+    "order_items": ("item_id", {"item_id": "int64", "order_id": "int64", "prod_id": "int64", "quantity": "int64",
+                                "price": "float64"}),
+    "payments": ("payment_id", {"payment_id": "int64", "order_id": "int64", "amount": "float64",
+                                "method": "string", "status": "string", "created_at": "timestamp"}),
+}
+
+
+class ExportDAO(BaseDAO):
+    def iter_table(self, table: str, page_size: int | None = None) -> Iterator[Dict]:
+        """Every row of an exported table in key order, a keyset page at a time."""
+        key, columns = EXPORT_TABLES[table]
+        return self._iter_keyset(table, key, page_size, columns=", ".join(columns))
@@ -0,0 +1,14 @@
+# src/dao/journal_dao.py
+from typing import Dict, List
+from src.dao.base_dao import BaseDAO
+
+
+class JournalDAO(BaseDAO):
+    def apply_entries(self, entries: List[Dict]) -> List[Dict]:
+        """Apply write-behind journal entries in order, each at most once (database function apply_journal).
+        Returns one ``{"key", "status", "result", "error"}`` per entry; status is applied or rejected."""
+        if not entries:
+            return []
+        payload = [{"key": e["key"], "kind": e["kind"], "payload": e["payload"]} for e in entries]
+        resp = self._execute(self.sb.rpc("apply_journal", {"p_entries": payload}))
+        return self._rows(resp)
@@ -1,39 +1,165 @@
 # src/dao/order_dao.py
-from typing import List, Dict, Optional
-from src.config import get_supabase
+from itertools import islice
+from typing import List, Dict, Optional, Iterator
+from src.config import PAGE_SIZE
+from src.dao.base_dao import BaseDAO, is_missing_relationship
 
-class OrderDAO:
-    def __init__(self):
-        self.sb = get_supabase()
+ORDER_ITEMS = "order_items(*, products(name))"
+ORDER_DETAILS = f"*, customers(*), {ORDER_ITEMS}"
+
+
+class OrderDAO(BaseDAO):
+    def __init__(self, client=None):
+        super().__init__(client)
+        # Embedded selects need the foreign keys in the API's schema cache; without them
+        # orders, customers, items and product names are fetched with one IN query each.
+        self.use_embed = True
 
     def create_order(self, cust_id: int, total_amount: float, status: str = "PLACED") -> Optional[Dict]:
         payload = {"cust_id": cust_id, "total_amount": total_amount, "status": status}
-        self.sb.table("orders").insert(payload).execute()
-        resp = self.sb.table("orders").select("*").eq("cust_id", cust_id).order("order_id", desc=True).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("orders").insert(payload))
+        return self._first(resp)
 
-    def create_order_items(self, order_id: int, items: List[Dict]):
-        for item in items:
-            payload = {"order_id": order_id,"prod_id": item["prod_id"],"quantity": item["quantity"],"price": item["price"]}
-            self.sb.table("order_items").insert(payload).execute()
+    def create_order_items(self, order_id: int, items: List[Dict]) -> List[Dict]:
+        if not items:
+            return []
+        payload = [{"order_id": order_id,"prod_id": item["prod_id"],"quantity": item["quantity"],"price": item["price"]} for item in items]
+        resp = self._execute(self.sb.table("order_items").insert(payload))
+        return self._rows(resp)
+
+    def get_order(self, order_id: int) -> Optional[Dict]:
+        return self._get_by_key("orders", "order_id", order_id)
+
+    def get_orders_by_ids(self, order_ids: List[int]) -> List[Dict]:
+        if not order_ids:
+            return []
+        resp = self._execute(self.sb.table("orders").select("*").in_("order_id", list(set(order_ids))))
+        return self._rows(resp)
+
+    def get_order_items(self, order_id: int) -> List[Dict]:
+        resp = self._execute(self.sb.table("order_items").select("*").eq("order_id", order_id))
+        return self._rows(resp)
 
     def get_order_details(self, order_id: int) -> Optional[Dict]:
-        resp_order = self.sb.table("orders").select("*").eq("order_id", order_id).limit(1).execute()
-        order = resp_order.data[0] if resp_order.data else None
-        if not order:
+        details = self.get_orders_details([order_id])
+        return details[0] if details else None
+
+    def get_orders_details(self, order_ids: List[int]) -> List[Dict]:
+        """
+        ``{"order", "customer", "items"}`` for each existing order, in the order asked for, in
+        one request; items carry ``product_name``.
+        """
+        if not order_ids:
+            return []
+        ids = list(dict.fromkeys(order_ids))
+        rows = self._embedded(lambda: self._rows(self._execute(
+            self.sb.table("orders").select(ORDER_DETAILS).in_("order_id", ids))))
+        if rows is None:
+            rows = self._attach_items(self.get_orders_by_ids(ids), customers=True)
+        found = {row["order_id"]: row for row in rows}
+        return [self._details(found[oid]) for oid in ids if oid in found]
+
+    def list_orders_by_customer(self, cust_id: int, with_items: bool = False) -> List[Dict]:
+        return list(self.iter_orders(cust_id, with_items=with_items))
+
+    def iter_orders(self, cust_id: int | None = None, page_size: int | None = None, prefetch: bool = True,
+                    status: str | None = None, with_items: bool = False) -> Iterator[Dict]:
+        """Orders by id; ``with_items`` adds each order's ``items`` with the page, one request per page."""
+        def where(q):
+            if cust_id is not None:
+                q = q.eq("cust_id", cust_id)
+            if status is not None:
+                q = q.eq("status", status)
+            return q
+        if with_items:
+            return self._iter_with_items(where, page_size or PAGE_SIZE, prefetch)
+        return self._iter_keyset("orders", "order_id", page_size, where=where, prefetch=prefetch)
+
+    def _iter_with_items(self, where, page_size: int, prefetch: bool) -> Iterator[Dict]:
+        if self.use_embed:
+            rows = self._iter_keyset("orders", "order_id", page_size, f"*, {ORDER_ITEMS}", where, prefetch)
+            first = self._embedded(lambda: next(rows, None))
+            if self.use_embed:
+                if first is not None:
+                    yield self._with_items(first)
+                    yield from map(self._with_items, rows)
+                return
+        rows = self._iter_keyset("orders", "order_id", page_size, where=where, prefetch=prefetch)
+        while True:
+            page = list(islice(rows, page_size))
+            if not page:
+                return
+            yield from map(self._with_items, self._attach_items(page))
+
+    def _embedded(self, fetch):
+        """Run an embedded select; None once the backend has said it cannot resolve the embedding."""
+        if not self.use_embed:
             return None
-        resp_cust = self.sb.table("customers").select("*").eq("cust_id", order["cust_id"]).limit(1).execute()
-        customer = resp_cust.data[0] if resp_cust.data else None
-        resp_items = self.sb.table("order_items").select("*").eq("order_id", order_id).execute()
-        items = resp_items.data or []
-        return {"order": order, "customer": customer, "items": items}
+        try:
+            return fetch()
+        except Exception as e:
+            if not is_missing_relationship(e):
+                raise
+            self.use_embed = False
+            return None
+
+    def _attach_items(self, orders: List[Dict], customers: bool = False) -> List[Dict]:
+        """Without embedding: the rows an embedded select returns, from one IN query per table."""
+        if not orders:
+            return orders
+        ids = [o["order_id"] for o in orders]
+        items = self._rows(self._execute(self.sb.table("order_items").select("*").in_("order_id", ids).order("item_id")))
+        prod_ids = list({i["prod_id"] for i in items})
+        names = {p["prod_id"]: {"name": p["name"]} for p in self._rows(self._execute(
+            self.sb.table("products").select("prod_id, name").in_("prod_id", prod_ids)))} if prod_ids else {}
+        by_order: Dict[int, List[Dict]] = {}
+        for item in items:
+            by_order.setdefault(item["order_id"], []).append({**item, "products": names.get(item["prod_id"])})
+        found = {}
+        if customers:
+            cust_ids = list({o["cust_id"] for o in orders})
+            found = {c["cust_id"]: c for c in self._rows(self._execute(
+                self.sb.table("customers").select("*").in_("cust_id", cust_ids)))}
+        return [{**o, "order_items": by_order.get(o["order_id"], []),
+                 **({"customers": found.get(o["cust_id"])} if customers else {})} for o in orders]
+
+    @staticmethod
+    def _with_items(row: Dict) -> Dict:
+        """
+        An embedded order row with its items under ``items``, each with ``product_name``.
+        Builds new dicts: coalesced reads share the response rows between callers.
+        """
+        items = [{**{k: v for k, v in item.items() if k != "products"},
+                  "product_name": item["products"]["name"] if item.get("products") else None}
+                 for item in row["order_items"]]
+        return {**{k: v for k, v in row.items() if k not in ("order_items", "customers")}, "items": items}
+
+    @classmethod
+    def _details(cls, row: Dict) -> Dict:
+        order = cls._with_items(row)
+        return {"order": order, "customer": row["customers"], "items": order.pop("items")}
+
+    def iter_order_items(self, page_size: int | None = None, prefetch: bool = True) -> Iterator[Dict]:
+        return self._iter_keyset("order_items", "item_id", page_size, prefetch=prefetch)
 
+    def update_order_status(self, order_id: int, status: str, expected_status: str | None = None) -> Optional[Dict]:
+        q = self.sb.table("orders").update({"status": status}).eq("order_id", order_id)
+        if expected_status:
+            q = q.eq("status", expected_status)
+        resp = self._execute(q)
+        return self._first(resp)
 
-    def list_orders_by_customer(self, cust_id: int) -> List[Dict]:
-        resp = self.sb.table("orders").select("*").eq("cust_id", cust_id).execute()
-        return resp.data or []
+    def cancel_order(self, order_id: int) -> Dict:
+        """Cancel a PLACED order and release its stock in one transaction; ``{"order", "items", "products"}``."""
+        resp = self._execute(self.sb.rpc("cancel_order", {"p_order_id": order_id}))
+        return resp.data[0] if isinstance(resp.data, list) else resp.data
 
-    def update_order_status(self, order_id: int, status: str) -> Optional[Dict]:
-        self.sb.table("orders").update({"status": status}).eq("order_id", order_id).execute()
-        resp = self.sb.table("orders").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+    def update_orders_status(self, order_ids: List[int], status: str, expected_status: str | None = None) -> List[Dict]:
+        """Set ``status`` on many orders in one request; returns only the rows actually changed."""
+        if not order_ids:
+            return []
+        q = self.sb.table("orders").update({"status": status}).in_("order_id", list(set(order_ids)))
+        if expected_status:
+            q = q.eq("status", expected_status)
+        resp = self._execute(q)
+        return self._rows(resp)
@@ -1,25 +1,41 @@
 # src/dao/payment_dao.py
 from typing import List, Dict, Optional
-from src.config import get_supabase
-
-class PaymentDAO:
-    def __init__(self):
-        self.sb = get_supabase()
+from src.dao.base_dao import BaseDAO
 
+class PaymentDAO(BaseDAO):
     def create_payment(self, order_id: int, amount: float, method: str = None, status: str = "PENDING") -> Optional[Dict]:
         payload = {"order_id": order_id, "amount": amount, "method": method, "status": status}
-        self.sb.table("payments").insert(payload).execute()
-        resp = self.sb.table("payments").select("*").eq("order_id", order_id).order("payment_id", desc=True).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("payments").insert(payload))
+        return self._first(resp)
 
     def update_payment_status(self, payment_id: int, status: str, method: str = None) -> Optional[Dict]:
         fields = {"status": status}
         if method:
             fields["method"] = method
-        self.sb.table("payments").update(fields).eq("payment_id", payment_id).execute()
-        resp = self.sb.table("payments").select("*").eq("payment_id", payment_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("payments").update(fields).eq("payment_id", payment_id))
+        return self._first(resp)
 
     def get_payment_by_order(self, order_id: int) -> Optional[Dict]:
-        resp = self.sb.table("payments").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("payments").select("*").eq("order_id", order_id).limit(1))
+        return self._first(resp)
+
+    def get_payments_by_orders(self, order_ids: List[int]) -> List[Dict]:
+        if not order_ids:
+            return []
+        resp = self._execute(self.sb.table("payments").select("*").in_("order_id", list(set(order_ids))))
+        return self._rows(resp)
+
+    def create_payments(self, rows: List[Dict]) -> List[Dict]:
+        if not rows:
+            return []
+        resp = self._execute(self.sb.table("payments").insert(rows))
+        return self._rows(resp)
+
+    def update_payments_status(self, payment_ids: List[int], status: str, method: str = None) -> List[Dict]:
+        if not payment_ids:
+            return []
+        fields = {"status": status}
+        if method:
+            fields["method"] = method
+        resp = self._execute(self.sb.table("payments").update(fields).in_("payment_id", list(set(payment_ids))))
+        return self._rows(resp)
@@ -1,42 +1,82 @@
-from typing import Optional, List, Dict
-from src.config import get_supabase
+from typing import Optional, List, Dict, Iterator
+from src.dao.base_dao import BaseDAO
 
 
-class ProductDAO:
-    def __init__(self):
-        self.sb = get_supabase()
-
-    def create_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None) -> Optional[Dict]:
+class ProductDAO(BaseDAO):
+    def create_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None,
+                       reorder_threshold: int | None = None) -> Optional[Dict]:
         payload = {"name": name, "sku": sku, "price": price, "stock": stock}
         if category is not None:
             payload["category"] = category
+        if reorder_threshold is not None:
+            payload["reorder_threshold"] = reorder_threshold
 
-        self.sb.table("products").insert(payload).execute()
-        resp = self.sb.table("products").select("*").eq("sku", sku).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("products").insert(payload))
+        return self._first(resp)
 
     def get_product_by_id(self, prod_id: int) -> Optional[Dict]:
-        resp = self.sb.table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._get_by_key("products", "prod_id", prod_id)
+
+    def get_products_by_ids(self, prod_ids: List[int]) -> List[Dict]:
+        if not prod_ids:
+            return []
+        resp = self._execute(self.sb.table("products").select("*").in_("prod_id", list(set(prod_ids))))
+        return self._rows(resp)
 
     def get_product_by_sku(self, sku: str) -> Optional[Dict]:
-        resp = self.sb.table("products").select("*").eq("sku", sku).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._get_by_key("products", "sku", sku)
+
+    def get_products_by_skus(self, skus: List[str]) -> List[Dict]:
+        if not skus:
+            return []
+        resp = self._execute(self.sb.table("products").select("prod_id, sku").in_("sku", list(set(skus))))
+        return self._rows(resp)
+
+    def upsert_products(self, rows: List[Dict]) -> List[Dict]:
+        """Insert or update many products matched on sku, one request per set of columns given."""
+        if not rows:
+            return []
+        return self._upsert("products", rows, "sku")
 
     def update_product(self, prod_id: int, fields: Dict) -> Optional[Dict]:
-        self.sb.table("products").update(fields).eq("prod_id", prod_id).execute()
-        resp = self.sb.table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        resp = self._execute(self.sb.table("products").update(fields).eq("prod_id", prod_id))
+        return self._first(resp)
+
+    def reserve_stock(self, items: List[Dict]) -> List[Dict]:
+        """Decrement stock for all items in one transaction; raises if any line is short."""
+        resp = self._execute(self.sb.rpc("reserve_stock", {"p_items": items}))
+        return self._rows(resp)
+
+    def release_stock(self, items: List[Dict]) -> List[Dict]:
+        resp = self._execute(self.sb.rpc("release_stock", {"p_items": items}))
+        return self._rows(resp)
+
+    def compare_and_set_stock(self, prod_id: int, expected: int, new_stock: int) -> Optional[Dict]:
+        """Set stock only if it still equals ``expected``; None means another writer won."""
+        resp = self._execute(self.sb.table("products").update({"stock": new_stock}).eq("prod_id", prod_id).eq("stock", expected))
+        return self._first(resp)
 
     def delete_product(self, prod_id: int) -> Optional[Dict]:
-        resp_before = self.sb.table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
-        row = resp_before.data[0] if resp_before.data else None
-        self.sb.table("products").delete().eq("prod_id", prod_id).execute()
-        return row
+        resp = self._execute(self.sb.table("products").delete().eq("prod_id", prod_id))
+        return self._first(resp)
 
     def list_products(self, limit: int = 100, category: str | None = None) -> List[Dict]:
         q = self.sb.table("products").select("*").order("prod_id", desc=False).limit(limit)
         if category:
             q = q.eq("category", category)
-        resp = q.execute()
-        return resp.data or []
+        resp = self._execute(q)
+        return self._rows(resp)
+
+    def iter_products(self, page_size: int | None = None, category: str | None = None, prefetch: bool = True) -> Iterator[Dict]:
+        where = (lambda q: q.eq("category", category)) if category else None
+        return self._iter_keyset("products", "prod_id", page_size, where=where, prefetch=prefetch)
+
+    def iter_low_stock(self, threshold: int = 5, page_size: int | None = None) -> Iterator[Dict]:
+        return self._iter_keyset("products", "prod_id", page_size, where=lambda q: q.lte("stock", threshold))
+
+    def low_stock_page(self, limit: int, after: tuple | None = None) -> List[Dict]:
+        """One page of products at or below their reorder threshold, most urgent first.
+        ``after`` is the ``(headroom, prod_id)`` of the previous page's last row."""
+        params = {"p_limit": limit, "p_after_headroom": after[0] if after else None, "p_after_id": after[1] if after else None}
+        resp = self._execute(self.sb.rpc("low_stock_products", params))
+        return self._rows(resp)
@@ -0,0 +1,46 @@
+# src/dao/report_dao.py
+from datetime import datetime
+from typing import List, Dict, Iterator
+from src.dao.base_dao import BaseDAO
+
+
+class ReportDAO(BaseDAO):
+    """Reporting queries. Aggregates run in the database via the functions in sql/functions.sql."""
+
+    def top_selling_products(self, limit: int = 5) -> List[Dict]:
+        resp = self._execute(self.sb.rpc("top_selling_products", {"p_limit": limit}))
+        return self._rows(resp)
+
+    def revenue_since(self, since: datetime) -> float:
+        resp = self._execute(self.sb.rpc("revenue_since", {"p_since": since.isoformat()}))
+        row = self._first(resp)
+        return float(row["revenue"] or 0) if row else 0.0
+
+    def orders_per_customer(self, min_orders: int = 1) -> List[Dict]:
+        resp = self._execute(self.sb.rpc("orders_per_customer", {"p_min_orders": min_orders}))
+        return self._rows(resp)
+
+    def sales_report(self, reports: List[str], top: int = 5, min_orders: int = 3, since: datetime | None = None,
+                     until: datetime | None = None, revenue_since: datetime | None = None) -> Dict[str, object]:
+        """Several reports from one scan of orders and one of order_items (database function sales_report)."""
+        resp = self._execute(self.sb.rpc("sales_report", {
+            "p_reports": list(reports), "p_top": top, "p_min_orders": min_orders,
+            "p_since": since.isoformat() if since else None, "p_until": until.isoformat() if until else None,
+            "p_revenue_since": revenue_since.isoformat() if revenue_since else None}))
+        return {r["report"]: r["result"] for r in self._rows(resp)}
+
+    # Raw scans, used when the aggregate functions are not deployed. They stream
+    # only the columns a report needs, a keyset page at a time.
+
+    def scan_order_items(self, page_size: int | None = None) -> Iterator[Dict]:
+        return self._iter_keyset("order_items", "item_id", page_size, columns="item_id, order_id, prod_id, quantity")
+
+    def scan_orders(self, since: datetime | None = None, until: datetime | None = None, page_size: int | None = None,
+                    columns: str = "order_id, cust_id, total_amount, order_date") -> Iterator[Dict]:
+        def where(q):
+            if since is not None:
+                q = q.gte("order_date", since)
+            if until is not None:
+                q = q.lt("order_date", until)
+            return q
+        return self._iter_keyset("orders", "order_id", page_size, columns=columns, where=where)
@@ -0,0 +1,87 @@
+# src/services/async_services.py
+import asyncio
+from typing import Dict, List
+from src.config import POOL_SIZE
+from src.dao.async_dao import AsyncDAO
+from src.services.order_service import OrderService, OrderError
+from src.services.payment_service import PaymentService, PaymentError
+
+
+class AsyncOrderService:
+    """
+    asyncio counterpart of OrderService. Independent lookups run concurrently so a call
+    costs its critical path rather than the sum of its round trips; at most
+    ``concurrency`` backend requests are in flight across everything sharing ``limiter``.
+    """
+
+    def __init__(self, order_service: OrderService, concurrency: int = POOL_SIZE, limiter: asyncio.Semaphore | None = None):
+        self.sync = order_service
+        self.limiter = limiter or asyncio.Semaphore(concurrency)
+        self.dao = AsyncDAO(order_service.dao, self.limiter)
+        self.customers = AsyncDAO(order_service.customer_service.dao, self.limiter)
+        self.products = AsyncDAO(order_service.product_service.dao, self.limiter)
+        self.service = AsyncDAO(order_service, self.limiter)
+
+    async def get_order_details(self, order_id: int) -> Dict:
+        order_detail = await self.dao.get_order_details(order_id)
+        if not order_detail:
+            raise OrderError("Order not found")
+        return order_detail
+
+    async def get_many_order_details(self, order_ids: List[int]) -> List[Dict]:
+        details = {d["order"]["order_id"]: d for d in await self.dao.get_orders_details(order_ids)}
+        if len(details) < len(set(order_ids)):
+            raise OrderError("Order not found")
+        return [details[oid] for oid in order_ids]
+
+    async def list_orders_of_customer(self, customer_id: int, with_items: bool = False) -> List[Dict]:
+        return await self.dao.list_orders_by_customer(customer_id, with_items)
+
+    async def create_order(self, customer_id: int, items: List[Dict]) -> Dict:
+        customer, products = await asyncio.gather(
+            self.customers.get_customer_by_id(customer_id),
+            self.products.get_products_by_ids([i["prod_id"] for i in items]),
+        )
+        if not customer:
+            raise OrderError(f"Customer {customer_id} does not exist")
+        products = {p["prod_id"]: p for p in products}
+        validated_items, total_amount = self.sync.price_items(items, products)
+        # reserve -> order -> items is a dependency chain, so it runs as one step.
+        return await self.service.place_order(customer, validated_items, total_amount, products)
+
+    async def cancel_order(self, order_id: int) -> Dict:
+        return await self.service.cancel_order(order_id)
+
+    async def complete_order(self, order_id: int) -> Dict:
+        return await self.service.complete_order(order_id)
+
+
+class AsyncPaymentService:
+    """asyncio counterpart of PaymentService sharing AsyncOrderService's concurrency limit."""
+
+    def __init__(self, payment_service: PaymentService, order_service: AsyncOrderService):
+        self.sync = payment_service
+        self.order_service = order_service
+        self.dao = AsyncDAO(payment_service.dao, order_service.limiter)
+
+    async def process_payment(self, order_id: int, method: str) -> Dict:
+        try:
+            order, payment = await asyncio.gather(
+                self.order_service.get_order_details(order_id), self.dao.get_payment_by_order(order_id)
+            )
+        except OrderError:
+            raise PaymentError("Order not found")
+        if order["order"]["status"] != "PLACED":
+            raise PaymentError("Order cannot be paid; status is not PLACED")
+        # Same order as PaymentService: the payment row exists, the order is completed, and only
+        # then is the payment marked PAID, so a failed completion never leaves a PAID payment.
+        if not payment:
+            payment = await self.dao.create_payment(order_id, order["order"]["total_amount"])
+        await self.order_service.complete_order(order_id)
+        return await self.dao.update_payment_status(payment["payment_id"], "PAID", method)
+
+    async def refund_payment(self, order_id: int) -> Dict:
+        payment = await self.dao.get_payment_by_order(order_id)
+        if not payment:
+            raise PaymentError("Payment not found")
+        return await self.dao.update_payment_status(payment["payment_id"], "REFUNDED")
@@ -0,0 +1,147 @@
+# src/services/columnar.py
+import heapq
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+ITEM_BYTES = 8
+# Kernel temporaries (sort/inverse/bincount buffers) need a few times the chunk itself.
+KERNEL_OVERHEAD = 4
+
+
+def chunk_rows(memory_mb: float, columns: int) -> int:
+    """Rows per columnar chunk so that ``columns`` 8-byte columns plus kernel scratch fit in ``memory_mb``."""
+    return max(1024, int(memory_mb * 2 ** 20) // (columns * ITEM_BYTES * KERNEL_OVERHEAD))
+
+
+def column_chunks(rows: Iterable[Dict], columns: Dict[str, str], max_rows: int) -> Iterator[Dict[str, array]]:
+    """
+    Pack a stream of row dicts into typed ``array`` columns (``"q"`` int64, ``"d"`` float64),
+    yielding at most ``max_rows`` rows at a time. None values become 0.
+    """
+    def empty():
+        return {name: array(code) for name, code in columns.items()}
+
+    chunk, count = empty(), 0
+    appenders = [(name, chunk[name].append) for name in columns]
+    for row in rows:
+        for name, append in appenders:
+            append(row[name] or 0)
+        count += 1
+        if count == max_rows:
+            yield chunk
+            chunk, count = empty(), 0
+            appenders = [(name, chunk[name].append) for name in columns]
+    if count:
+        yield chunk
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy for the vectorised kernels, or None; imported on first use so other commands do not pay for it."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - pure-Python kernels below
+        return None
+    return numpy
+
+
+def _code(values) -> str:
+    """Item code of an ``array`` or of a cast ``memoryview`` (snapshot columns)."""
+    return getattr(values, "typecode", None) or values.format
+
+
+def _np(values):
+    np = _numpy()
+    return np.frombuffer(values, dtype=np.float64 if _code(values) == "d" else np.int64)
+
+
+def column_sum(values: array, where: array | None = None, at_least: float | None = None) -> float:
+    """Sum of ``values``, or of those whose row in ``where`` is at least ``at_least``."""
+    np = _numpy()
+    if where is None or at_least is None:
+        if np is not None and len(values):
+            return float(_np(values).sum())
+        return math.fsum(values)
+    if np is not None and len(values):
+        return float(_np(values)[_np(where) >= at_least].sum())
+    return math.fsum(v for v, w in zip(values, where) if w >= at_least)
+
+
+def keep_rows(chunk: Dict[str, array], column: str, allowed: array) -> Dict[str, array]:
+    """The rows of ``chunk`` whose ``column`` value is in ``allowed`` (an ascending int64 array)."""
+    np = _numpy()
+    keys = chunk[column]
+    if np is not None and len(keys) and len(allowed):
+        k, a = _np(keys), _np(allowed)
+        pos = np.minimum(np.searchsorted(a, k), len(a) - 1)
+        mask = a[pos] == k
+        return {name: array(_code(col), _np(col)[mask].tobytes()) for name, col in chunk.items()}
+    rows = [i for i, key in enumerate(keys) if _contains(allowed, key)]
+    return {name: array(_code(col), (col[i] for i in rows)) for name, col in chunk.items()}
+
+
+def rows_between(chunk: Dict[str, array], column: str, low: float | None, high: float | None) -> Dict[str, array]:
+    """The rows of ``chunk`` with ``low <= column < high`` (either bound may be None)."""
+    if low is None and high is None:
+        return chunk
+    np = _numpy()
+    low = -math.inf if low is None else low
+    high = math.inf if high is None else high
+    if np is not None and len(chunk[column]):
+        c = _np(chunk[column])
+        mask = (c >= low) & (c < high)
+        return {name: array(_code(col), _np(col)[mask].tobytes()) for name, col in chunk.items()}
+    rows = [i for i, v in enumerate(chunk[column]) if low <= v < high]
+    return {name: array(_code(col), (col[i] for i in rows)) for name, col in chunk.items()}
+
+
+def _contains(sorted_values: array, key) -> bool:
+    i = bisect_left(sorted_values, key)
+    return i < len(sorted_values) and sorted_values[i] == key
+
+
+class GroupSum:
+    """Running per-key totals over integer key columns, fed one chunk at a time."""
+
+    def __init__(self):
+        self.totals: Counter = Counter()
+
+    def add(self, keys, values=None):
+        """Add ``values`` (or 1 per row when None) to each row's key."""
+        if not len(keys):
+            return
+        np = _numpy()
+        if np is not None:
+            k = _np(keys)
+            uniq, inverse = np.unique(k, return_inverse=True)
+            if values is None:
+                sums = np.bincount(inverse, minlength=len(uniq))
+            else:
+                v = _np(values)
+                sums = np.bincount(inverse, weights=v, minlength=len(uniq))
+                if _code(values) != "d":
+                    sums = np.rint(sums).astype(np.int64)
+            self.totals.update(dict(zip(uniq.tolist(), sums.tolist())))
+        elif values is None:
+            self.totals.update(keys)
+        else:
+            totals = self.totals
+            for key, value in zip(keys, values):
+                totals[key] += value
+
+    def top(self, k: int) -> List[Tuple[int, float]]:
+        """The ``k`` largest totals, ties broken by smaller key."""
+        np = _numpy()
+        if np is not None and len(self.totals) > k:
+            keys = np.fromiter(self.totals.keys(), dtype=np.int64, count=len(self.totals))
+            values = np.fromiter(self.totals.values(), dtype=np.float64, count=len(self.totals))
+            order = np.lexsort((keys, -values))[:k]
+            return [(int(key), self.totals[int(key)]) for key in keys[order]]
+        return heapq.nsmallest(k, self.totals.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    def at_least(self, minimum: float) -> List[Tuple[int, float]]:
+        return sorted((key, total) for key, total in self.totals.items() if total >= minimum)
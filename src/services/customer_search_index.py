@@ -0,0 +1,157 @@
+# src/services/customer_search_index.py
+import heapq
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, List, Sequence
+from src.dao.customer_dao import CustomerDAO
+from src.textsearch import (CUSTOMER_SEARCH_FIELDS, FUZZY_THRESHOLD, MIN_FUZZY_LENGTH, normalize, rank, tokens,
+                            trigrams)
+
+
+class CustomerSearchIndex:
+    """
+    In-memory search index over customer name, email, phone and city for the daemon and
+    shell, so counter lookups answer without a backend round trip.
+
+    Per field it keeps a sorted list of ``(word, cust_id, whole)`` for prefix lookups by
+    bisection and a trigram -> customer ids map for typo-tolerant lookups; candidates are
+    ranked with the same scoring as the database function. ``load`` reads the customer table once;
+    the CustomerService keeps the index current for its own writes, and writes made
+    elsewhere (imports, other processes) are picked up by reloading after ``max_age`` seconds.
+    """
+
+    def __init__(self, dao: CustomerDAO, max_age: float | None = 300.0):
+        self.dao = dao
+        self.max_age = max_age
+        self.loaded_at: float | None = None
+        self._lock = threading.RLock()
+        self._rows: Dict[int, Dict] = {}
+        self._words: Dict[str, List[tuple]] = {f: [] for f in CUSTOMER_SEARCH_FIELDS}
+        self._grams: Dict[str, Dict[str, set]] = {f: {} for f in CUSTOMER_SEARCH_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def load(self, page_size: int | None = None) -> int:
+        rows, words, grams = {}, {f: [] for f in CUSTOMER_SEARCH_FIELDS}, {f: {} for f in CUSTOMER_SEARCH_FIELDS}
+        for row in self.dao.iter_customers(page_size):
+            rows[row["cust_id"]] = row
+            for field, value in self._values(row):
+                words[field].extend(self._entries(field, value, row["cust_id"]))
+                for g in trigrams(value):
+                    grams[field].setdefault(g, set()).add(row["cust_id"])
+        for entries in words.values():
+            entries.sort()
+        with self._lock:
+            self._rows, self._words, self._grams = rows, words, grams
+            self.loaded_at = time.monotonic()
+        return len(rows)
+
+    def upsert(self, row: Dict | None):
+        if not row:
+            return
+        with self._lock:
+            self._remove(row["cust_id"])
+            self._rows[row["cust_id"]] = row
+            for field, value in self._values(row):
+                for entry in self._entries(field, value, row["cust_id"]):
+                    insort(self._words[field], entry)
+                for g in trigrams(value):
+                    self._grams[field].setdefault(g, set()).add(row["cust_id"])
+
+    def remove(self, cust_id: int):
+        with self._lock:
+            self._remove(cust_id)
+
+    def search(self, query: str, fields: Sequence[str] = CUSTOMER_SEARCH_FIELDS, fuzzy: bool = True,
+               limit: int = 20, offset: int = 0) -> List[Dict]:
+        """
+        Prefix matches (scores 1.0/0.9/0.85) always outrank fuzzy ones (at most 0.8), so
+        they are taken straight from the word lists, and trigram candidates are only
+        scored when the prefix matches do not fill the page.
+        """
+        if self.loaded_at is None or (self.max_age is not None and time.monotonic() - self.loaded_at > self.max_age):
+            self.load()
+        wanted = offset + limit
+        with self._lock:
+            terms = [(f, t) for f, t in ((f, normalize(f, query)) for f in fields) if t]
+            # Prefix tiers best first; within a tier the smallest ids, matched on the first field listed.
+            results, best = [], set()
+            for score, tier in zip((1.0, 0.9, 0.85), self._prefix_tiers(terms)):
+                for cust_id in heapq.nsmallest(wanted - len(results), tier.keys() - best):
+                    results.append({**self._rows[cust_id], "score": score, "matched": tier[cust_id]})
+                best |= tier.keys()
+            if fuzzy and len(results) < wanted:
+                shared: Dict[int, int] = {}
+                for field, term in terms:
+                    for cust_id, n in self._similar(field, term).items():
+                        shared[cust_id] = max(n, shared.get(cust_id, 0))
+                for cust_id in best:
+                    shared.pop(cust_id, None)
+                # Like the database's bm25 cut, only the closest few candidates are scored.
+                closest = heapq.nlargest(max(100, 5 * wanted), shared.items(), key=lambda kv: (kv[1], -kv[0]))
+                rows = [self._rows[c] for c, _ in closest]
+                results += rank(rows, query, fields, fuzzy)[: wanted - len(results)]
+        return results[offset: offset + limit]
+
+    def _prefix_tiers(self, terms: List[tuple]) -> List[Dict[int, str]]:
+        """cust_id -> matched field for exact, value-prefix and word-prefix matches (scores 1.0, 0.9, 0.85)."""
+        tiers = [{}, {}, {}]
+        for field, term in terms:
+            words = self._words[field]
+            lo, hi = bisect_left(words, (term,)), bisect_left(words, (term + "\uffff",))
+            for word, cust_id, whole in words[lo:hi]:
+                tiers[(0 if word == term else 1) if whole else 2].setdefault(cust_id, field)
+            if field == "phone" and len(term) >= 3:
+                # Any run of digits matches a phone: rows holding every trigram of the term, verified.
+                grams = self._grams[field]
+                inner = sorted((grams.get(term[j:j + 3], set()) for j in range(len(term) - 2)), key=len)
+                for cust_id in set.intersection(*inner):
+                    if term in normalize(field, self._rows[cust_id].get(field)):
+                        tiers[2].setdefault(cust_id, field)
+        return tiers
+
+    def _similar(self, field: str, term: str) -> Counter:
+        """Rows sharing enough trigrams with ``term`` to reach FUZZY_THRESHOLD, with the number shared."""
+        if len(term) < MIN_FUZZY_LENGTH:
+            return Counter()
+        grams = self._grams[field]
+        query_grams = trigrams(term)
+        shared = Counter()
+        for g in query_grams:
+            shared.update(grams.get(g, ()))
+        # similarity >= FUZZY_THRESHOLD needs at least that share of the term's trigrams in common.
+        need = math.ceil(FUZZY_THRESHOLD * len(query_grams))
+        return Counter({c: n for c, n in shared.items() if n >= need})
+
+    def _remove(self, cust_id: int):
+        row = self._rows.pop(cust_id, None)
+        if row is None:
+            return
+        for field, value in self._values(row):
+            words = self._words[field]
+            for entry in self._entries(field, value, cust_id):
+                i = bisect_left(words, entry)
+                if i < len(words) and words[i] == entry:
+                    del words[i]
+            for g in trigrams(value):
+                ids = self._grams[field].get(g)
+                if ids is not None:
+                    ids.discard(cust_id)
+                    if not ids:
+                        del self._grams[field][g]
+
+    @staticmethod
+    def _entries(field: str, value: str, cust_id: int) -> List[tuple]:
+        # (word, cust_id, is_whole_value); the whole value comes first in tokens().
+        return [(w, cust_id, i == 0) for i, w in enumerate(tokens(field, value))]
+
+    @staticmethod
+    def _values(row: Dict):
+        for field in CUSTOMER_SEARCH_FIELDS:
+            value = normalize(field, row.get(field))
+            if value:
+                yield field, value
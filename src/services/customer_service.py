@@ -1,5 +1,9 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator, Sequence
+from src.dao.base_dao import is_missing_function
 from src.dao.customer_dao import CustomerDAO
+from src.services.customer_search_index import CustomerSearchIndex
+from src.textsearch import CUSTOMER_SEARCH_FIELDS, rank
+from src.tracing import traced
 
 
 class CustomerError(Exception):
@@ -7,16 +11,22 @@ class CustomerError(Exception):
     pass
 
 
+@traced
 class CustomerService:
     """Service layer for customer-related operations."""
 
-    def __init__(self, dao: CustomerDAO):
+    def __init__(self, dao: CustomerDAO, index: CustomerSearchIndex | None = None):
         self.dao = dao
+        self.index = index
+        self.use_rpc = True
 
     def add_customer(self, name: str, email: str, phone: str, city: str | None = None) -> Dict:
         if self.dao.get_customer_by_email(email):
             raise CustomerError(f"Email already exists: {email}")
-        return self.dao.create_customer(name, email, phone, city)
+        c = self.dao.create_customer(name, email, phone, city)
+        if self.index is not None:
+            self.index.upsert(c)
+        return c
 
     def update_customer(self, cust_id: int, phone: str | None = None, city: str | None = None) -> Dict:
         customer = self.dao.get_customer_by_id(cust_id)
@@ -29,7 +39,10 @@ class CustomerService:
             fields["city"] = city
         if not fields:
             raise CustomerError("No fields to update")
-        return self.dao.update_customer(cust_id, fields)
+        c = self.dao.update_customer(cust_id, fields)
+        if self.index is not None:
+            self.index.upsert(c)
+        return c
 
     def delete_customer(self, cust_id: int) -> Dict:
         customer = self.dao.get_customer_by_id(cust_id)
@@ -37,10 +50,49 @@ class CustomerService:
             raise CustomerError("Customer not found")
         if self.dao.customer_has_orders(cust_id):
             raise CustomerError("Cannot delete customer with existing orders")
-        return self.dao.delete_customer(cust_id)
+        c = self.dao.delete_customer(cust_id)
+        if self.index is not None:
+            self.index.remove(cust_id)
+        return c
 
     def list_customers(self, limit: int = 100) -> List[Dict]:
         return self.dao.list_customers(limit=limit)
 
-    def search_customers(self, email: str | None = None, city: str | None = None) -> List[Dict]:
-        return self.dao.search_customers(email=email, city=city)
+    def iter_customers(self, page_size: int | None = None) -> Iterator[Dict]:
+        return self.dao.iter_customers(page_size)
+
+    def search_customers(self, email: str | None = None, city: str | None = None,
+                         limit: int | None = None, offset: int = 0) -> List[Dict]:
+        return self.dao.search_customers(email=email, city=city, limit=limit, offset=offset)
+
+    def find_customers(self, query: str, fields: Sequence[str] | None = None, fuzzy: bool = True,
+                       limit: int = 20, offset: int = 0) -> List[Dict]:
+        """
+        Customers whose name, email, phone or city match ``query`` by prefix (of the value
+        or of any word in it) or, with ``fuzzy``, by trigram similarity, best match first.
+        Served by the in-memory index when one is attached, else by the database.
+        """
+        query = (query or "").strip()
+        if not query:
+            raise CustomerError("Search query is empty")
+        fields = list(fields or CUSTOMER_SEARCH_FIELDS)
+        unknown = set(fields) - set(CUSTOMER_SEARCH_FIELDS)
+        if unknown:
+            raise CustomerError(f"Cannot search by: {', '.join(sorted(unknown))}")
+        if limit <= 0 or offset < 0:
+            raise CustomerError("Limit must be positive and offset not negative")
+        if self.index is not None:
+            return self.index.search(query, fields, fuzzy, limit, offset)
+        if self.use_rpc:
+            try:
+                return self.dao.search_customers_text(query, fields, fuzzy, limit, offset)
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+        # search_customers() is not deployed: prefix queries per field, without typo tolerance.
+        rows = {}
+        for field in fields:
+            for row in self.dao.search_customers_prefix(field, query, offset + limit):
+                rows.setdefault(row["cust_id"], row)
+        return rank(rows.values(), query, fields, fuzzy=False)[offset: offset + limit]
@@ -0,0 +1,187 @@
+# src/services/import_service.py
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Tuple
+from src.dao.product_dao import ProductDAO
+from src.dao.customer_dao import CustomerDAO
+from src.tracing import traced
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def read_records(path: str, fmt: str | None = None) -> Iterator[Tuple[int, Dict]]:
+    """Yield ``(line_no, record)`` from a CSV or JSONL file without loading it whole."""
+    fmt = (fmt or path.rsplit(".", 1)[-1]).lower()
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            reader = csv.DictReader(fh)
+            for record in reader:
+                yield reader.line_num, record
+        elif fmt in ("jsonl", "ndjson", "json"):
+            for line_no, line in enumerate(fh, start=1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_no, {"__error__": f"invalid JSON: {e}"}
+        else:
+            raise BulkImportError(f"Unsupported import format: {fmt} (use csv or jsonl)")
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _count(record: Dict, field: str) -> int | None:
+    """A non-negative integer column, or None when the record does not give it."""
+    if _blank(record.get(field)):
+        return None
+    try:
+        value = int(record[field])
+    except (TypeError, ValueError):
+        raise BulkImportError(f"{field} must be an integer")
+    if value < 0:
+        raise BulkImportError(f"{field} cannot be negative")
+    return value
+
+
+def validate_product(record: Dict) -> Dict:
+    """
+    A product row for the upsert. Optional columns are only included when the record has them,
+    so re-importing a file without e.g. a category column leaves existing values alone.
+    """
+    if "__error__" in record:
+        raise BulkImportError(record["__error__"])
+    for field in ("name", "sku", "price"):
+        if _blank(record.get(field)):
+            raise BulkImportError(f"Missing {field}")
+    try:
+        price = float(record["price"])
+    except (TypeError, ValueError):
+        raise BulkImportError("price must be a number")
+    if price <= 0:
+        raise BulkImportError("Price must be greater than 0")
+    row = {"name": str(record["name"]).strip(), "sku": str(record["sku"]).strip(), "price": price}
+    for field in ("stock", "reorder_threshold"):
+        value = _count(record, field)
+        if value is not None:
+            row[field] = value
+    if "category" in record:
+        row["category"] = None if _blank(record["category"]) else str(record["category"]).strip()
+    return row
+
+
+def validate_customer(record: Dict) -> Dict:
+    if "__error__" in record:
+        raise BulkImportError(record["__error__"])
+    for field in ("name", "email", "phone"):
+        if _blank(record.get(field)):
+            raise BulkImportError(f"Missing {field}")
+    email = str(record["email"]).strip()
+    if "@" not in email:
+        raise BulkImportError(f"Invalid email: {email}")
+    row = {"name": str(record["name"]).strip(), "email": email, "phone": str(record["phone"]).strip()}
+    if "city" in record:
+        row["city"] = None if _blank(record["city"]) else str(record["city"]).strip()
+    return row
+
+
+@traced
+class ImportService:
+    """
+    Streams CSV/JSONL files into products or customers in chunks. Each chunk is
+    validated, checked for existing keys with one batched lookup, and written with
+    one upsert; chunks are processed by a pool of worker threads.
+    """
+
+    def __init__(self, product_dao: ProductDAO, customer_dao: CustomerDAO):
+        self.product_dao = product_dao
+        self.customer_dao = customer_dao
+
+    def import_products(self, path: str, fmt: str | None = None, chunk_size: int = 500, workers: int = 4,
+                        on_conflict: str = "update", progress: Callable[[Dict], None] | None = None) -> Dict:
+        return self._import(
+            read_records(path, fmt), validate_product, "sku",
+            lambda keys: {r["sku"] for r in self.product_dao.get_products_by_skus(keys)},
+            self.product_dao.upsert_products, chunk_size, workers, on_conflict, progress,
+        )
+
+    def import_customers(self, path: str, fmt: str | None = None, chunk_size: int = 500, workers: int = 4,
+                         on_conflict: str = "update", progress: Callable[[Dict], None] | None = None) -> Dict:
+        return self._import(
+            read_records(path, fmt), validate_customer, "email",
+            lambda keys: {r["email"] for r in self.customer_dao.get_customers_by_emails(keys)},
+            self.customer_dao.upsert_customers, chunk_size, workers, on_conflict, progress,
+        )
+
+    def _import(self, records: Iterator[Tuple[int, Dict]], validate: Callable, key: str, existing: Callable,
+                upsert: Callable, chunk_size: int, workers: int, on_conflict: str, progress: Callable | None) -> Dict:
+        if on_conflict not in ("update", "skip"):
+            raise BulkImportError("on_conflict must be 'update' or 'skip'")
+        stats = {"rows_read": 0, "inserted": 0, "updated": 0, "skipped": 0, "invalid": 0, "failed": 0,
+                 "chunks": 0, "errors": []}
+        started = time.perf_counter()
+
+        def process(chunk: List[Tuple[int, Dict]]) -> Dict:
+            result = {"inserted": 0, "updated": 0, "skipped": 0, "invalid": 0, "failed": 0, "errors": []}
+            rows: Dict[str, Tuple[int, Dict]] = {}
+            for line_no, record in chunk:
+                try:
+                    row = validate(record)
+                except BulkImportError as e:
+                    result["invalid"] += 1
+                    result["errors"].append({"line": line_no, "error": str(e)})
+                    continue
+                if row[key] in rows:
+                    result["skipped"] += 1  # duplicate key within the chunk: the last row wins
+                rows[row[key]] = (line_no, row)
+            if not rows:
+                return result
+            try:
+                found = existing(list(rows))
+                if on_conflict == "skip":
+                    result["skipped"] += len(found)
+                    rows = {k: v for k, v in rows.items() if k not in found}
+                upsert([row for _, row in rows.values()])
+                result["updated"] += len(found) if on_conflict == "update" else 0
+                result["inserted"] += len(rows) - (len(found) if on_conflict == "update" else 0)
+            except Exception as e:
+                result["failed"] += len(rows)
+                result["errors"].extend({"line": line_no, "error": str(e)} for line_no, _ in rows.values())
+            return result
+
+        def merge(result: Dict):
+            for field in ("inserted", "updated", "skipped", "invalid", "failed"):
+                stats[field] += result[field]
+            stats["errors"].extend(result["errors"][: max(0, 100 - len(stats["errors"]))])
+            stats["chunks"] += 1
+            if progress:
+                progress(self._summary(stats, started))
+
+        records = iter(records)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            pending = set()
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                stats["rows_read"] += len(chunk)
+                pending.add(pool.submit(process, chunk))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        merge(future.result())
+            for future in pending:
+                merge(future.result())
+        return self._summary(stats, started)
+
+    @staticmethod
+    def _summary(stats: Dict, started: float) -> Dict:
+        elapsed = time.perf_counter() - started
+        written = stats["inserted"] + stats["updated"]
+        return {**stats, "elapsed_s": round(elapsed, 3), "rows_per_s": round(written / elapsed, 1) if elapsed else 0.0}
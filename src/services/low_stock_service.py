@@ -0,0 +1,117 @@
+# src/services/low_stock_service.py
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from src.services.product_service import ProductService
+
+
+class LowStockWatcher:
+    """
+    In-memory index of stock headroom (stock - reorder_threshold) for the whole catalogue.
+
+    ``load`` reads the catalogue once; afterwards the index follows the stock events of
+    the ProductService's StockReservationService (orders, cancellations, restocks), and
+    ``reconcile`` picks up changes made by other processes by reading only the products
+    that are low now or were low before. A min-heap with lazy deletion answers "most
+    urgent products" without sorting, and crossing a threshold in either direction
+    produces an alert.
+    """
+
+    def __init__(self, product_service: ProductService, on_alert: Callable[[Dict], None] | None = None):
+        self.products = product_service
+        self.on_alert = on_alert
+        self._lock = threading.Lock()
+        self._state: Dict[int, tuple] = {}  # prod_id -> (stock, threshold, sku, name)
+        self._heap: List[tuple] = []  # (headroom, prod_id, stock, threshold); stale entries skipped on read
+        self._subscribed = False
+
+    def load(self, page_size: int | None = None) -> int:
+        state = {}
+        for p in self.products.iter_products(page_size):
+            state[p["prod_id"]] = (p["stock"], p.get("reorder_threshold", 5), p.get("sku"), p.get("name"))
+        with self._lock:
+            self._state = state
+            self._rebuild_heap()
+        if not self._subscribed:
+            self.products.stock.subscribe(self.handle)
+            self._subscribed = True
+        return len(state)
+
+    def handle(self, event: str, payload: Dict):
+        self.update(payload["products"])
+
+    def update(self, rows: List[Dict]) -> List[Dict]:
+        with self._lock:
+            alerts = [a for a in (self._apply(row) for row in rows) if a]
+            if len(self._heap) > 2 * len(self._state) + 1024:
+                self._rebuild_heap()
+        for alert in alerts:
+            if self.on_alert:
+                self.on_alert(alert)
+        return alerts
+
+    def reconcile(self) -> List[Dict]:
+        """Refresh from the database the products that are low now or were low in the index."""
+        low_now = {r["prod_id"]: r for r in self.products.iter_low_stock()}
+        with self._lock:
+            was_low = [pid for pid, s in self._state.items() if s[0] - s[1] <= 0 and pid not in low_now]
+        rows = list(low_now.values())
+        if was_low:
+            rows.extend(self.products.dao.get_products_by_ids(was_low))
+        return self.update(rows)
+
+    def lowest(self, n: int = 20, only_low: bool = True) -> List[Dict]:
+        """The ``n`` products with the least headroom (only those at or below threshold by default)."""
+        result, seen, popped = [], set(), []
+        with self._lock:
+            while self._heap and len(result) < n:
+                entry = heapq.heappop(self._heap)
+                headroom, pid, stock, threshold = entry
+                current = self._state.get(pid)
+                if current is None or current[:2] != (stock, threshold) or pid in seen:
+                    continue  # superseded by a newer entry
+                if only_low and headroom > 0:
+                    popped.append(entry)
+                    break
+                seen.add(pid)
+                popped.append(entry)
+                result.append(self._describe(pid, current))
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+        return result
+
+    def watch(self, interval: float = 10.0, rounds: int | None = None, stop: threading.Event | None = None):
+        """Reconcile every ``interval`` seconds until ``rounds`` are done or ``stop`` is set."""
+        stop = stop or threading.Event()
+        done = 0
+        while not stop.wait(interval):
+            self.reconcile()
+            done += 1
+            if rounds is not None and done >= rounds:
+                break
+
+    def _apply(self, row: Dict) -> Optional[Dict]:
+        pid = row["prod_id"]
+        prev = self._state.get(pid)
+        threshold = row.get("reorder_threshold")
+        if threshold is None:
+            threshold = prev[1] if prev else 5
+        current = (row["stock"], threshold, row.get("sku") or (prev and prev[2]), row.get("name") or (prev and prev[3]))
+        self._state[pid] = current
+        heapq.heappush(self._heap, (current[0] - threshold, pid, current[0], threshold))
+        was_low = prev is not None and prev[0] - prev[1] <= 0
+        is_low = current[0] - threshold <= 0
+        if is_low == was_low:
+            return None
+        return {"event": "low_stock" if is_low else "recovered", "at": time.time(), **self._describe(pid, current)}
+
+    def _rebuild_heap(self):
+        self._heap = [(s[0] - s[1], pid, s[0], s[1]) for pid, s in self._state.items()]
+        heapq.heapify(self._heap)
+
+    @staticmethod
+    def _describe(pid: int, state: tuple) -> Dict:
+        stock, threshold, sku, name = state
+        return {"prod_id": pid, "sku": sku, "name": name, "stock": stock, "reorder_threshold": threshold,
+                "headroom": stock - threshold}
@@ -0,0 +1,132 @@
+# src/services/order_batch_service.py
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Tuple
+from src.services.order_service import OrderService, OrderError
+from src.services.import_service import read_records
+from src.tracing import traced
+
+
+def parse_basket(record: Dict) -> Tuple[int, List[Dict]]:
+    """
+    Validate one basket record: ``{"customer": 7, "items": [{"prod_id": 1, "quantity": 2}]}``.
+    ``cust_id`` is accepted for ``customer``, and ``items`` may also be a CLI-style
+    string such as ``"1:2 5:1"``. Returns ``(customer_id, items)``.
+    """
+    if not isinstance(record, dict):
+        raise OrderError("Basket must be a JSON object")
+    if "__error__" in record:
+        raise OrderError(record["__error__"])
+    customer = record.get("customer", record.get("cust_id"))
+    items = record.get("items")
+    if isinstance(items, str):
+        try:
+            items = [{"prod_id": int(p), "quantity": int(q)} for p, q in
+                     (part.split(":") for part in items.replace(";", " ").split())]
+        except ValueError:
+            raise OrderError(f"Invalid items: {record.get('items')}")
+    try:
+        customer = int(customer)
+        items = [{"prod_id": int(i["prod_id"]), "quantity": int(i["quantity"])} for i in items or []]
+    except (TypeError, ValueError, KeyError):
+        raise OrderError("Basket needs an integer customer and items with prod_id and quantity")
+    if not items:
+        raise OrderError("Basket has no items")
+    if any(i["quantity"] <= 0 for i in items):
+        raise OrderError("Quantities must be positive")
+    return customer, items
+
+
+@traced
+class OrderBatchService:
+    """
+    Places orders from a stream of baskets. Baskets are taken in chunks; each chunk
+    fetches its customers and products with one lookup each, then a thread pool places
+    the orders. A customer's baskets run in file order on one worker, and chunks run
+    one after another, so per-customer ordering is preserved across the whole file.
+    """
+
+    def __init__(self, order_service: OrderService):
+        self.orders = order_service
+
+    def create_from_file(self, path: str, result_path: str | None = None, fmt: str | None = None,
+                         chunk_size: int = 500, workers: int = 8, progress: Callable[[Dict], None] | None = None) -> Dict:
+        results = open(result_path, "w", encoding="utf-8") if result_path else None
+        try:
+            def write(chunk_results: List[Dict]):
+                if results:
+                    results.writelines(json.dumps(r, default=str) + "\n" for r in chunk_results)
+            return self.create_batch(read_records(path, fmt), chunk_size, workers, write, progress)
+        finally:
+            if results:
+                results.close()
+
+    def create_batch(self, records: Iterator[Tuple[int, Dict]], chunk_size: int = 500, workers: int = 8,
+                     on_results: Callable[[List[Dict]], None] | None = None,
+                     progress: Callable[[Dict], None] | None = None) -> Dict:
+        stats = {"baskets": 0, "created": 0, "failed": 0, "invalid": 0, "chunks": 0}
+        started = time.perf_counter()
+        records = iter(records)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                chunk_results = self._run_chunk(chunk, pool)
+                stats["baskets"] += len(chunk)
+                stats["chunks"] += 1
+                for r in chunk_results:
+                    stats[{"ok": "created", "failed": "failed", "invalid": "invalid"}[r["status"]]] += 1
+                if on_results:
+                    on_results(chunk_results)
+                if progress:
+                    progress(self._summary(stats, started))
+        return self._summary(stats, started)
+
+    def _run_chunk(self, chunk: List[Tuple[int, Dict]], pool: ThreadPoolExecutor) -> List[Dict]:
+        results: Dict[int, Dict] = {}
+        by_customer: Dict[int, List[Tuple[int, object, List[Dict]]]] = {}
+        for line_no, record in chunk:
+            ref = record.get("ref") if isinstance(record, dict) else None
+            try:
+                customer_id, items = parse_basket(record)
+            except OrderError as e:
+                results[line_no] = {"line": line_no, "ref": ref, "status": "invalid", "error": str(e)}
+                continue
+            by_customer.setdefault(customer_id, []).append((line_no, ref, items))
+
+        if by_customer:
+            customers = {c["cust_id"]: c for c in
+                         self.orders.customer_service.dao.get_customers_by_ids(list(by_customer))}
+            prod_ids = {i["prod_id"] for baskets in by_customer.values() for _, _, items in baskets for i in items}
+            products = {p["prod_id"]: p for p in self.orders.product_service.dao.get_products_by_ids(list(prod_ids))}
+
+            def place_all(customer_id: int, baskets: List[Tuple[int, object, List[Dict]]]) -> List[Dict]:
+                return [self._place(line_no, ref, customers.get(customer_id), customer_id, items, products)
+                        for line_no, ref, items in baskets]
+
+            for done in pool.map(lambda kv: place_all(*kv), by_customer.items()):
+                results.update((r["line"], r) for r in done)
+        return [results[line_no] for line_no, _ in chunk]
+
+    def _place(self, line_no: int, ref, customer: Dict | None, customer_id: int, items: List[Dict],
+               products: Dict[int, Dict]) -> Dict:
+        result = {"line": line_no, "ref": ref, "customer": customer_id}
+        try:
+            if not customer:
+                raise OrderError(f"Customer {customer_id} does not exist")
+            # Stock in the shared snapshot is only a pre-check; reserve_stock is authoritative.
+            validated_items, total_amount = self.orders.price_items(items, products)
+            detail = self.orders.place_order(customer, validated_items, total_amount, products)
+        except Exception as e:
+            return {**result, "status": "failed", "error": str(e)}
+        order = detail["order"]
+        return {**result, "status": "ok", "order_id": order["order_id"], "total_amount": order["total_amount"]}
+
+    @staticmethod
+    def _summary(stats: Dict, started: float) -> Dict:
+        elapsed = time.perf_counter() - started
+        return {**stats, "elapsed_s": round(elapsed, 3),
+                "orders_per_min": round(stats["created"] / elapsed * 60, 1) if elapsed else 0.0}
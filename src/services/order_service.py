@@ -1,30 +1,65 @@
 # src/services/order_service.py
-from typing import List, Dict
+import logging
+from typing import Callable, List, Dict, Iterator
+from src.dao.base_dao import is_missing_function
+from src.dao.cache import CachedProductDAO
 from src.dao.order_dao import OrderDAO
 from src.services.customer_service import CustomerService, CustomerError
 from src.services.product_service import ProductService, ProductError
+from src.services.stock_service import InsufficientStockError
+from src.tracing import traced
+
+log = logging.getLogger(__name__)
 
 class OrderError(Exception):
     pass
 
+@traced
 class OrderService:
     def __init__(self, order_dao: OrderDAO, customer_service: CustomerService, product_service: ProductService):
         self.dao = order_dao
         self.customer_service = customer_service
         self.product_service = product_service
+        self.listeners: List[Callable[[str, Dict], None]] = []
+        # Optional WriteJournal: a compensating release that fails is queued there instead of lost.
+        self.journal = None
+        self.use_rpc = True
+
+    def subscribe(self, listener: Callable[[str, Dict], None]):
+        """
+        Register ``listener(event, payload)`` for order_created / order_cancelled / order_completed,
+        and orders_completed (``{"orders": [...]}``) for orders completed together by complete_orders.
+        """
+        self.listeners.append(listener)
+
+    def _emit(self, event: str, payload: Dict):
+        for listener in self.listeners:
+            try:
+                listener(event, payload)
+            except Exception:
+                log.exception("order event listener failed for %s", event)
 
     def create_order(self, customer_id: int, items: List[Dict]) -> Dict:
         customer = self.customer_service.dao.get_customer_by_id(customer_id)
         if not customer:
             raise OrderError(f"Customer {customer_id} does not exist")
+
+        products = {p["prod_id"]: p for p in self.product_service.dao.get_products_by_ids([i["prod_id"] for i in items])}
+        validated_items, total_amount = self.price_items(items, products)
+        return self.place_order(customer, validated_items, total_amount, products)
+
+    @staticmethod
+    def price_items(items: List[Dict], products: Dict[int, Dict]) -> tuple:
+        """Validate basket lines against fetched products; returns (priced items, total amount)."""
+        requested = {}
         total_amount = 0
         validated_items = []
-
         for item in items:
-            prod = self.product_service.dao.get_product_by_id(item["prod_id"])
+            prod = products.get(item["prod_id"])
             if not prod:
                 raise OrderError(f"Product {item['prod_id']} does not exist")
-            if prod["stock"] < item["quantity"]:
+            requested[prod["prod_id"]] = requested.get(prod["prod_id"], 0) + item["quantity"]
+            if prod["stock"] < requested[prod["prod_id"]]:
                 raise OrderError(f"Not enough stock for product {prod['name']}")
             validated_items.append({
                 "prod_id": prod["prod_id"],
@@ -32,30 +67,84 @@ class OrderService:
                 "price": prod["price"]
             })
             total_amount += prod["price"] * item["quantity"]
+        return validated_items, total_amount
+
+    def place_order(self, customer: Dict, validated_items: List[Dict], total_amount: float, products: Dict[int, Dict]) -> Dict:
+        """Reserve stock for priced items, then write the order and its items."""
+        try:
+            self.product_service.stock.reserve(validated_items)
+        except InsufficientStockError as e:
+            name = products[e.prod_id]["name"] if e.prod_id in products else e.prod_id
+            raise OrderError(f"Not enough stock for product {name}")
 
-        for item in validated_items:
-            new_stock = self.product_service.dao.get_product_by_id(item["prod_id"])["stock"] - item["quantity"]
-            self.product_service.dao.update_product(item["prod_id"], {"stock": new_stock})
+        try:
+            order = self.dao.create_order(customer["cust_id"], total_amount)
+            order_items = self.dao.create_order_items(order["order_id"], validated_items)
+        except Exception:
+            self._compensate(validated_items)
+            raise
 
-        order = self.dao.create_order(customer_id, total_amount)
+        detail = {"order": order, "customer": customer, "items": order_items}
+        self._emit("order_created", detail)
+        return detail
 
-        self.dao.create_order_items(order["order_id"], validated_items)
+    def _compensate(self, items: List[Dict]):
+        """Give back stock reserved for an order that could not be written."""
+        try:
+            self.product_service.stock.release(items)
+        except Exception:
+            if self.journal is None:
+                log.exception("could not release stock reserved for a failed order: %s", items)
+                return
+            self._queue_restock(items, "a failed order")
 
-        return self.dao.get_order_details(order["order_id"])
+    def _queue_restock(self, items: List[Dict], reason: str):
+        entry = self.journal.append("restock", {"items": [{"prod_id": i["prod_id"], "quantity": i["quantity"]}
+                                                          for i in items]})
+        log.warning("stock release for %s queued as journal entry %s", reason, entry["key"])
 
     def cancel_order(self, order_id: int) -> Dict:
+        """Cancel a PLACED order and give its stock back; the status never flips without the release."""
+        if self.use_rpc:
+            try:
+                result = self.dao.cancel_order(order_id)
+            except Exception as e:
+                if getattr(e, "code", None) == "P0001":
+                    if not self.dao.get_order(order_id):
+                        raise OrderError("Order not found")
+                    raise OrderError("Only orders with status 'PLACED' can be cancelled")
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+            else:
+                products = self.product_service.dao
+                if isinstance(products, CachedProductDAO):
+                    products.put_many(result.get("products") or [])
+                self.product_service.stock._emit("stock_released", result.get("products") or [])
+                self._emit("order_cancelled", {"order": result["order"], "items": result.get("items") or []})
+                return result["order"]
+        return self._cancel_in_steps(order_id)
+
+    def _cancel_in_steps(self, order_id: int) -> Dict:
         order_detail = self.dao.get_order_details(order_id)
         if not order_detail:
             raise OrderError("Order not found")
         if order_detail["order"]["status"] != "PLACED":
             raise OrderError("Only orders with status 'PLACED' can be cancelled")
 
-        for item in order_detail["items"]:
-            prod = self.product_service.dao.get_product_by_id(item["prod_id"])
-            new_stock = prod["stock"] + item["quantity"]
-            self.product_service.dao.update_product(item["prod_id"], {"stock": new_stock})
-
-        return self.dao.update_order_status(order_id, "CANCELLED")
+        order = self.dao.update_order_status(order_id, "CANCELLED", expected_status="PLACED")
+        if not order:
+            raise OrderError("Only orders with status 'PLACED' can be cancelled")
+        try:
+            self.product_service.stock.release(order_detail["items"])
+        except Exception:
+            if self.journal is None:
+                # Put the order back so a retried cancel releases the stock it still holds.
+                self.dao.update_order_status(order_id, "PLACED", expected_status="CANCELLED")
+                raise
+            self._queue_restock(order_detail["items"], f"cancelled order {order_id}")
+        self._emit("order_cancelled", {"order": order, "items": order_detail["items"]})
+        return order
 
     def complete_order(self, order_id: int) -> Dict:
         order_detail = self.dao.get_order_details(order_id)
@@ -63,7 +152,18 @@ class OrderService:
             raise OrderError("Order not found")
         if order_detail["order"]["status"] != "PLACED":
             raise OrderError("Only orders with status 'PLACED' can be completed")
-        return self.dao.update_order_status(order_id, "COMPLETED")
+        order = self.dao.update_order_status(order_id, "COMPLETED", expected_status="PLACED")
+        if not order:
+            raise OrderError("Only orders with status 'PLACED' can be completed")
+        self._emit("order_completed", {"order": order})
+        return order
+
+    def complete_orders(self, order_ids: List[int]) -> List[Dict]:
+        """Complete every still-PLACED order in one conditional update; others are left alone."""
+        orders = self.dao.update_orders_status(order_ids, "COMPLETED", expected_status="PLACED")
+        if orders:
+            self._emit("orders_completed", {"orders": orders})
+        return orders
 
     def get_order_details(self, order_id: int) -> Dict:
         order_detail = self.dao.get_order_details(order_id)
@@ -71,5 +171,13 @@ class OrderService:
             raise OrderError("Order not found")
         return order_detail
 
-    def list_orders_of_customer(self, customer_id: int) -> List[Dict]:
-        return self.dao.list_orders_by_customer(customer_id)
+    def get_orders_details(self, order_ids: List[int]) -> List[Dict]:
+        """Details of every order that exists, in the order asked for; missing ids are skipped."""
+        return self.dao.get_orders_details(order_ids)
+
+    def list_orders_of_customer(self, customer_id: int, with_items: bool = False) -> List[Dict]:
+        return self.dao.list_orders_by_customer(customer_id, with_items)
+
+    def iter_orders(self, customer_id: int | None = None, page_size: int | None = None,
+                    status: str | None = None, with_items: bool = False) -> Iterator[Dict]:
+        return self.dao.iter_orders(customer_id, page_size, status=status, with_items=with_items)
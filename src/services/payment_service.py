@@ -1,10 +1,14 @@
 from src.dao.payment_dao import PaymentDAO
 from src.services.order_service import OrderService, OrderError
-from typing import Optional,List,Dict
+from src.tracing import traced
+from typing import Optional,List,Dict,Iterable
+from itertools import islice
+import time
 
 class PaymentError(Exception):
     pass
 
+@traced
 class PaymentService:
     def __init__(self, payment_dao: PaymentDAO, order_service: OrderService):
         self.dao = payment_dao
@@ -21,13 +25,84 @@ class PaymentService:
         if not payment:
             payment = self.dao.create_payment(order_id, order["order"]["total_amount"])
 
-        self.dao.update_payment_status(payment["payment_id"], "PAID", method)
+        # Complete before marking PAID: a failed completion leaves at most a PENDING payment.
         self.order_service.complete_order(order_id)
-        return self.dao.get_payment_by_order(order_id)
+        return self.dao.update_payment_status(payment["payment_id"], "PAID", method)
 
     def refund_payment(self, order_id: int) -> Dict:
         payment = self.dao.get_payment_by_order(order_id)
         if not payment:
             raise PaymentError("Payment not found")
-        self.dao.update_payment_status(payment["payment_id"], "REFUNDED")
-        return self.dao.get_payment_by_order(order_id)
+        return self.dao.update_payment_status(payment["payment_id"], "REFUNDED")
+
+    def settle_orders(self, order_ids: Iterable[int], method: str, chunk_size: int = 500) -> Dict:
+        """Mark many orders paid with ``method`` and complete them, a chunk of orders per set of writes."""
+        report = self._new_settlement(method)
+        ids = iter(dict.fromkeys(order_ids))
+        while True:
+            chunk = list(islice(ids, chunk_size))
+            if not chunk:
+                break
+            orders = self.order_service.dao.get_orders_by_ids(chunk)
+            found = {o["order_id"] for o in orders}
+            report["not_found"].extend(oid for oid in chunk if oid not in found)
+            self._settle_chunk(sorted(orders, key=lambda o: o["order_id"]), method, report)
+        return self._finish_settlement(report)
+
+    def settle_by_status(self, method: str, status: str = "PLACED", chunk_size: int = 500) -> Dict:
+        """Settle every order currently in ``status`` (only PLACED orders can be settled)."""
+        report = self._new_settlement(method)
+        orders = self.order_service.iter_orders(page_size=chunk_size, status=status)
+        while True:
+            chunk = list(islice(orders, chunk_size))
+            if not chunk:
+                break
+            self._settle_chunk(chunk, method, report)
+        return self._finish_settlement(report)
+
+    def _settle_chunk(self, orders: List[Dict], method: str, report: Dict):
+        placed = {o["order_id"]: o for o in orders if o["status"] == "PLACED"}
+        for o in orders:
+            if o["status"] != "PLACED":
+                report["skipped"][o["status"]] = report["skipped"].get(o["status"], 0) + 1
+        if not placed:
+            return
+        # Complete first and pay only what was completed: orders that changed status after
+        # we read them (e.g. cancelled) are reported as conflicts and their payments left alone.
+        completed = [o["order_id"] for o in self.order_service.complete_orders(list(placed))]
+        done = set(completed)
+        report["conflicts"].extend(oid for oid in placed if oid not in done)
+        if not completed:
+            return
+        payments: Dict[int, Dict] = {}
+        for p in self.dao.get_payments_by_orders(completed):
+            payments.setdefault(p["order_id"], p)
+
+        unpaid = [p["payment_id"] for oid, p in payments.items() if p["status"] != "PAID"]
+        report["already_paid"] += len(payments) - len(unpaid)
+        new_rows = [{"order_id": oid, "amount": placed[oid]["total_amount"], "method": method, "status": "PAID"}
+                    for oid in completed if oid not in payments]
+        for p in self.dao.update_payments_status(unpaid, "PAID", method) + self.dao.create_payments(new_rows):
+            payments[p["order_id"]] = p
+
+        for oid in completed:
+            expected, paid = placed[oid]["total_amount"] or 0, payments[oid]["amount"] or 0
+            report["settled"] += 1
+            report["expected_amount"] += expected
+            report["paid_amount"] += paid
+            if abs(expected - paid) > 0.005:
+                report["amount_mismatches"].append({"order_id": oid, "order_total": expected, "paid": paid})
+
+    @staticmethod
+    def _new_settlement(method: str) -> Dict:
+        return {"method": method, "settled": 0, "already_paid": 0, "expected_amount": 0.0, "paid_amount": 0.0,
+                "skipped": {}, "not_found": [], "conflicts": [], "amount_mismatches": [], "_started": time.perf_counter()}
+
+    @staticmethod
+    def _finish_settlement(report: Dict) -> Dict:
+        started = report.pop("_started")
+        for key in ("expected_amount", "paid_amount"):
+            report[key] = round(report[key], 2)
+        report["difference"] = round(report["paid_amount"] - report["expected_amount"], 2)
+        report["elapsed_s"] = round(time.perf_counter() - started, 3)
+        return report
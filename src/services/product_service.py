@@ -1,32 +1,85 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator
+from src.config import PAGE_SIZE
+from src.dao.base_dao import is_missing_function
 from src.dao.product_dao import ProductDAO
+from src.services.stock_service import StockReservationService
+from src.tracing import traced
 
 
 class ProductError(Exception):
     pass
 
 
+@traced
 class ProductService:
-    def __init__(self, dao: ProductDAO):
+    def __init__(self, dao: ProductDAO, stock: StockReservationService | None = None):
         self.dao = dao
+        self.stock = stock or StockReservationService(dao)
+        self.use_rpc = True
 
-    def add_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None) -> Dict:
+    def add_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None,
+                    reorder_threshold: int | None = None) -> Dict:
         if price <= 0:
             raise ProductError("Price must be greater than 0")
+        if reorder_threshold is not None and reorder_threshold < 0:
+            raise ProductError("Reorder threshold cannot be negative")
         existing = self.dao.get_product_by_sku(sku)
         if existing:
             raise ProductError(f"SKU already exists: {sku}")
-        return self.dao.create_product(name, sku, price, stock, category)
+        return self.dao.create_product(name, sku, price, stock, category, reorder_threshold)
+
+    def set_reorder_threshold(self, prod_id: int, threshold: int) -> Dict:
+        if threshold < 0:
+            raise ProductError("Reorder threshold cannot be negative")
+        p = self.dao.update_product(prod_id, {"reorder_threshold": threshold})
+        if not p:
+            raise ProductError("Product not found")
+        return p
 
     def restock_product(self, prod_id: int, delta: int) -> Dict:
         if delta <= 0:
             raise ProductError("Delta must be positive")
-        p = self.dao.get_product_by_id(prod_id)
+        p = self.stock.restock(prod_id, delta)
         if not p:
             raise ProductError("Product not found")
-        new_stock = (p.get("stock") or 0) + delta
-        return self.dao.update_product(prod_id, {"stock": new_stock})
+        return p
+
+    def get_low_stock(self, threshold: int | None = None) -> List[Dict]:
+        return list(self.iter_low_stock(threshold))
+
+    def iter_low_stock(self, threshold: int | None = None, page_size: int | None = None) -> Iterator[Dict]:
+        """
+        Products at or below their own reorder threshold, most urgent first, filtered in
+        the database. A ``threshold`` applies one stock limit to every product instead.
+        """
+        if threshold is not None:
+            return self.dao.iter_low_stock(threshold, page_size)
+        return self._iter_below_reorder(page_size or PAGE_SIZE)
+
+    def _iter_below_reorder(self, page_size: int) -> Iterator[Dict]:
+        page = None
+        if self.use_rpc:
+            try:
+                page = self.dao.low_stock_page(page_size)
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+        if page is None:
+            # low_stock_products() is not deployed: scan the catalogue once.
+            low = []
+            for p in self.dao.iter_products(page_size):
+                threshold = p.get("reorder_threshold", 5)
+                if p["stock"] <= threshold:
+                    low.append({"prod_id": p["prod_id"], "name": p["name"], "sku": p["sku"], "stock": p["stock"],
+                                "reorder_threshold": threshold, "headroom": p["stock"] - threshold})
+            yield from sorted(low, key=lambda r: (r["headroom"], r["prod_id"]))
+            return
+        while page:
+            yield from page
+            if len(page) < page_size:
+                break
+            page = self.dao.low_stock_page(page_size, (page[-1]["headroom"], page[-1]["prod_id"]))
 
-    def get_low_stock(self, threshold: int = 5) -> List[Dict]:
-        allp = self.dao.list_products(limit=1000)
-        return [p for p in allp if (p.get("stock") or 0) <= threshold]
+    def iter_products(self, page_size: int | None = None, category: str | None = None) -> Iterator[Dict]:
+        return self.dao.iter_products(page_size, category)
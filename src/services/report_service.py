@@ -1,34 +1,180 @@
-from src.config import get_supabase
-from typing import List, Dict
-from datetime import datetime, timedelta
+from src.dao.base_dao import is_missing_function
+from src.dao.report_dao import ReportDAO
+from src.dao.aggregate_dao import SalesAggregateDAO
+from src.services.columnar import GroupSum, chunk_rows, column_chunks, column_sum, keep_rows, rows_between
+from src.services.snapshot import Snapshot
+from src.config import REPORT_MEMORY_MB
+from src.tracing import traced
+from array import array
+from typing import Iterable, List, Dict
+from datetime import datetime, timedelta, timezone
 
+REPORTS = ("top_products", "revenue", "orders", "frequent_customers")
+# Reports answered from the orders table; top_products reads order_items (and orders too when dated).
+ORDER_REPORTS = {"revenue", "orders", "frequent_customers"}
+
+
+class ReportError(Exception):
+    pass
+
+@traced
 class ReportService:
-    def __init__(self):
-        self.sb = get_supabase()
-
-    def top_selling_products(self) -> List[Dict]:
-        resp = self.sb.table("order_items").select("prod_id, quantity").execute()
-        data = resp.data or []
-        totals = {}
-        for item in data:
-            totals[item["prod_id"]] = totals.get(item["prod_id"], 0) + item["quantity"]
-        top5 = sorted(totals.items(), key=lambda x: x[1], reverse=True)[:5]
-        return [{"prod_id": pid, "total_quantity": qty} for pid, qty in top5]
-
-    def total_revenue_last_month(self) -> float:
-        last_month = datetime.now() - timedelta(days=30)
-        resp = self.sb.table("orders").select("total_amount, order_date").gte("order_date", last_month).execute()
-        data = resp.data or []
-        return sum(order["total_amount"] for order in data)
-
-    def total_orders_per_customer(self) -> List[Dict]:
-        resp = self.sb.table("orders").select("cust_id").execute()
-        data = resp.data or []
-        counts = {}
-        for order in data:
-            counts[order["cust_id"]] = counts.get(order["cust_id"], 0) + 1
-        return [{"cust_id": cid, "total_orders": cnt} for cid, cnt in counts.items()]
-
-    def frequent_customers(self) -> List[Dict]:
-        orders = self.total_orders_per_customer()
-        return [c for c in orders if c["total_orders"] > 2]
+    def __init__(self, client=None, dao: ReportDAO | None = None, aggregates: SalesAggregateDAO | None = None,
+                 memory_limit_mb: float = REPORT_MEMORY_MB, snapshot: Snapshot | None = None):
+        # With a snapshot every report scans its memory-mapped columns; the database is not used.
+        self.snapshot = snapshot
+        self.dao = dao or (None if snapshot else ReportDAO(client))
+        self.aggregates = None if snapshot else aggregates
+        self.memory_limit_mb = memory_limit_mb
+        self.use_rpc = snapshot is None
+
+    def _server_side(self, call):
+        """Run an aggregate in the database; None means the function is missing and we must scan."""
+        if not self.use_rpc:
+            return None
+        try:
+            return call()
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            self.use_rpc = False
+            return None
+
+    def top_selling_products(self, limit: int = 5) -> List[Dict]:
+        if self.aggregates:
+            return [{"prod_id": r["prod_id"], "total_quantity": r["quantity_sold"]} for r in self.aggregates.top_products(limit)]
+        rows = self._server_side(lambda: self.dao.top_selling_products(limit))
+        if rows is not None:
+            return [{"prod_id": r["prod_id"], "total_quantity": r["total_quantity"]} for r in rows]
+        totals = GroupSum()
+        for chunk in self._item_chunks({"prod_id": "q", "quantity": "q"}):
+            totals.add(chunk["prod_id"], chunk["quantity"])
+        return [{"prod_id": pid, "total_quantity": qty} for pid, qty in totals.top(limit)]
+
+    def total_revenue_last_month(self, days: int = 30) -> float:
+        last_month = datetime.now(timezone.utc) - timedelta(days=days)
+        if self.aggregates:
+            # Daily buckets: the window starts at midnight UTC 30 days ago.
+            return self.aggregates.revenue_since(last_month.date())
+        revenue = self._server_side(lambda: self.dao.revenue_since(last_month))
+        if revenue is not None:
+            return revenue
+        return float(sum(column_sum(chunk["total_amount"])
+                         for chunk in self._order_chunks({"total_amount": "d"}, since=last_month)))
+
+    def total_orders_per_customer(self, min_orders: int = 1) -> List[Dict]:
+        if self.aggregates:
+            return [{"cust_id": r["cust_id"], "total_orders": r["order_count"]} for r in self.aggregates.customer_order_counts(min_orders)]
+        rows = self._server_side(lambda: self.dao.orders_per_customer(min_orders))
+        if rows is not None:
+            return [{"cust_id": r["cust_id"], "total_orders": r["total_orders"]} for r in rows]
+        counts = GroupSum()
+        for chunk in self._order_chunks({"cust_id": "q"}):
+            counts.add(chunk["cust_id"])
+        return [{"cust_id": cid, "total_orders": cnt} for cid, cnt in counts.at_least(min_orders)]
+
+    def frequent_customers(self, min_orders: int = 3) -> List[Dict]:
+        return self.total_orders_per_customer(min_orders=min_orders)
+
+    def run_reports(self, reports: Iterable[str] = REPORTS, top: int = 5, since: datetime | None = None,
+                    until: datetime | None = None, days: int = 30, min_orders: int = 3) -> Dict[str, object]:
+        """
+        Several reports computed together: the database function sales_report when deployed,
+        else one streamed scan of orders and one of order_items feeding every aggregate.
+        ``since``/``until`` bound all reports; without ``since`` revenue covers the last ``days``
+        days and the others all history. ``frequent_customers`` have at least ``min_orders``.
+        """
+        wanted = list(dict.fromkeys(reports))
+        unknown = set(wanted) - set(REPORTS)
+        if unknown:
+            raise ReportError(f"Unknown reports: {', '.join(sorted(unknown))}")
+        if since and until and since >= until:
+            raise ReportError("since must be before until")
+        revenue_since = since or datetime.now(timezone.utc) - timedelta(days=days)
+        if self.aggregates and since is None and until is None:
+            results = self._reports_from_aggregates(wanted, top, revenue_since, min_orders)
+        else:
+            results = self._server_side(lambda: self.dao.sales_report(wanted, top, min_orders, since, until,
+                                                                      revenue_since))
+            if results is None:
+                results = self._scan_reports(wanted, top, since, until, revenue_since, min_orders)
+        if "revenue" in results:
+            results["revenue"] = float(results["revenue"] or 0)
+        return {name: results[name] for name in wanted}
+
+    def _reports_from_aggregates(self, wanted: List[str], top: int, revenue_since: datetime,
+                                 min_orders: int) -> Dict[str, object]:
+        results = {}
+        if "top_products" in wanted:
+            results["top_products"] = self.top_selling_products(top)
+        if "revenue" in wanted:
+            results["revenue"] = self.aggregates.revenue_since(revenue_since.date())
+        if "orders" in wanted or "frequent_customers" in wanted:
+            counts = self.total_orders_per_customer()
+            results["orders"] = counts
+            results["frequent_customers"] = [r for r in counts if r["total_orders"] >= min_orders]
+        return results
+
+    def _scan_reports(self, wanted: List[str], top: int, since: datetime | None, until: datetime | None,
+                      revenue_since: datetime, min_orders: int) -> Dict[str, object]:
+        """
+        One scan of orders and one of order_items. A dated top_products keeps the ids of every
+        order in range (8 bytes each, so O(orders in range)) to pick their items; that array is
+        taken out of ``memory_limit_mb`` before the item chunks are sized.
+        """
+        results = {}
+        dated = since is not None or until is not None
+        # Ids of the orders in range (ascending, from the keyset scan) to pick their items.
+        order_ids = array("q") if dated and "top_products" in wanted else None
+        if ORDER_REPORTS & set(wanted) or order_ids is not None:
+            counts, revenue, start = GroupSum(), 0.0, revenue_since.timestamp()
+            for chunk in self._order_chunks({"order_id": "q", "cust_id": "q", "total_amount": "d", "at": "d"},
+                                            since, until):
+                counts.add(chunk["cust_id"])
+                revenue += column_sum(chunk["total_amount"], chunk["at"], start)
+                if order_ids is not None:
+                    order_ids.frombytes(chunk["order_id"].tobytes())
+            results["revenue"] = revenue
+            results["orders"] = [{"cust_id": cid, "total_orders": cnt} for cid, cnt in counts.at_least(1)]
+            results["frequent_customers"] = [r for r in results["orders"] if r["total_orders"] >= min_orders]
+        if "top_products" in wanted:
+            totals = GroupSum()
+            budget = self.memory_limit_mb - (order_ids.itemsize * len(order_ids) / 2 ** 20 if order_ids else 0)
+            for chunk in self._item_chunks({"order_id": "q", "prod_id": "q", "quantity": "q"}, budget):
+                if order_ids is not None:
+                    chunk = keep_rows(chunk, "order_id", order_ids)
+                totals.add(chunk["prod_id"], chunk["quantity"])
+            results["top_products"] = [{"prod_id": pid, "total_quantity": qty} for pid, qty in totals.top(top)]
+        return results
+
+    def _order_chunks(self, columns: Dict[str, str], since: datetime | None = None, until: datetime | None = None):
+        """Orders in ``[since, until)`` as column chunks; the column ``at`` is the order date in epoch seconds."""
+        if self.snapshot:
+            names = {name: "order_date" if name == "at" else name for name in columns}
+            low, high = (t.timestamp() if t else None for t in (since, until))
+            for chunk in self.snapshot.chunks("orders", set(names.values()) | {"order_date"},
+                                              chunk_rows(self.memory_limit_mb, len(columns) + 1)):
+                chunk = rows_between(chunk, "order_date", low, high)
+                yield {name: chunk[source] for name, source in names.items()}
+            return
+        select = ", ".join(["order_id"] + [c for c in columns if c not in ("order_id", "at")]
+                           + (["order_date"] if "at" in columns else []))
+        rows = self.dao.scan_orders(since, until, columns=select)
+        yield from self._columns(self._timed(rows) if "at" in columns else rows, columns)
+
+    def _item_chunks(self, columns: Dict[str, str], memory_mb: float | None = None):
+        max_rows = chunk_rows(self.memory_limit_mb if memory_mb is None else max(memory_mb, 0), len(columns))
+        if self.snapshot:
+            return self.snapshot.chunks("order_items", columns, max_rows)
+        return column_chunks(self.dao.scan_order_items(), columns, max_rows)
+
+    @staticmethod
+    def _timed(orders):
+        """Scanned orders with ``at``, the order date as epoch seconds, for columnar filtering."""
+        for row in orders:
+            row["at"] = datetime.fromisoformat(str(row["order_date"])).timestamp()
+            yield row
+
+    def _columns(self, rows, columns: Dict[str, str]):
+        """Scanned rows packed into typed column chunks sized to stay under ``memory_limit_mb``."""
+        return column_chunks(rows, columns, chunk_rows(self.memory_limit_mb, len(columns)))
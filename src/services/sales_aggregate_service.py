@@ -0,0 +1,93 @@
+# src/services/sales_aggregate_service.py
+from datetime import datetime, timezone
+from typing import Dict, List
+from src.dao.aggregate_dao import SalesAggregateDAO
+from src.dao.base_dao import is_missing_function
+from src.dao.order_dao import OrderDAO
+from src.tracing import traced
+
+
+def utc_day(timestamp: str) -> str:
+    return datetime.fromisoformat(timestamp).astimezone(timezone.utc).date().isoformat()
+
+
+@traced
+class SalesAggregateService:
+    """
+    Keeps per-product, per-customer and daily sales totals current from order events.
+    Subscribe ``handle`` to OrderService; ``rebuild`` recomputes everything from scratch
+    and ``check`` compares the stored totals with a full recompute.
+    """
+
+    def __init__(self, dao: SalesAggregateDAO, order_dao: OrderDAO):
+        self.dao = dao
+        self.order_dao = order_dao
+        self.use_rpc = True
+
+    def handle(self, event: str, payload: Dict):
+        if event == "orders_completed":
+            self.apply_many("order_completed", payload["orders"])
+            return
+        self.dao.apply_event(event, payload["order"], payload.get("items") if event == "order_created" else None)
+
+    def apply_many(self, event: str, orders: List[Dict]):
+        if self.use_rpc:
+            try:
+                return self.dao.apply_events(event, orders)
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+        for order in orders:
+            self.dao.apply_event(event, order)
+
+    def rebuild(self):
+        self.dao.rebuild()
+
+    def recompute(self) -> Dict[str, Dict]:
+        products, customers, days = {}, {}, {}
+        for item in self.order_dao.iter_order_items():
+            qty, revenue = products.get(item["prod_id"], (0, 0.0))
+            products[item["prod_id"]] = (qty + item["quantity"], revenue + item["quantity"] * item["price"])
+        for order in self.order_dao.iter_orders():
+            amount = order["total_amount"] or 0
+            count, spent = customers.get(order["cust_id"], (0, 0.0))
+            customers[order["cust_id"]] = (count + 1, spent + amount)
+            day = days.setdefault(utc_day(order["order_date"]), [0, 0.0, 0, 0.0, 0, 0.0])
+            day[0] += 1
+            day[1] += amount
+            if order["status"] == "COMPLETED":
+                day[2] += 1
+                day[3] += amount
+            elif order["status"] == "CANCELLED":
+                day[4] += 1
+                day[5] += amount
+        return {"products": products, "customers": customers, "days": {d: tuple(v) for d, v in days.items()}}
+
+    def stored(self) -> Dict[str, Dict]:
+        return {
+            "products": {r["prod_id"]: (r["quantity_sold"], r["revenue"]) for r in self.dao.iter_product_totals()},
+            "customers": {r["cust_id"]: (r["order_count"], r["total_spent"]) for r in self.dao.iter_customer_totals()},
+            "days": {
+                str(r["day"]): (r["order_count"], r["revenue"], r["completed_count"], r["completed_revenue"],
+                                r["cancelled_count"], r["cancelled_revenue"])
+                for r in self.dao.iter_daily_totals()
+            },
+        }
+
+    def check(self, tolerance: float = 1e-6, max_examples: int = 20) -> Dict:
+        expected, actual = self.recompute(), self.stored()
+        result = {"consistent": True}
+        for name in ("products", "customers", "days"):
+            exp, act = expected[name], actual[name]
+            mismatches = []
+            for key in sorted(set(exp) | set(act), key=str):
+                e = exp.get(key)
+                a = act.get(key)
+                if e is None and a is not None and not any(a):
+                    continue
+                if e is None or a is None or any(abs(float(x) - float(y)) > tolerance for x, y in zip(e, a)):
+                    mismatches.append({"key": key, "expected": e, "stored": a})
+            result[name] = {"checked": len(exp), "mismatches": len(mismatches), "examples": mismatches[:max_examples]}
+            result["consistent"] = result["consistent"] and not mismatches
+        return result
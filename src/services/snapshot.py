@@ -0,0 +1,228 @@
+# src/services/snapshot.py
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List
+from src.config import PAGE_SIZE
+from src.dao.export_dao import EXPORT_TABLES, ExportDAO
+
+FORMAT_VERSION = 1
+FORMATS = ("ndjson", "columnar")
+# Fixed-width column types and their array/memoryview codes; timestamps are epoch seconds.
+_CODES = {"int64": "q", "float64": "d", "timestamp": "d"}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _epoch(value) -> float:
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+class _ColumnWriter:
+    """
+    Appends one column to its files: ``.values`` (native int64/float64) for numbers and
+    timestamps, ``.offsets`` (int64, one more than rows) plus ``.data`` (UTF-8) for strings,
+    and ``.nulls`` (one byte per row) kept only if a null was seen. Nulls store 0 / "".
+    """
+
+    def __init__(self, directory: str, name: str, kind: str):
+        self.base = os.path.join(directory, name)
+        self.kind = kind
+        self.nulls = open(self.base + ".nulls", "wb")
+        self.any_null = False
+        if kind == "string":
+            self.offsets = open(self.base + ".offsets", "wb")
+            self.data = open(self.base + ".data", "wb")
+            self.size = 0
+            array("q", [0]).tofile(self.offsets)
+        else:
+            self.values = open(self.base + ".values", "wb")
+
+    def write(self, values: List):
+        nulls = bytes(v is None for v in values)
+        self.any_null = self.any_null or any(nulls)
+        self.nulls.write(nulls)
+        if self.kind == "string":
+            encoded = [b"" if v is None else str(v).encode() for v in values]
+            offsets = array("q")
+            for chunk in encoded:
+                self.size += len(chunk)
+                offsets.append(self.size)
+            offsets.tofile(self.offsets)
+            self.data.write(b"".join(encoded))
+        elif self.kind == "timestamp":
+            array("d", (0.0 if v is None else _epoch(v) for v in values)).tofile(self.values)
+        else:
+            array(_CODES[self.kind], (v or 0 for v in values)).tofile(self.values)
+
+    def close(self) -> Dict:
+        for fh in (self.nulls, *((self.offsets, self.data) if self.kind == "string" else (self.values,))):
+            fh.close()
+        if not self.any_null:
+            os.remove(self.base + ".nulls")
+        return {"type": self.kind, "nulls": self.any_null}
+
+
+def export_snapshot(dao: ExportDAO, path: str, formats: Iterable[str] = FORMATS, tables: Iterable[str] | None = None,
+                    page_size: int | None = None, force: bool = False,
+                    progress: Callable[[Dict], None] | None = None) -> Dict:
+    """
+    Stream every table page by page into a snapshot directory: ``<table>.ndjson`` and/or a
+    ``<table>/`` directory of column files, described by ``manifest.json``. Only one page is
+    held in memory. The snapshot is built next to ``path`` and renamed into place when
+    complete. Tables are read one after another, not at a single point in time.
+    """
+    formats = list(dict.fromkeys(formats))
+    tables = list(dict.fromkeys(tables or EXPORT_TABLES))
+    unknown = (set(formats) - set(FORMATS)) | (set(tables) - set(EXPORT_TABLES))
+    if unknown:
+        raise SnapshotError(f"Unknown formats or tables: {', '.join(sorted(unknown))}")
+    if os.path.exists(path) and not force:
+        raise SnapshotError(f"{path} exists; use force to replace it")
+    partial = f"{path}.partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    page_size = page_size or PAGE_SIZE
+    manifest = {"version": FORMAT_VERSION, "byteorder": sys.byteorder, "formats": formats,
+                "created_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    started = time.perf_counter()
+    total = 0
+    for table in tables:
+        key, columns = EXPORT_TABLES[table]
+        ndjson = open(os.path.join(partial, f"{table}.ndjson"), "w", encoding="utf-8") if "ndjson" in formats else None
+        writers = {}
+        if "columnar" in formats:
+            os.makedirs(os.path.join(partial, table))
+            writers = {name: _ColumnWriter(os.path.join(partial, table), name, kind) for name, kind in columns.items()}
+        rows = dao.iter_table(table, page_size)
+        count = 0
+        try:
+            while True:
+                page = list(islice(rows, page_size))
+                if not page:
+                    break
+                if ndjson:
+                    ndjson.write("".join(json.dumps(row, default=str) + "\n" for row in page))
+                for name, writer in writers.items():
+                    writer.write([row.get(name) for row in page])
+                count += len(page)
+                if progress:
+                    progress({"table": table, "rows": count,
+                              "rows_per_s": round((total + count) / max(time.perf_counter() - started, 1e-9))})
+        finally:
+            if ndjson:
+                ndjson.close()
+            described = {name: writer.close() for name, writer in writers.items()}
+        total += count
+        manifest["tables"][table] = {"key": key, "rows": count, "exported_at": datetime.now(timezone.utc).isoformat(),
+                                     "columns": described or {name: {"type": kind} for name, kind in columns.items()}}
+    with open(os.path.join(partial, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(partial, path)
+    return manifest
+
+
+class Snapshot:
+    """
+    Read side of a snapshot directory. Fixed-width columns are memory-mapped and handed out
+    as ``memoryview`` slices, so reports over them read only the pages they touch and
+    copy nothing; ``rows`` rebuilds dicts (strings, nulls, ISO timestamps) when needed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(os.path.join(path, "manifest.json"), encoding="utf-8") as fh:
+                self.manifest = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Not a snapshot: {path} ({e})")
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {self.manifest.get('version')}")
+        if self.manifest.get("byteorder") != sys.byteorder:
+            raise SnapshotError(f"Snapshot was written on a {self.manifest.get('byteorder')}-endian machine")
+        self._maps: Dict[str, tuple] = {}
+
+    @property
+    def tables(self) -> Dict[str, Dict]:
+        return self.manifest["tables"]
+
+    def _table(self, table: str) -> Dict:
+        if table not in self.tables:
+            raise SnapshotError(f"Table {table} is not in the snapshot {self.path}")
+        return self.tables[table]
+
+    def _map(self, filename: str, code: str):
+        """A file's contents as a read-only memoryview of ``code`` items (an empty array for empty files)."""
+        if filename not in self._maps:
+            with open(os.path.join(self.path, filename), "rb") as fh:
+                if os.fstat(fh.fileno()).st_size == 0:
+                    self._maps[filename] = (None, array(code))
+                else:
+                    mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps[filename] = (mm, memoryview(mm).cast(code))
+        return self._maps[filename][1]
+
+    def column(self, table: str, name: str):
+        """A fixed-width column (int64 ``q`` or float64 ``d``; timestamps as epoch seconds)."""
+        info = self._table(table)
+        if "columnar" not in self.manifest["formats"]:
+            raise SnapshotError(f"Snapshot {self.path} has no columnar files")
+        kind = info["columns"][name]["type"]
+        if kind not in _CODES:
+            raise SnapshotError(f"{table}.{name} is a {kind} column, not a fixed-width one")
+        return self._map(f"{table}/{name}.values", _CODES[kind])
+
+    def chunks(self, table: str, columns: Iterable[str], max_rows: int) -> Iterator[Dict]:
+        """Fixed-width columns in slices of at most ``max_rows`` rows, in key order."""
+        views = {name: self.column(table, name) for name in columns}
+        rows = self._table(table)["rows"]
+        for start in range(0, rows, max_rows):
+            yield {name: view[start:start + max_rows] for name, view in views.items()}
+
+    def rows(self, table: str) -> Iterator[Dict]:
+        info = self._table(table)
+        if "columnar" not in self.manifest["formats"]:
+            with open(os.path.join(self.path, f"{table}.ndjson"), encoding="utf-8") as fh:
+                for line in fh:
+                    yield json.loads(line)
+            return
+        readers = []
+        for name, column in info["columns"].items():
+            nulls = self._map(f"{table}/{name}.nulls", "B") if column["nulls"] else None
+            if column["type"] == "string":
+                offsets, data = self._map(f"{table}/{name}.offsets", "q"), self._map(f"{table}/{name}.data", "B")
+                get = lambda i, o=offsets, d=data: bytes(d[o[i]:o[i + 1]]).decode()
+            elif column["type"] == "timestamp":
+                values = self.column(table, name)
+                get = lambda i, v=values: datetime.fromtimestamp(v[i], timezone.utc).isoformat()
+            else:
+                get = self.column(table, name).__getitem__
+            readers.append((name, get, nulls))
+        for i in range(info["rows"]):
+            yield {name: None if nulls is not None and nulls[i] else get(i) for name, get, nulls in readers}
+
+    def close(self):
+        for mm, view in self._maps.values():
+            if mm is not None:
+                try:
+                    view.release()
+                    mm.close()
+                except BufferError:
+                    pass  # slices still in use; the map goes when they do
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
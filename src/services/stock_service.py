@@ -0,0 +1,127 @@
+# src/services/stock_service.py
+import logging
+import random
+import time
+from typing import Callable, List, Dict
+from src.dao.base_dao import is_missing_function
+from src.dao.product_dao import ProductDAO
+from src.tracing import traced
+
+log = logging.getLogger(__name__)
+
+
+class StockError(Exception):
+    pass
+
+
+class InsufficientStockError(StockError):
+    def __init__(self, prod_id: int):
+        super().__init__(f"Not enough stock for product {prod_id}")
+        self.prod_id = prod_id
+
+
+class StockConflictError(StockError):
+    pass
+
+
+@traced
+class StockReservationService:
+    """
+    Contention-safe stock changes.
+
+    Reservations go through the ``reserve_stock`` database function, which decrements
+    every line under a ``stock >= qty`` guard in one transaction. Backends without the
+    function fall back to per-line compare-and-set with retry/backoff, releasing any
+    lines already taken if a later one fails, so an order is reserved whole or not at all.
+    Serialization failures and deadlocks are retried by the Dispatcher (RETAIL_RETRIES), not here.
+    """
+
+    def __init__(self, dao: ProductDAO, max_retries: int = 8, backoff: float = 0.01, max_backoff: float = 0.5):
+        self.dao = dao
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.use_rpc = True
+        self.listeners: List[Callable[[str, Dict], None]] = []
+
+    def subscribe(self, listener: Callable[[str, Dict], None]):
+        """Register ``listener(event, {"products": rows})`` for stock_reserved / stock_released."""
+        self.listeners.append(listener)
+
+    def _emit(self, event: str, rows: List[Dict]) -> List[Dict]:
+        for listener in self.listeners:
+            try:
+                listener(event, {"products": rows})
+            except Exception:
+                log.exception("stock listener failed for %s", event)
+        return rows
+
+    def reserve(self, items: List[Dict]) -> List[Dict]:
+        items = _summed(items)
+        if self.use_rpc:
+            try:
+                return self._emit("stock_reserved", self.dao.reserve_stock(items))
+            except Exception as e:
+                if getattr(e, "code", None) == "P0001":
+                    raise InsufficientStockError(int(getattr(e, "details", None) or 0))
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+        return self._emit("stock_reserved", self._reserve_cas(items))
+
+    def release(self, items: List[Dict]) -> List[Dict]:
+        items = _summed(items)
+        if self.use_rpc:
+            try:
+                return self._emit("stock_released", self.dao.release_stock(items))
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+        return self._emit("stock_released",
+                          [row for row in (self._adjust_cas(i["prod_id"], i["quantity"]) for i in items) if row])
+
+    def restock(self, prod_id: int, delta: int) -> Dict | None:
+        rows = self.release([{"prod_id": prod_id, "quantity": delta}])
+        return rows[0] if rows else None
+
+    def _reserve_cas(self, items: List[Dict]) -> List[Dict]:
+        taken: List[Dict] = []
+        rows: List[Dict] = []
+        try:
+            for item in items:
+                row = self._adjust_cas(item["prod_id"], -item["quantity"])
+                if row is None:
+                    raise InsufficientStockError(item["prod_id"])
+                taken.append(item)
+                rows.append(row)
+        except Exception:
+            for item in taken:
+                self._adjust_cas(item["prod_id"], item["quantity"])
+            raise
+        return rows
+
+    def _adjust_cas(self, prod_id: int, delta: int) -> Dict | None:
+        for attempt in range(self.max_retries):
+            prod = self.dao.get_product_by_id(prod_id)
+            if not prod:
+                return None
+            new_stock = (prod.get("stock") or 0) + delta
+            if new_stock < 0:
+                raise InsufficientStockError(prod_id)
+            row = self.dao.compare_and_set_stock(prod_id, prod.get("stock") or 0, new_stock)
+            if row:
+                return row
+            self._sleep(attempt)
+        raise StockConflictError(f"Gave up adjusting stock for product {prod_id} after {self.max_retries} conflicts")
+
+    def _sleep(self, attempt: int):
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        time.sleep(random.uniform(0, delay))
+
+
+def _summed(items: List[Dict]) -> List[Dict]:
+    totals: Dict[int, int] = {}
+    for item in items:
+        totals[item["prod_id"]] = totals.get(item["prod_id"], 0) + item["quantity"]
+    return [{"prod_id": pid, "quantity": qty} for pid, qty in sorted(totals.items())]
@@ -0,0 +1,374 @@
+# src/services/write_behind.py
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from src.dao.base_dao import is_missing_function, is_transient
+from src.dao.cache import CachedProductDAO
+from src.dao.journal_dao import JournalDAO
+from src.services.order_service import OrderService, OrderError
+from src.tracing import traced
+
+log = logging.getLogger(__name__)
+
+ENTRY_KINDS = ("order", "payment", "cancel", "restock")
+
+
+class JournalError(Exception):
+    pass
+
+
+class WriteJournal:
+    """
+    Append-only local file of intended mutations, one JSON record per line.
+
+    ``append`` writes an ``entry`` record and fsyncs before returning, so an acknowledged
+    mutation survives a crash; ``complete`` appends ``done`` records with the backend's
+    outcome. On open, entries without a ``done`` record are pending again (a torn last
+    line from a crash mid-write is ignored). ``compact`` rewrites the file down to the
+    pending entries and the latest ``keep`` outcomes, so rejections stay visible and
+    recent order keys stay resolvable. A ``<path>.lock`` file stays locked while the journal
+    is open, across compactions, so only one process ever replays it.
+    """
+
+    def __init__(self, path: str, sync: bool = True, keep: int = 1000):
+        self.path = path
+        self.sync = sync
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}  # insertion-ordered: replay order
+        self._outcomes: Dict[str, Dict] = {}
+        self._lockfile = open(f"{path}.lock", "a")
+        try:
+            fcntl.flock(self._lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lockfile.close()
+            raise JournalError(f"Journal {path} is in use by another process")
+        self._file = open(path, "a+", encoding="utf-8")
+        self._recover()
+
+    def _recover(self):
+        self._file.seek(0)
+        for line in self._file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                log.warning("skipping unreadable journal record in %s", self.path)
+                continue
+            if record.get("op") == "entry":
+                self._pending[record["key"]] = record
+            elif record.get("op") == "done":
+                self._settle(record)
+
+    def _settle(self, record: Dict):
+        self._pending.pop(record["key"], None)
+        outcome = {k: record.get(k) for k in ("key", "kind", "status", "result", "error", "at")}
+        self._outcomes[record["key"]] = outcome
+        if len(self._outcomes) > 2 * self.keep:
+            self._outcomes = dict(list(self._outcomes.items())[-self.keep:])
+
+    def _write(self, records: List[Dict]):
+        self._file.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def append(self, kind: str, payload: Dict) -> Dict:
+        if kind not in ENTRY_KINDS:
+            raise JournalError(f"Unknown journal entry kind: {kind}")
+        entry = {"op": "entry", "key": uuid.uuid4().hex, "kind": kind, "payload": payload,
+                 "at": datetime.now(timezone.utc).isoformat()}
+        with self._lock:
+            self._write([entry])
+            self._pending[entry["key"]] = entry
+        return entry
+
+    def complete(self, outcomes: List[Dict]):
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            records = [{"op": "done", "key": o["key"], "kind": self._pending.get(o["key"], {}).get("kind"),
+                        "status": o["status"], "result": o.get("result"), "error": o.get("error"), "at": now}
+                       for o in outcomes]
+            self._write(records)
+            for record in records:
+                self._settle(record)
+
+    def pending(self, limit: int | None = None) -> List[Dict]:
+        with self._lock:
+            entries = list(self._pending.values())
+        return entries if limit is None else entries[:limit]
+
+    def is_pending(self, key: str) -> bool:
+        return key in self._pending
+
+    def outcome(self, key: str) -> Optional[Dict]:
+        return self._outcomes.get(key)
+
+    def compact(self):
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                kept = list(self._outcomes.values())[-self.keep:]
+                for outcome in kept:
+                    fh.write(json.dumps({"op": "done", **outcome}, default=str) + "\n")
+                for entry in self._pending.values():
+                    fh.write(json.dumps(entry, default=str) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(directory)  # make the rename itself durable
+            finally:
+                os.close(directory)
+            self._file = open(self.path, "a+", encoding="utf-8")
+            self._outcomes = {o["key"]: o for o in kept}
+
+    def size(self) -> int:
+        with self._lock:
+            return os.fstat(self._file.fileno()).st_size
+
+    def status(self) -> Dict:
+        with self._lock:
+            pending = list(self._pending.values())
+            return {"path": self.path, "pending": len(pending), "oldest": pending[0]["at"] if pending else None,
+                    "by_kind": {k: sum(e["kind"] == k for e in pending) for k in ENTRY_KINDS},
+                    "rejected": [o for o in self._outcomes.values() if o["status"] == "rejected"]}
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+            if not self._lockfile.closed:
+                fcntl.flock(self._lockfile, fcntl.LOCK_UN)
+                self._lockfile.close()
+
+
+@traced
+class WriteBehindService:
+    """
+    Till-side writes that do not wait for the backend.
+
+    ``create_order``, ``process_payment``, ``cancel_order`` and ``restock`` validate what
+    they can locally, append an entry to the WriteJournal and return at once with its
+    ``key``; payments and cancellations may refer to a queued order by that key. A flusher
+    (``flush`` on demand, or the ``start``-ed background thread) sends pending entries in
+    order, ``batch_size`` per request, to the ``apply_journal`` database function, which
+    applies each one atomically and exactly once per key. Unreachable or overloaded
+    backends leave entries queued and the thread backs off; entries the database refuses
+    (e.g. stock sold out while offline) are recorded as rejected for the operator.
+
+    Backends without ``apply_journal`` get each entry through the regular services
+    instead: still in order, but not atomic, and a crash between applying an entry and
+    recording it can apply it twice.
+    """
+
+    def __init__(self, journal: WriteJournal, dao: JournalDAO, order_service: OrderService, payment_service=None,
+                 batch_size: int = 100, interval: float = 1.0, max_backoff: float = 30.0,
+                 compact_bytes: int = 1 << 20):
+        self.journal = journal
+        self.dao = dao
+        self.orders = order_service
+        self.payments = payment_service
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.compact_bytes = compact_bytes
+        self.use_rpc = True
+        self.last_error: str | None = None
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def create_order(self, customer_id: int, items: List[Dict]) -> Dict:
+        """Queue an order. Items are priced from the product DAO (its cache when offline) if it answers;
+        otherwise they are charged the price current when the order reaches the database."""
+        if not items or any(int(i["quantity"]) <= 0 for i in items):
+            raise OrderError("Orders need items with positive quantities")
+        lines = [{"prod_id": int(i["prod_id"]), "quantity": int(i["quantity"]), "price": None} for i in items]
+        total = None
+        try:
+            products = {p["prod_id"]: p for p in self.orders.product_service.dao.get_products_by_ids(
+                [i["prod_id"] for i in lines])}
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            log.info("queuing order unpriced; products unavailable: %s", e)
+        else:
+            lines, total = self.orders.price_items(lines, products)
+        entry = self.journal.append("order", {"customer": int(customer_id), "items": lines})
+        self._wake.set()
+        return {"key": entry["key"], "status": "QUEUED", "customer": int(customer_id), "items": lines,
+                "total_amount": total}
+
+    def process_payment(self, order: int | str, method: str) -> Dict:
+        return self._queue("payment", {**self._order_ref(order), "method": method})
+
+    def cancel_order(self, order: int | str) -> Dict:
+        return self._queue("cancel", self._order_ref(order))
+
+    def restock(self, prod_id: int, delta: int) -> Dict:
+        if delta <= 0:
+            raise JournalError("Delta must be positive")
+        return self._queue("restock", {"items": [{"prod_id": int(prod_id), "quantity": int(delta)}]})
+
+    def _queue(self, kind: str, payload: Dict) -> Dict:
+        entry = self.journal.append(kind, payload)
+        self._wake.set()
+        return {"key": entry["key"], "status": "QUEUED", "kind": kind, **payload}
+
+    def _order_ref(self, order: int | str) -> Dict:
+        """An order id, or the key of a queued order entry."""
+        if isinstance(order, int) or str(order).isdigit():
+            return {"order_id": int(order)}
+        if not self.journal.is_pending(str(order)) and not self.journal.outcome(str(order)):
+            raise JournalError(f"Unknown order or journal key: {order}")
+        return {"order_key": str(order)}
+
+    def outcome(self, key: str) -> Optional[Dict]:
+        if self.journal.is_pending(key):
+            return {"key": key, "status": "QUEUED"}
+        return self.journal.outcome(key)
+
+    def status(self) -> Dict:
+        return {**self.journal.status(), "flusher": bool(self._thread and self._thread.is_alive()),
+                "last_error": self.last_error}
+
+    def flush(self, max_batches: int | None = None) -> Dict:
+        """Send pending entries until the journal is empty; transient errors propagate with entries kept."""
+        summary = {"batches": 0, "applied": 0, "rejected": 0}
+        with self._flush_lock:
+            while max_batches is None or summary["batches"] < max_batches:
+                batch = self.journal.pending(self.batch_size)
+                if not batch:
+                    break
+                outcomes = self._apply(batch)
+                self.journal.complete(outcomes)
+                self._announce(batch, outcomes)
+                summary["batches"] += 1
+                for o in outcomes:
+                    summary[o["status"]] += 1
+            # Compact after settling entries (or once the file is big), not on every idle tick.
+            if not self.journal.pending() and (summary["batches"] or self.journal.size() > self.compact_bytes):
+                self.journal.compact()
+        self.last_error = None
+        return {**summary, "pending": len(self.journal.pending())}
+
+    def _apply(self, batch: List[Dict]) -> List[Dict]:
+        if self.use_rpc:
+            try:
+                return self.dao.apply_entries(batch)
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                self.use_rpc = False
+        outcomes, done = [], {}
+        for entry in batch:
+            try:
+                outcomes.append({"key": entry["key"], "status": "applied", "result": self._apply_one(entry, done)})
+            except Exception as e:
+                if is_transient(e):
+                    # Entries already applied are recorded; the rest stay queued.
+                    self.journal.complete(outcomes)
+                    raise
+                outcomes.append({"key": entry["key"], "status": "rejected", "error": str(e)})
+            done[entry["key"]] = outcomes[-1]
+        return outcomes
+
+    def _apply_one(self, entry: Dict, done: Dict[str, Dict]) -> Dict:
+        # apply_journal is not deployed: the regular services apply (and announce) the entry.
+        payload = entry["payload"]
+        if entry["kind"] == "restock":
+            return {"products": [self.orders.product_service.restock_product(i["prod_id"], i["quantity"])
+                                 for i in payload["items"]]}
+        if entry["kind"] == "order":
+            customer = self.orders.customer_service.dao.get_customer_by_id(payload["customer"])
+            if not customer:
+                raise OrderError(f"Customer {payload['customer']} does not exist")
+            products = {p["prod_id"]: p for p in self.orders.product_service.dao.get_products_by_ids(
+                [i["prod_id"] for i in payload["items"]])}
+            lines, total = self.orders.price_items(payload["items"], products)
+            for line, queued in zip(lines, payload["items"]):
+                if queued.get("price") is not None:
+                    line["price"] = queued["price"]
+            total = sum(line["price"] * line["quantity"] for line in lines)
+            return self.orders.place_order(customer, lines, total, products)
+        order_id = payload.get("order_id")
+        if order_id is None:
+            placed = done.get(payload["order_key"]) or self.journal.outcome(payload["order_key"])
+            if not placed or placed["status"] != "applied":
+                raise OrderError(f"Order {payload['order_key']} was not placed")
+            order_id = placed["result"]["order"]["order_id"]
+        if entry["kind"] == "cancel":
+            return {"order": self.orders.cancel_order(order_id)}
+        if self.payments is None:
+            raise JournalError("Payments need a PaymentService")
+        return {"payment": self.payments.process_payment(order_id, payload.get("method"))}
+
+    def _announce(self, batch: List[Dict], outcomes: List[Dict]):
+        """Give listeners (sales aggregates, low-stock watcher) the events the services would have emitted."""
+        if not self.use_rpc:
+            return
+        kinds = {e["key"]: e["kind"] for e in batch}
+        stock = self.orders.product_service.stock
+        products = self.orders.product_service.dao
+        completed = []
+        for o in outcomes:
+            result = o.get("result") or {}
+            if o["status"] != "applied" or not result:
+                continue
+            if isinstance(products, CachedProductDAO):
+                products.put_many(result.get("products") or [])
+            kind = kinds.get(o["key"])
+            if kind == "order":
+                self.orders._emit("order_created", {"order": result["order"], "items": result.get("items") or []})
+                stock._emit("stock_reserved", result.get("products") or [])
+            elif kind == "payment":
+                completed.append(result["order"])
+            elif kind == "cancel":
+                self.orders._emit("order_cancelled", {"order": result["order"], "items": result.get("items") or []})
+                stock._emit("stock_released", result.get("products") or [])
+            elif kind == "restock":
+                stock._emit("stock_released", result.get("products") or [])
+        if completed:
+            self.orders._emit("orders_completed", {"orders": completed})
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if flush:
+            try:
+                self.flush()
+            except Exception as e:
+                log.warning("write-behind journal left with pending entries: %s", e)
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+                delay = self.interval
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if not is_transient(e):
+                    log.exception("write-behind flush failed")
+                delay = min(self.max_backoff, max(delay, self.interval) * 2)
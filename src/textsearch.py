@@ -0,0 +1,86 @@
+# src/textsearch.py
+"""Normalisation and match scoring shared by customer search backends and the in-memory index."""
+import re
+from typing import Dict, Iterable, List, Sequence
+
+CUSTOMER_SEARCH_FIELDS = ("name", "email", "phone", "city")
+FUZZY_THRESHOLD = 0.3  # pg_trgm's default similarity threshold
+MIN_FUZZY_LENGTH = 3
+
+_SPLIT = re.compile(r"[\s@._+\-]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+
+def normalize(field: str, value) -> str:
+    if value is None:
+        return ""
+    if field == "phone":
+        return _NON_DIGIT.sub("", str(value))
+    return " ".join(str(value).lower().split())
+
+
+def tokens(field: str, value: str) -> List[str]:
+    """Words of a normalised value that a prefix may start; the whole value comes first."""
+    if not value:
+        return []
+    if field == "phone":
+        return [value]
+    return [value] + [t for t in _SPLIT.split(value) if t and t != value]
+
+
+def trigrams(text: str) -> set:
+    """pg_trgm-style trigrams: each word padded with two leading blanks and one trailing blank."""
+    grams = set()
+    for word in _SPLIT.split(text):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def score(field: str, value, query: str, fuzzy: bool = True, query_trigrams: set | None = None) -> float:
+    """
+    How well ``query`` (already normalised for ``field``) matches a field value:
+    1.0 exact, 0.9 prefix of the value, 0.85 prefix of a word (any run of digits for
+    phones, which are often keyed without the country code), up to 0.8 for a fuzzy
+    (trigram) match above FUZZY_THRESHOLD, else 0.
+    """
+    v = normalize(field, value)
+    if not query or not v:
+        return 0.0
+    if v == query:
+        return 1.0
+    if v.startswith(query):
+        return 0.9
+    words = tokens(field, v)
+    if query in v if field == "phone" else any(w.startswith(query) for w in words[1:]):
+        return 0.85
+    if not fuzzy or len(query) < MIN_FUZZY_LENGTH:
+        return 0.0
+    q = query_trigrams if query_trigrams is not None else trigrams(query)
+    best = max(similarity(q, trigrams(w)) for w in words)
+    return round(0.8 * best, 4) if best >= FUZZY_THRESHOLD else 0.0
+
+
+def rank(rows: Iterable[Dict], query: str, fields: Sequence[str] = CUSTOMER_SEARCH_FIELDS,
+         fuzzy: bool = True) -> List[Dict]:
+    """Score each row on its best field; returns matches with ``score``/``matched`` added, best first."""
+    prepared = [(f, normalize(f, query)) for f in fields]
+    prepared = [(f, q, trigrams(q)) for f, q in prepared if q]
+    results = []
+    for row in rows:
+        best, matched = 0.0, None
+        for field, q, q_trigrams in prepared:
+            s = score(field, row.get(field), q, fuzzy, q_trigrams)
+            if s > best:
+                best, matched = s, field
+        if best:
+            results.append({**row, "score": best, "matched": matched})
+    results.sort(key=lambda r: (-r["score"], r["cust_id"]))
+    return results
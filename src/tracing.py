@@ -0,0 +1,236 @@
+# src/tracing.py
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+_FILTER_SKIP = {"select", "limit", "offset", "order", "on_conflict", "columns"}
+_HTTP_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def operation_of(query) -> str:
+    method = getattr(query, "method", None)
+    if isinstance(method, str):
+        return method
+    request = getattr(query, "request", None)
+    if "/rpc/" in str(getattr(request, "path", "")):
+        return "rpc"
+    http = getattr(getattr(request, "http_method", None), "value", None) or str(getattr(request, "http_method", ""))
+    if http == "POST" and "resolution=merge-duplicates" in str(getattr(request, "headers", {}).get("prefer", "")):
+        return "upsert"
+    return _HTTP_OPERATIONS.get(http, http.lower() or "?")
+
+
+def filters_of(query, max_len: int = 120) -> List[str]:
+    filters = getattr(query, "filters", None)
+    if filters is not None:
+        rendered = [f"{col} {op} {value}" for col, op, value in filters]
+    else:
+        params = getattr(getattr(query, "request", None), "params", None) or {}
+        rendered = [f"{k}={v}" for k, v in params.multi_items() if k not in _FILTER_SKIP] if params else []
+    return [f if len(f) <= max_len else f[: max_len - 3] + "..." for f in rendered]
+
+
+class Tracer:
+    """
+    Records every backend request issued through ``BaseDAO._execute`` and every call of a
+    ``@traced`` service method while enabled. Disabled, the hooks cost one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: List[Dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    def start(self):
+        with self._lock:
+            self.events = []
+            self._origin = time.perf_counter()
+        self.enabled = True
+
+    def stop(self) -> List[Dict]:
+        self.enabled = False
+        with self._lock:
+            return list(self.events)
+
+    def _stack(self) -> List[Dict]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _append(self, event: Dict):
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        frame = {"name": name, "requests": 0, "request_ms": 0.0}
+        stack.append(frame)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            self._append({
+                "type": "span", "name": name, "parent": stack[-1]["name"] if stack else None,
+                "start_us": round((start - self._origin) * 1e6), "ms": round(elapsed * 1000, 3),
+                "requests": frame["requests"], "request_ms": round(frame["request_ms"], 3),
+                "thread": threading.get_ident(), "error": error,
+            })
+
+    def execute(self, query, table: str):
+        stack = self._stack()
+        start = time.perf_counter()
+        error, rows, size = None, 0, 0
+        try:
+            response = query.execute()
+            data = getattr(response, "data", None)
+            rows = len(data) if isinstance(data, list) else int(data is not None)
+            size = len(json.dumps(data, default=str)) if data is not None else 0
+            return response
+        except Exception as e:
+            error = getattr(e, "code", None) or type(e).__name__
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for frame in stack:
+                frame["requests"] += 1
+                frame["request_ms"] += elapsed_ms
+            self._append({
+                "type": "query", "table": table, "operation": operation_of(query), "filters": filters_of(query),
+                "rows": rows, "bytes": size, "start_us": round((start - self._origin) * 1e6),
+                "ms": round(elapsed_ms, 3), "span": stack[-1]["name"] if stack else None,
+                "thread": threading.get_ident(), "error": error,
+            })
+
+    def summary(self, events: List[Dict] | None = None) -> Dict:
+        events = self.events if events is None else events
+        queries = [e for e in events if e["type"] == "query"]
+        by_request: Dict[str, Dict] = {}
+        for q in queries:
+            entry = by_request.setdefault(f"{q['operation']} {q['table']}",
+                                          {"count": 0, "ms": 0.0, "rows": 0, "bytes": 0, "errors": 0})
+            entry["count"] += 1
+            entry["ms"] += q["ms"]
+            entry["rows"] += q["rows"]
+            entry["bytes"] += q["bytes"]
+            entry["errors"] += bool(q["error"])
+        by_method: Dict[str, Dict] = {}
+        for s in events:
+            if s["type"] == "span":
+                entry = by_method.setdefault(s["name"], {"calls": 0, "ms": 0.0, "requests": 0, "request_ms": 0.0, "errors": 0})
+                entry["calls"] += 1
+                entry["ms"] += s["ms"]
+                entry["requests"] += s["requests"]
+                entry["request_ms"] += s["request_ms"]
+                entry["errors"] += bool(s["error"])
+        histogram = {f"<{b}ms": 0 for b in HISTOGRAM_BUCKETS_MS}
+        histogram[f">={HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+        for q in queries:
+            bucket = next((b for b in HISTOGRAM_BUCKETS_MS if q["ms"] < b), None)
+            histogram[f"<{bucket}ms" if bucket else f">={HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+        for table in (by_request, by_method):
+            for entry in table.values():
+                for key in ("ms", "request_ms"):
+                    if key in entry:
+                        entry[key] = round(entry[key], 3)
+        return {
+            "requests": len(queries),
+            "request_ms": round(sum(q["ms"] for q in queries), 3),
+            "rows": sum(q["rows"] for q in queries),
+            "bytes": sum(q["bytes"] for q in queries),
+            "by_request": dict(sorted(by_request.items(), key=lambda kv: -kv[1]["ms"])),
+            "by_method": dict(sorted(by_method.items(), key=lambda kv: -kv[1]["ms"])),
+            "histogram": histogram,
+        }
+
+    def export(self, path: str, events: List[Dict] | None = None, fmt: str | None = None):
+        """Write events as JSONL (one event per line) or Chrome trace JSON (chrome://tracing, Perfetto)."""
+        events = self.events if events is None else events
+        fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "chrome")
+        with open(path, "w", encoding="utf-8") as fh:
+            if fmt == "jsonl":
+                for event in events:
+                    fh.write(json.dumps(event, default=str) + "\n")
+                return
+            pid = os.getpid()
+            trace = []
+            for e in events:
+                name = e["name"] if e["type"] == "span" else f"{e['operation']} {e['table']}"
+                args = {k: v for k, v in e.items() if k not in ("type", "name", "start_us", "ms", "thread")}
+                trace.append({"name": name, "cat": e["type"], "ph": "X", "ts": e["start_us"],
+                              "dur": max(1, round(e["ms"] * 1000)), "pid": pid, "tid": e["thread"], "args": args})
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, fh, default=str)
+
+
+def format_summary(summary: Dict, title: str = "profile", width: int = 40) -> str:
+    lines = [f"== {title}: {summary['requests']} requests, {summary['request_ms']} ms in backend, "
+             f"{summary['rows']} rows, {summary['bytes']} bytes"]
+    if summary["by_method"]:
+        lines.append("-- service methods (inclusive)")
+        lines.append(f"  {'method':<48} {'calls':>6} {'ms':>10} {'requests':>9} {'req ms':>10}")
+        for name, m in summary["by_method"].items():
+            lines.append(f"  {name:<48} {m['calls']:>6} {m['ms']:>10} {m['requests']:>9} {m['request_ms']:>10}")
+    if summary["by_request"]:
+        lines.append("-- requests")
+        lines.append(f"  {'request':<48} {'count':>6} {'ms':>10} {'rows':>9} {'bytes':>10}")
+        for name, r in summary["by_request"].items():
+            lines.append(f"  {name:<48} {r['count']:>6} {r['ms']:>10} {r['rows']:>9} {r['bytes']:>10}")
+    if summary["requests"]:
+        lines.append("-- request latency")
+        buckets = list(summary["histogram"].items())
+        used = [i for i, (_, count) in enumerate(buckets) if count]
+        peak = max(count for _, count in buckets)
+        for bucket, count in buckets[used[0]: used[-1] + 1]:
+            bar = "#" * round(count / peak * width)
+            lines.append(f"  {bucket:>9} {count:>7} {bar}")
+    return "\n".join(lines)
+
+
+tracer = Tracer()
+
+
+def traced(cls):
+    """Class decorator: run each public method of ``cls`` inside a tracer span named ``Class.method``."""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(attr):
+            continue
+        setattr(cls, name, _span_method(f"{cls.__name__}.{name}", attr))
+    return cls
+
+
+def _span_method(span_name: str, fn):
+    if inspect.isgeneratorfunction(fn):
+        # A generator's work happens while it is iterated, so the span stays open until it finishes.
+        @functools.wraps(fn)
+        def iterate(*args, **kwargs):
+            if not tracer.enabled:
+                return (yield from fn(*args, **kwargs))
+            with tracer.span(span_name):
+                return (yield from fn(*args, **kwargs))
+        return iterate
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not tracer.enabled:
+            return fn(*args, **kwargs)
+        with tracer.span(span_name):
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,39 @@
+# tests/conftest.py
+import pytest
+from benchmarks.fake_backend import seed, temp_backend
+from src.backends.sqlite_backend import SQLiteClient
+from src.cli.main import RetailCLI
+from src.dao.base_dao import dispatcher
+
+
+@pytest.fixture
+def client():
+    """An empty in-memory SQLite backend."""
+    backend = SQLiteClient()
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def shop(client):
+    """Uncached services over ``client`` with customer 1 and products 1-3 (stock 5, 2, 9)."""
+    cli = RetailCLI(client, cache=False, aggregates=False, search_index=False)
+    cli.customer_service.dao.create_customer("C", "c@x.io", "555-0100")
+    for i, qty in enumerate((5, 2, 9)):
+        cli.product_service.dao.create_product(f"P{i}", f"SKU-{i}", 1.0, qty)
+    return cli
+
+
+@pytest.fixture
+def sales():
+    """A file-backed SQLite backend seeded with a small sales history."""
+    backend = temp_backend()
+    seed(backend, order_items=2000, products=50, customers=40)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture(autouse=True)
+def _dispatch_stats():
+    dispatcher.reset()
+    yield
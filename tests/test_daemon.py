@@ -0,0 +1,47 @@
+# tests/test_daemon.py
+import json
+import sys
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from src.cli.daemon import absolute_paths, forward, make_server
+
+
+@contextmanager
+def daemon(cli, path, monkeypatch):
+    # Installed inside the test: the server wraps whatever sys.stdout/stderr are current.
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    monkeypatch.setattr(sys, "stderr", sys.stderr)
+    server = make_server(cli, path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield path
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_path_options_are_resolved_against_the_client_directory():
+    argv = ["--trace", "t.jsonl", "report", "all", "--snapshot=snap", "--top", "3", "--out", "/abs/dir"]
+    assert absolute_paths(argv, "/home/me") == [
+        "--trace", "/home/me/t.jsonl", "report", "all", "--snapshot=/home/me/snap", "--top", "3", "--out", "/abs/dir"]
+
+
+def test_forwarded_commands_trace_separately(shop, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    commands = {"products.jsonl": ["product", "list"], "customers.jsonl": ["customer", "list"]}
+    with daemon(shop, str(tmp_path / "retail.sock"), monkeypatch) as path, ThreadPoolExecutor(2) as pool:
+        statuses = list(pool.map(lambda item: forward(path, ["--trace", item[0], *item[1]]), commands.items()))
+    assert statuses == [0, 0]
+    assert "SKU-0" in capsys.readouterr().out
+    for trace, argv in commands.items():
+        spans = [e["name"] for e in map(json.loads, (tmp_path / trace).read_text().splitlines())
+                 if e["type"] == "span" and e["name"].startswith("cli ")]
+        assert spans == [f"cli {' '.join(argv)}"]
+
+
+def test_services_are_built_once_across_threads(shop):
+    with ThreadPoolExecutor(8) as pool:
+        services = set(pool.map(lambda _: id(shop.payment_service), range(32)))
+    assert len(services) == 1
+    assert shop.payment_service.order_service is shop.order_service
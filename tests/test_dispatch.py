@@ -0,0 +1,55 @@
+# tests/test_dispatch.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.backends.sqlite_backend import APIResponse
+from src.dao.dispatch import Dispatcher
+
+
+class Backend:
+    """A send() whose first read blocks until released, answering reads with the current value."""
+
+    def __init__(self):
+        self.value = "old"
+        self.sent = []
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def send(self, query):
+        self.sent.append(query.method)
+        if query.method != "select":
+            self.value = "new"
+            return APIResponse([])
+        value = self.value
+        if len(self.sent) == 1:
+            self.started.set()
+            self.release.wait(5)
+        return APIResponse([{"value": value}])
+
+
+def read(client):
+    return client.table("products").select("*").eq("prod_id", 1)
+
+
+def test_identical_reads_in_flight_are_sent_once(client):
+    backend, dispatcher = Backend(), Dispatcher()
+    with ThreadPoolExecutor(4) as pool:
+        first = pool.submit(dispatcher.execute, read(client), backend.send)
+        backend.started.wait(5)
+        others = [pool.submit(dispatcher.execute, read(client), backend.send) for _ in range(3)]
+        threading.Timer(0.2, backend.release.set).start()
+        results = [f.result().data for f in [first, *others]]
+    assert results == [[{"value": "old"}]] * 4
+    assert backend.sent == ["select"]
+    assert dispatcher.stats()["coalesced"] == 3
+
+
+def test_read_after_a_write_is_not_served_by_an_older_read(client):
+    backend, dispatcher = Backend(), Dispatcher()
+    with ThreadPoolExecutor(1) as pool:
+        first = pool.submit(dispatcher.execute, read(client), backend.send)
+        backend.started.wait(5)
+        dispatcher.execute(client.table("products").update({"stock": 1}).eq("prod_id", 1), backend.send)
+        # Coalescing onto the blocked pre-write read would wait for it and return "old".
+        threading.Timer(0.5, backend.release.set).start()
+        assert dispatcher.execute(read(client), backend.send).data == [{"value": "new"}]
+        assert first.result().data == [{"value": "old"}]
+    assert backend.sent == ["select", "update", "select"]
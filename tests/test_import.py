@@ -0,0 +1,18 @@
+# tests/test_import.py
+from src.dao.customer_dao import CustomerDAO
+from src.dao.product_dao import ProductDAO
+from src.services.import_service import ImportService
+
+
+def test_reimport_without_optional_columns_keeps_existing_values(client, tmp_path):
+    products = ProductDAO(client)
+    service = ImportService(products, CustomerDAO(client))
+    full, partial = tmp_path / "full.csv", tmp_path / "partial.jsonl"
+    full.write_text("name,sku,price,stock,category,reorder_threshold\nLamp,L-1,9.5,4,lighting,2\nDesk,D-1,120,1,,\n")
+    partial.write_text('{"name": "Lamp v2", "sku": "L-1", "price": 11}\n{"name": "Desk", "sku": "D-1", "price": 99, "stock": 3}\n')
+    assert service.import_products(str(full))["inserted"] == 2
+    assert service.import_products(str(partial))["updated"] == 2
+    lamp, desk = products.get_product_by_sku("L-1"), products.get_product_by_sku("D-1")
+    assert (lamp["name"], lamp["price"], lamp["stock"], lamp["category"], lamp["reorder_threshold"]) == \
+        ("Lamp v2", 11.0, 4, "lighting", 2)
+    assert (desk["price"], desk["stock"], desk["category"], desk["reorder_threshold"]) == (99.0, 3, None, 5)
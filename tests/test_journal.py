@@ -0,0 +1,50 @@
+# tests/test_journal.py
+import pytest
+from src.dao.journal_dao import JournalDAO
+from src.services.write_behind import JournalError, WriteJournal
+
+
+def stock_of(client, prod_id):
+    return client.table("products").select("stock").eq("prod_id", prod_id).execute().data[0]["stock"]
+
+
+def test_apply_journal_replay_is_a_no_op(sales):
+    dao = JournalDAO(sales)
+    entries = [{"key": "o1", "kind": "order", "payload": {"customer": 1, "items": [{"prod_id": 1, "quantity": 2}]}},
+               {"key": "r1", "kind": "restock", "payload": {"items": [{"prod_id": 2, "quantity": 5}]}}]
+    before = stock_of(sales, 1), stock_of(sales, 2)
+    first = dao.apply_entries(entries)
+    orders = sales.table("orders").select("order_id", count="exact").limit(1).execute().count
+    again = dao.apply_entries(entries)
+    assert [o["status"] for o in first] == ["applied", "applied"]
+    assert again == first
+    assert (stock_of(sales, 1), stock_of(sales, 2)) == (before[0] - 2, before[1] + 5)
+    assert sales.table("orders").select("order_id", count="exact").limit(1).execute().count == orders
+
+
+def test_malformed_entry_is_rejected_without_blocking_the_batch(sales):
+    before = stock_of(sales, 3)
+    outcomes = JournalDAO(sales).apply_entries([
+        {"key": "bad", "kind": "order", "payload": {"items": [{"prod_id": 3, "quantity": 1}]}},
+        {"key": "ok", "kind": "restock", "payload": {"items": [{"prod_id": 3, "quantity": 1}]}},
+    ])
+    assert [o["status"] for o in outcomes] == ["rejected", "applied"]
+    assert stock_of(sales, 3) == before + 1
+
+
+def test_journal_recovers_pending_entries_and_stays_locked_across_compaction(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = WriteJournal(path)
+    done = journal.append("restock", {"items": [{"prod_id": 1, "quantity": 1}]})
+    queued = journal.append("restock", {"items": [{"prod_id": 2, "quantity": 1}]})
+    journal.complete([{"key": done["key"], "status": "applied"}])
+    journal.compact()
+    with pytest.raises(JournalError):
+        WriteJournal(path)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write('{"op": "entry", "key": "tor')  # torn write from a crash
+    reopened = WriteJournal(path)
+    assert [e["key"] for e in reopened.pending()] == [queued["key"]]
+    assert reopened.outcome(done["key"])["status"] == "applied"
+    reopened.close()
@@ -0,0 +1,18 @@
+# tests/test_low_stock.py
+from src.services.low_stock_service import LowStockWatcher
+
+
+def test_watcher_follows_orders_cancellations_and_outside_changes(shop):
+    alerts = []
+    watcher = LowStockWatcher(shop.product_service, on_alert=alerts.append)
+    assert watcher.load() == 3
+    assert [(p["prod_id"], p["headroom"]) for p in watcher.lowest()] == [(2, -3), (1, 0)]
+
+    order_id = shop.order_service.create_order(1, [{"prod_id": 3, "quantity": 4}])["order"]["order_id"]
+    shop.order_service.cancel_order(order_id)
+    assert [(a["event"], a["prod_id"], a["stock"]) for a in alerts] == [("low_stock", 3, 5), ("recovered", 3, 9)]
+
+    shop.product_service.dao.update_product(2, {"stock": 20})  # not seen by the stock events
+    assert [(a["event"], a["prod_id"]) for a in watcher.reconcile()] == [("recovered", 2)]
+    assert [p["prod_id"] for p in watcher.lowest()] == [1]
+    assert [p["prod_id"] for p in watcher.lowest(only_low=False)] == [1, 3, 2]
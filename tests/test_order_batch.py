@@ -0,0 +1,20 @@
+# tests/test_order_batch.py
+from src.services.order_batch_service import OrderBatchService
+
+
+def test_batch_keeps_each_customers_baskets_in_file_order(shop):
+    shop.customer_service.dao.create_customer("D", "d@x.io", "555-0101")
+    baskets = [{"customer": 1, "items": "2:2"}, {"customer": 2, "items": "1:1"}, {"customer": 1, "items": "2:1"},
+               {"customer": "x", "items": "1:1"}, {"customer": 2, "items": [{"prod_id": 3, "quantity": 1}]},
+               {"customer": 1, "items": "1:1 3:1"}, {"customer": 9, "items": "1:1"}]
+    chunks = []
+    stats = OrderBatchService(shop.order_service).create_batch(
+        enumerate(baskets, 1), chunk_size=3, workers=4, on_results=chunks.append)
+    results = [r for chunk in chunks for r in chunk]
+    assert [r["line"] for r in results] == list(range(1, 8))
+    # Customer 1's first basket takes all of product 2, so the later one for it must fail.
+    assert [r["status"] for r in results] == ["ok", "ok", "failed", "invalid", "ok", "ok", "failed"]
+    assert (stats["created"], stats["failed"], stats["invalid"], stats["chunks"]) == (4, 2, 1, 3)
+    for customer in (1, 2):
+        placed = [r["order_id"] for r in results if r.get("customer") == customer and r["status"] == "ok"]
+        assert placed == sorted(placed)
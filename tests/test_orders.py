@@ -0,0 +1,73 @@
+# tests/test_orders.py
+import pytest
+import src.backends.sqlite_backend as sqlite_backend
+from src.cli.main import RetailCLI
+from src.services.order_service import OrderError
+from src.services.report_service import ReportService
+
+ITEMS = [{"prod_id": 1, "quantity": 2}, {"prod_id": 3, "quantity": 4}]
+
+
+def levels(shop):
+    return [shop.product_service.dao.get_product_by_id(pid)["stock"] for pid in (1, 2, 3)]
+
+
+def status(shop, order_id):
+    return shop.order_service.dao.get_order(order_id)["status"]
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_cancel_and_complete_happen_once(shop, use_rpc):
+    orders = shop.order_service
+    orders.use_rpc = use_rpc
+    cancelled = orders.create_order(1, ITEMS)["order"]["order_id"]
+    completed = orders.create_order(1, ITEMS)["order"]["order_id"]
+    assert orders.cancel_order(cancelled)["status"] == "CANCELLED"
+    assert orders.complete_order(completed)["status"] == "COMPLETED"
+    for order_id in (cancelled, completed):
+        with pytest.raises(OrderError, match="can be cancelled"):
+            orders.cancel_order(order_id)
+        with pytest.raises(OrderError, match="can be completed"):
+            orders.complete_order(order_id)
+    with pytest.raises(OrderError, match="not found"):
+        orders.cancel_order(999)
+    assert levels(shop) == [3, 2, 5]
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_cancel_without_a_journal_keeps_the_order_placed_when_release_fails(shop, use_rpc, monkeypatch):
+    orders = shop.order_service
+    orders.use_rpc = use_rpc
+    order_id = orders.create_order(1, ITEMS)["order"]["order_id"]
+
+    def fail(*args):
+        raise RuntimeError("release failed")
+    with monkeypatch.context() as m:
+        m.setattr(sqlite_backend, "_release_stock", fail)
+        m.setattr(shop.product_service.stock, "release", fail)
+        with pytest.raises(RuntimeError):
+            orders.cancel_order(order_id)
+    assert status(shop, order_id) == "PLACED"
+    assert levels(shop) == [3, 2, 5]
+    orders.cancel_order(order_id)
+    assert status(shop, order_id) == "CANCELLED"
+    assert levels(shop) == [5, 2, 9]
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_aggregates_count_each_cancel_and_completion_once(shop, use_rpc):
+    cli = RetailCLI(shop.client, cache=False, aggregates=True, search_index=False)
+    cli.aggregate_service.rebuild()
+    orders = cli.order_service
+    orders.use_rpc = use_rpc
+    ids = [orders.create_order(1, ITEMS)["order"]["order_id"] for _ in range(2)]
+    orders.cancel_order(ids[0])
+    cli.payment_service.process_payment(ids[1], "card")
+    for order_id in ids:
+        with pytest.raises(OrderError):
+            orders.cancel_order(order_id)
+        with pytest.raises(OrderError):
+            orders.complete_order(order_id)
+    assert cli.payment_service.settle_orders(ids, "card")["settled"] == 0
+    assert cli.aggregate_service.check()["consistent"]
+    assert cli.report_service.top_selling_products(2) == ReportService(shop.client).top_selling_products(2)
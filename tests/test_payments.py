@@ -0,0 +1,60 @@
+# tests/test_payments.py
+import asyncio
+import pytest
+from src.services.async_services import AsyncOrderService, AsyncPaymentService
+from src.services.order_service import OrderError
+
+
+def pay_sync(shop, order_id):
+    return shop.payment_service.process_payment(order_id, "card")
+
+
+def pay_async(shop, order_id):
+    async def run():
+        orders = AsyncOrderService(shop.order_service, concurrency=2)
+        return await AsyncPaymentService(shop.payment_service, orders).process_payment(order_id, "card")
+    return asyncio.run(run())
+
+
+@pytest.fixture(params=[pay_sync, pay_async], ids=["sync", "async"])
+def pay(request):
+    return request.param
+
+
+def test_payment_completes_the_order(shop, pay):
+    order_id = shop.order_service.create_order(1, [{"prod_id": 1, "quantity": 2}])["order"]["order_id"]
+    payment = pay(shop, order_id)
+    assert (payment["status"], payment["method"], payment["amount"]) == ("PAID", "card", 2.0)
+    assert shop.order_service.dao.get_order(order_id)["status"] == "COMPLETED"
+
+
+def test_payment_is_not_marked_paid_when_the_order_is_cancelled_first(shop, pay, monkeypatch):
+    orders = shop.order_service
+    order_id = orders.create_order(1, [{"prod_id": 1, "quantity": 2}])["order"]["order_id"]
+    complete = orders.complete_order
+
+    def cancelled_meanwhile(oid):
+        orders.cancel_order(oid)
+        return complete(oid)
+    monkeypatch.setattr(orders, "complete_order", cancelled_meanwhile)
+    with pytest.raises(OrderError):
+        pay(shop, order_id)
+    assert shop.payment_service.dao.get_payment_by_order(order_id)["status"] == "PENDING"
+    assert orders.dao.get_order(order_id)["status"] == "CANCELLED"
+
+
+def test_settlement_pays_only_orders_it_completed(shop, monkeypatch):
+    orders, payments = shop.order_service, shop.payment_service
+    ids = [orders.create_order(1, [{"prod_id": 3, "quantity": 1}])["order"]["order_id"] for _ in range(3)]
+    pending = payments.dao.create_payment(ids[1], 1.0, "cash")
+    complete_orders = orders.complete_orders
+
+    def one_cancelled_meanwhile(order_ids):
+        orders.cancel_order(ids[1])
+        return complete_orders(order_ids)
+    monkeypatch.setattr(orders, "complete_orders", one_cancelled_meanwhile)
+    report = payments.settle_orders(ids, "card")
+    assert (report["settled"], report["conflicts"], report["paid_amount"]) == (2, [ids[1]], 2.0)
+    assert payments.dao.get_payment_by_order(ids[1]) == pending
+    assert [payments.dao.get_payment_by_order(oid)["status"] for oid in (ids[0], ids[2])] == ["PAID", "PAID"]
+    assert [orders.dao.get_order(oid)["status"] for oid in ids] == ["COMPLETED", "CANCELLED", "COMPLETED"]
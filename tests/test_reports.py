@@ -0,0 +1,40 @@
+# tests/test_reports.py
+from datetime import datetime, timedelta, timezone
+import pytest
+import src.services.columnar as columnar
+from src.dao.export_dao import ExportDAO
+from src.services.report_service import ReportService
+from src.services.snapshot import Snapshot, export_snapshot
+
+NOW = datetime.now(timezone.utc)
+RANGES = [{}, {"top": 3, "min_orders": 2}, {"since": NOW - timedelta(days=40), "until": NOW - timedelta(days=10)}]
+
+
+def same(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        if name == "revenue":
+            assert a[name] == pytest.approx(b[name])
+        else:
+            assert a[name] == b[name], name
+
+
+@pytest.mark.parametrize("kwargs", RANGES)
+def test_rpc_scan_and_snapshot_reports_agree(sales, tmp_path, kwargs, monkeypatch):
+    rpc = ReportService(sales).run_reports(**kwargs)
+    scan = ReportService(sales)
+    scan.use_rpc = False
+    same(rpc, scan.run_reports(**kwargs))
+    export_snapshot(ExportDAO(sales), str(tmp_path / "snap"))
+    with Snapshot(str(tmp_path / "snap")) as snapshot:
+        same(rpc, ReportService(snapshot=snapshot).run_reports(**kwargs))
+    monkeypatch.setattr(columnar, "_numpy", lambda: None)
+    same(rpc, scan.run_reports(**kwargs))
+
+
+def test_run_reports_matches_single_reports(sales):
+    reports = ReportService(sales)
+    combined = reports.run_reports(top=7, min_orders=4)
+    assert combined["top_products"] == reports.top_selling_products(7)
+    assert combined["frequent_customers"] == reports.frequent_customers(4)
+    assert combined["revenue"] == pytest.approx(reports.total_revenue_last_month())
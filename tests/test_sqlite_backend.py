@@ -0,0 +1,41 @@
+# tests/test_sqlite_backend.py
+import pytest
+from src.backends.sqlite_backend import BackendError, SQLiteClient
+
+
+def test_non_sqlite_error_rolls_back_and_releases_the_connection(tmp_path):
+    path = str(tmp_path / "retail.db")
+    client = SQLiteClient(path, pool_size=1)
+    with pytest.raises(KeyError):
+        client.rpc("reserve_stock", {}).execute()
+    assert client.table("products").select("*").execute().data == []
+    other = SQLiteClient(path, pool_size=1, timeout=0.5)  # the write lock was released
+    other.table("products").insert({"name": "P", "sku": "S", "price": 1.0}).execute()
+    other.close()
+    client.close()
+
+
+def test_ilike_and_like_honour_escapes(client):
+    for name, email in [("50% Off", "a@x.io"), ("50x Off", "b@x.io"), ("a_b", "c@x.io"), ("axb", "d@x.io")]:
+        client.table("customers").insert({"name": name, "email": email}).execute()
+
+    def names(q):
+        return [r["name"] for r in q.order("cust_id").execute().data]
+    assert names(client.table("customers").select("name").ilike("name", "50\\%%")) == ["50% Off"]
+    assert names(client.table("customers").select("name").ilike("name", "A\\_%")) == ["a_b"]
+    assert names(client.table("customers").select("name").like("name", "a_b")) == ["a_b", "axb"]
+    assert names(client.table("customers").select("name").like("name", "A_b")) == []
+
+
+def test_embedded_select(client):
+    client.table("customers").insert({"name": "C", "email": "c@x.io"}).execute()
+    client.table("products").insert([{"name": "P1", "sku": "S1", "price": 2.0}, {"name": "P2", "sku": "S2", "price": 3.0}]).execute()
+    client.table("orders").insert({"cust_id": 1, "total_amount": 7.0}).execute()
+    client.table("order_items").insert([{"order_id": 1, "prod_id": 1, "quantity": 2, "price": 2.0},
+                                        {"order_id": 1, "prod_id": 2, "quantity": 1, "price": 3.0}]).execute()
+    row = client.table("orders").select("order_id, buyer:customers(name), order_items(quantity, products(name))").execute().data[0]
+    assert row == {"order_id": 1, "buyer": {"name": "C"},
+                   "order_items": [{"quantity": 2, "products": {"name": "P1"}}, {"quantity": 1, "products": {"name": "P2"}}]}
+    with pytest.raises(BackendError) as e:
+        client.table("products").select("*, customers(*)").execute()
+    assert e.value.code == "PGRST200"
@@ -0,0 +1,32 @@
+# tests/test_stock.py
+import pytest
+from src.dao.product_dao import ProductDAO
+from src.services.stock_service import InsufficientStockError, StockReservationService
+
+
+@pytest.fixture
+def stock(client):
+    dao = ProductDAO(client)
+    for i, qty in enumerate((5, 2, 9)):
+        dao.create_product(f"P{i}", f"SKU-{i}", 1.0, qty)
+    return StockReservationService(dao)
+
+
+def levels(stock):
+    return [stock.dao.get_product_by_id(pid)["stock"] for pid in (1, 2, 3)]
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_reserve_takes_every_line(stock, use_rpc):
+    stock.use_rpc = use_rpc
+    stock.reserve([{"prod_id": 1, "quantity": 2}, {"prod_id": 3, "quantity": 4}, {"prod_id": 1, "quantity": 1}])
+    assert levels(stock) == [2, 2, 5]
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_reserve_is_all_or_nothing(stock, use_rpc):
+    stock.use_rpc = use_rpc
+    with pytest.raises(InsufficientStockError) as e:
+        stock.reserve([{"prod_id": 1, "quantity": 2}, {"prod_id": 2, "quantity": 3}, {"prod_id": 3, "quantity": 1}])
+    assert e.value.prod_id == 2
+    assert levels(stock) == [5, 2, 9]
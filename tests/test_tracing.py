@@ -0,0 +1,30 @@
+# tests/test_tracing.py
+from src.dao.product_dao import ProductDAO
+from src.tracing import traced, tracer
+
+
+@traced
+class Catalogue:
+    def __init__(self, dao):
+        self.dao = dao
+
+    def each(self, prod_ids):
+        for prod_id in prod_ids:
+            yield self.dao.get_product_by_id(prod_id)
+
+
+def test_generator_span_covers_its_iteration(client):
+    dao = ProductDAO(client)
+    for i in range(3):
+        dao.create_product(f"P{i}", f"SKU-{i}", 1.0, 1)
+    tracer.start()
+    try:
+        with tracer.span("outer"):
+            rows = list(Catalogue(dao).each([1, 2, 3]))
+    finally:
+        events = tracer.stop()
+    assert [r["sku"] for r in rows] == ["SKU-0", "SKU-1", "SKU-2"]
+    spans = {e["name"]: e for e in events if e["type"] == "span"}
+    assert spans["Catalogue.each"]["requests"] == 3
+    assert spans["Catalogue.each"]["parent"] == "outer"
+    assert [q["span"] for q in events if q["type"] == "query"] == ["Catalogue.each"] * 3